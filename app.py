@@ -1,11 +1,11 @@
 import streamlit as st
 from pages.auth import login_page
-from pages.overview import overview_page
-from pages.analytics import analytics_page
-from pages.predictions import predictions_page
-from pages.rewards import rewards_page
-from pages.settings import settings_page
-from utils.data_loader import load_data
+from utils.auth import is_admin
+from utils.data_loader import (data_files_present, get_diagnostics, get_metrics_exporter, get_precompute_failures,
+                               get_precompute_scheduler, get_precompute_status, get_session_overlay,
+                               load_correlation, load_overview, load_page_data, load_precomputed,
+                               load_rewards_index)
+from utils.instrumentation import get_instrumentation, import_module, profile_request
 
 # Page configuration
 st.set_page_config(
@@ -32,6 +32,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Stage metrics (and /metrics if BREATHSAVE_METRICS_PORT is set)
+metrics_server = get_metrics_exporter()
+
 # Initialize session state
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
@@ -40,19 +43,19 @@ if 'logged_in' not in st.session_state:
 # Display login or dashboard
 if not st.session_state.logged_in:
     login_page()
+    get_instrumentation().first_render()
 else:
-    # Load data
-    notifications_df, milestones_df, rewards_df = load_data()
-    
-    if milestones_df is not None:
+    # Each page loads only the tables and columns it needs (see utils/data_access.py)
+    if data_files_present():
         # Sidebar navigation
         st.sidebar.markdown(f"## Welcome, {st.session_state.username}! 👋")
         st.sidebar.divider()
         
-        page = st.sidebar.radio(
-            "Navigation",
-            ["📊 Overview", "🤖 Analytics", "🔮 Predictions", "🏆 Rewards", "⚙️ Settings"]
-        )
+        pages = ["📊 Overview", "🤖 Analytics", "🔮 Predictions", "🏆 Rewards", "👤 User Detail", "⚙️ Settings"]
+        admin = is_admin(st.session_state.username)
+        if admin:
+            pages.append("🩺 Diagnostics")
+        page = st.sidebar.radio("Navigation", pages)
         
         st.sidebar.divider()
         
@@ -61,14 +64,40 @@ else:
             st.session_state.username = None
             st.rerun()
         
-        # Render selected page
-        if "Overview" in page:
-            overview_page(milestones_df)
-        elif "Analytics" in page:
-            analytics_page(milestones_df)
-        elif "Predictions" in page:
-            predictions_page(milestones_df)
-        elif "Rewards" in page:
-            rewards_page(milestones_df, rewards_df)
-        elif "Settings" in page:
-            settings_page()
+        # Profile this render if an admin armed the profiler for this page
+        armed = st.session_state.get('profile_next') if admin else None
+        profile_mode = st.session_state.pop('profile_next')['mode'] if armed and armed['page'] == page else None
+        
+        # Render selected page. Page modules are imported when first selected,
+        # so plotly and the model code load only for the pages that use them
+        with profile_request(page, profile_mode) as profiled:
+            if "Overview" in page:
+                import_module('pages.overview').overview_page(load_overview(), get_precompute_failures())
+            elif "Analytics" in page:
+                import_module('pages.analytics').analytics_page(
+                    load_page_data('analytics')['milestones'], load_correlation(), get_session_overlay(),
+                    load_precomputed('segmentation'), load_precomputed('cluster_stats'),
+                    load_precomputed('segmentation_sweep'), get_precompute_failures())
+            elif "Predictions" in page:
+                import_module('pages.predictions').predictions_page(
+                    load_page_data('predictions')['milestones'], load_precomputed('prediction'),
+                    load_precomputed('forecast'), get_precompute_failures())
+            elif "Rewards" in page:
+                import_module('pages.rewards').rewards_page(load_overview(), load_rewards_index(),
+                                                            get_precompute_failures())
+            elif "User Detail" in page:
+                import_module('pages.user_detail').user_detail_page()
+            elif "Settings" in page:
+                import_module('pages.settings').settings_page(get_precompute_status())
+            elif "Diagnostics" in page and admin:
+                import_module('pages.diagnostics').diagnostics_page(get_diagnostics(), metrics_server)
+        if 'profile' in profiled:
+            st.session_state.last_profile = profiled['profile']
+        get_instrumentation().first_render()
+        
+        # Models and aggregates are rebuilt in the background when the data
+        # changes. Started after the render so the first page doesn't share
+        # the CPU with the scheduler importing sklearn
+        get_precompute_scheduler()
+    else:
+        st.error("Data files not found in /data directory")
@@ -0,0 +1,86 @@
+"""
+ANALYTICS PAGE LATENCY BENCHMARK
+================================
+
+Times the model work the Analytics page does on each rerun: segmentation,
+cluster statistics and the correlation matrix. "before" refits K-Means
+every time (the original behaviour); "after" goes through the model
+registry, measured on a cold registry, warm in-process and from disk in a
+fresh worker process.
+
+Usage:
+    python benchmarks/bench_analytics_page.py --users 1000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from bench_utils import Timer
+from synthetic_data import MILESTONES_CSV, write_milestones
+
+CORR_COLUMNS = ['total_cigs_avoided', 'money_saved', 'total_cigs_smoked', 'points']
+
+
+def render(df, cached, registry=None):
+    """Model work done by analytics_page, without Streamlit."""
+    from ml_models.clustering import UserSegmentationModel
+
+    model = UserSegmentationModel(n_clusters=3)
+    with Timer() as timer:
+        if cached:
+            clusters = model.fit_predict_cached(df, registry)
+        else:
+            clusters = model.fit_predict(df)
+        model.get_cluster_stats(df, clusters)
+        df[CORR_COLUMNS].corr()
+    return timer.seconds
+
+
+def _child(csv_path, registry_root):
+    from ml_models.registry import ModelRegistry
+
+    df = pd.read_csv(csv_path)
+    print(json.dumps({'seconds': render(df, True, ModelRegistry(registry_root))}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--child', nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    from ml_models.registry import ModelRegistry
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, MILESTONES_CSV)
+        write_milestones(csv_path, args.users)
+        df = pd.read_csv(csv_path)
+        registry_root = os.path.join(tmp, 'models')
+
+        results = {'users': args.users}
+        results['before_refit_s'] = render(df, cached=False)
+        results['after_cold_registry_s'] = render(df, True, ModelRegistry(registry_root))
+        results['after_warm_in_process_s'] = render(df, True, ModelRegistry(registry_root))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', csv_path, registry_root],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results['after_new_worker_s'] = json.loads(output.strip().splitlines()[-1])['seconds']
+
+    for name, value in results.items():
+        print(f"{name:>26}: {value:,.3f}" if isinstance(value, float) else f"{name:>26}: {value:,}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
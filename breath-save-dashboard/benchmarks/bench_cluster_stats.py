@@ -0,0 +1,68 @@
+"""
+CLUSTER STATISTICS BENCHMARK
+============================
+
+Compares the original get_cluster_stats (copy the frame, filter once per
+cluster) with the single-pass bincount implementation at 1M and 10M rows,
+for the default means and for a wider set of aggregates.
+
+Usage:
+    python benchmarks/bench_cluster_stats.py --rows 1000000 10000000 --clusters 3 8
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from bench_utils import Timer
+from synthetic_data import milestones_frame
+from ml_models.clustering import UserSegmentationModel
+
+EXTRA_AGGREGATES = ['median', 'p90', 'std', 'count']
+
+
+def legacy_cluster_stats(df, clusters, n_clusters):
+    """The previous implementation, kept here as the baseline."""
+    df_copy = df.copy()
+    df_copy['cluster'] = clusters
+    stats = {}
+    for cluster_id in range(n_clusters):
+        cluster_data = df_copy[df_copy['cluster'] == cluster_id]
+        stats[cluster_id] = {
+            'users': len(cluster_data),
+            'avg_savings': cluster_data['money_saved'].mean(),
+            'avg_cigs_avoided': cluster_data['total_cigs_avoided'].mean(),
+            'avg_cigs_smoked': cluster_data['total_cigs_smoked'].mean()
+        }
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--clusters', type=int, nargs='+', default=[3, 8])
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        df = milestones_frame(rows)
+        for k in args.clusters:
+            clusters = np.random.default_rng(0).integers(0, k, rows)
+            model = UserSegmentationModel(n_clusters=k)
+            with Timer() as legacy:
+                legacy_cluster_stats(df, clusters, k)
+            with Timer() as means:
+                model.get_cluster_stats(df, clusters)
+            with Timer() as extended:
+                model.get_cluster_stats(df, clusters, EXTRA_AGGREGATES)
+            result = {'rows': rows, 'clusters': k, 'legacy_s': legacy.seconds,
+                      'single_pass_s': means.seconds, 'single_pass_extended_s': extended.seconds}
+            results.append(result)
+            print(f"{rows:>11,} rows k={k}: legacy {legacy.seconds:7.3f}s  single-pass {means.seconds:7.3f}s  "
+                  f"with {'/'.join(EXTRA_AGGREGATES)} {extended.seconds:7.3f}s")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
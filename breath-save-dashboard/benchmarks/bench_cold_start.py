@@ -0,0 +1,192 @@
+"""
+COLD START BENCHMARK
+====================
+
+Import time and time to first render of a fresh dashboard worker, rendered
+with Streamlit's AppTest (no browser), each scenario in a new process:
+
+- login: an anonymous session opens the app and gets the login page.
+- dashboard: a logged-in session gets the default page (Overview), then
+  selects every other page once; each selection is timed separately.
+
+Two modes:
+
+- eager: every page module and the model modules are imported before the
+  first run, as app.py did when it imported all pages at the top.
+- lazy: app.py as it is; page modules are imported when first selected
+  (utils.instrumentation.import_module) and sklearn only by the pages and
+  background jobs that fit models.
+
+For each step the report lists which of sklearn and plotly.express were
+loaded afterwards (after the first render, background jobs import sklearn
+in lazy mode too). ``first_render_in_app_s`` is the app's own measurement
+(Instrumentation.first_render_s, also on the Diagnostics page). The login
+path is also broken down with ``python -X importtime`` into its slowest
+top-level imports.
+
+Runs against the sample data in data/ unless --users is given, in a
+temporary working directory so no users.db or model files are left behind.
+
+Usage:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --users 100000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from bench_utils import APP_DIR, Timer
+from synthetic_data import MILESTONES_CSV, NOTIFICATIONS_CSV, REWARDS_CSV, write_dataset
+
+APP_PATH = os.path.join(os.path.dirname(APP_DIR), 'app.py')
+PAGES = ["📊 Overview", "🤖 Analytics", "🔮 Predictions", "🏆 Rewards", "👤 User Detail", "⚙️ Settings"]
+# What the app imported before the first run when every page was imported eagerly
+EAGER_MODULES = ['pages.auth', 'pages.overview', 'pages.analytics', 'pages.predictions', 'pages.rewards',
+                 'pages.settings', 'pages.user_detail', 'pages.diagnostics', 'ml_models.clustering',
+                 'ml_models.regression', 'utils.data_loader']
+HEAVY_MODULES = ['sklearn', 'plotly.express']
+LOGIN_PATH = 'import streamlit, pages.auth, utils.auth, utils.data_loader, utils.instrumentation'
+
+
+def _loaded():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def _child(scenario, mode):
+    """Run one scenario in this (fresh) process and print the timings as JSON."""
+    import importlib
+
+    with Timer() as streamlit_import:
+        from streamlit.testing.v1 import AppTest
+    result = {'streamlit_import_s': streamlit_import.seconds}
+
+    with Timer() as first:
+        if mode == 'eager':
+            for name in EAGER_MODULES:
+                importlib.import_module(name)
+        app = AppTest.from_file(APP_PATH, default_timeout=600)
+        if scenario == 'dashboard':
+            app.session_state.logged_in = True
+            app.session_state.username = 'bench'
+        app.run()
+    from utils.instrumentation import get_instrumentation
+
+    result['first_render_s'] = first.seconds
+    result['first_render_in_app_s'] = get_instrumentation().first_render_s
+    result['first_page'] = 'login' if scenario == 'login' else PAGES[0]
+    result['loaded_after_first_render'] = _loaded()
+    result['exceptions'] = [e.value for e in app.exception]
+
+    if scenario == 'dashboard':
+        result['first_selection_s'] = {}
+        result['loaded_after'] = {}
+        for page in PAGES[1:]:
+            with Timer() as selection:
+                app.sidebar.radio[0].set_value(page).run()
+            result['first_selection_s'][page] = selection.seconds
+            result['loaded_after'][page] = _loaded()
+            result['exceptions'] += [e.value for e in app.exception]
+    print(json.dumps(result), flush=True)
+    # Skip joining the background scheduler's threads
+    os._exit(0)
+
+
+def _run_child(scenario, mode, cwd):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', scenario, mode],
+                            cwd=cwd, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_breakdown(cwd, top=10):
+    """
+    Slowest top-level imports of the login path, from ``python -X importtime``.
+
+    Returns:
+        dict: ``total_s`` and ``top`` (module -> cumulative seconds)
+    """
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', LOGIN_PATH], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True).stderr
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative) / 1e6
+    ranked = sorted(top_level.items(), key=lambda item: -item[1])
+    return {'total_s': sum(top_level.values()), 'top': dict(ranked[:top])}
+
+
+def _workdir(tmp, users):
+    """Working directory with a data/ folder the app can read and write."""
+    data_dir = os.path.join(tmp, 'data')
+    os.makedirs(data_dir)
+    if users:
+        write_dataset(data_dir, users)
+    else:
+        # Link the sample CSVs; the columnar store is written next to the links
+        for name in (MILESTONES_CSV, REWARDS_CSV, NOTIFICATIONS_CSV):
+            os.symlink(os.path.join(APP_DIR, 'data', name), os.path.join(data_dir, name))
+    return tmp
+
+
+def _median(runs, *keys):
+    values = []
+    for run in runs:
+        value = run
+        for key in keys:
+            value = value[key]
+        values.append(value)
+    return statistics.median(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=None, help="Generate synthetic data instead of data/")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh processes per scenario and mode")
+    parser.add_argument('--child', nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    results = {'users': args.users or 'sample data'}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = _workdir(tmp, args.users)
+        # Build the columnar store once so every run starts from the same files
+        _run_child('dashboard', 'lazy', cwd)
+        results['login_import_breakdown'] = import_breakdown(cwd)
+        for mode in ('eager', 'lazy'):
+            login = [_run_child('login', mode, cwd) for _ in range(args.repeat)]
+            dashboard = [_run_child('dashboard', mode, cwd) for _ in range(args.repeat)]
+            results[mode] = {
+                'streamlit_import_s': _median(login, 'streamlit_import_s'),
+                'login': {
+                    'first_render_s': _median(login, 'first_render_s'),
+                    'first_render_in_app_s': _median(login, 'first_render_in_app_s'),
+                    'loaded': login[0]['loaded_after_first_render'],
+                },
+                'dashboard': {
+                    'first_render_s': _median(dashboard, 'first_render_s'),
+                    'first_render_in_app_s': _median(dashboard, 'first_render_in_app_s'),
+                    'loaded': dashboard[0]['loaded_after_first_render'],
+                    'first_selection_s': {page: _median(dashboard, 'first_selection_s', page)
+                                          for page in PAGES[1:]},
+                    'loaded_after': dashboard[0]['loaded_after'],
+                },
+                'exceptions': sorted({e for run in login + dashboard for e in run['exceptions']}),
+            }
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+COLUMNAR STORE BENCHMARK
+========================
+
+Compares cold-load time and resident memory of the CSV path
+(pd.read_csv on all three tables) against the memory-mapped columnar
+store. Every measurement runs in a fresh interpreter so nothing is warm
+in-process.
+
+Usage:
+    python benchmarks/bench_columnar_store.py --users 1000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_utils import Timer, current_rss_mb, peak_rss_mb
+from synthetic_data import MILESTONES_CSV, NOTIFICATIONS_CSV, REWARDS_CSV, write_dataset
+
+CSV_FILES = [NOTIFICATIONS_CSV, MILESTONES_CSV, REWARDS_CSV]
+
+
+def _child(mode, data_dir):
+    import pandas as pd
+    from utils.columnar_store import TABLES, convert_table, load_table
+
+    baseline = current_rss_mb()
+    with Timer() as timer:
+        if mode == 'csv':
+            frames = [pd.read_csv(os.path.join(data_dir, name)) for name in CSV_FILES]
+        elif mode == 'convert':
+            for table in TABLES:
+                convert_table(table, data_dir)
+            frames = []
+        else:
+            frames = [load_table(table, data_dir) for table in TABLES]
+    print(json.dumps({
+        'mode': mode,
+        'seconds': timer.seconds,
+        'rss_delta_mb': current_rss_mb() - baseline,
+        'peak_rss_mb': peak_rss_mb(),
+        'rows': sum(len(f) for f in frames),
+    }))
+
+
+def _run(mode, data_dir):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, '--data-dir', data_dir],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--data-dir', default=None, help='Existing dataset (skips generation)')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.data_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or write_dataset(tmp, args.users)
+        results = [_run('csv', data_dir), _run('convert', data_dir), _run('columnar', data_dir)]
+    for result in results:
+        print(f"{result['mode']:>9}: {result['seconds']:8.3f}s  "
+              f"rss +{result['rss_delta_mb']:8.1f} MB  peak {result['peak_rss_mb']:8.1f} MB")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+COMPACT SCHEMA REPORT
+=====================
+
+Memory of the milestones, rewards-wallet and notification tables as
+``pd.read_csv`` infers them versus the compact store schema
+(utils/columnar_store.py): user ids as int32 codes with a memory-mapped
+lookup, integers narrowed to the smallest type that holds them, statuses
+and types as categoricals.
+
+Also checks that every page computes identical numbers from the compact
+frames. Each page's data work runs once on the inferred frames and once on
+the compact ones, and the results must match exactly:
+
+- Overview: row count, means, totals, histograms and the top savers.
+- Analytics: correlation matrix, K-Means labels and cluster statistics.
+- Predictions: regression metrics and the slider table.
+- Rewards: status and type counts, wallet leaderboard and top earners.
+- User Detail: every row of a sample of users.
+
+Exits with status 1 if any page differs.
+
+Usage:
+    python benchmarks/bench_compact_schema.py --users 200000 --rewards 2000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import Timer
+from synthetic_data import write_dataset
+
+SAMPLE_USERS = 50
+
+
+def _column_report(df):
+    return {column: {'dtype': str(df[column].dtype), 'mb': df[column].memory_usage(index=False, deep=True) / 1024 ** 2}
+            for column in df.columns}
+
+
+def _store_mb(data_dir, name):
+    from utils.columnar_store import open_generation
+
+    generation_dir, _ = open_generation(name, data_dir)
+    return sum(os.path.getsize(os.path.join(generation_dir, entry)) for entry in os.listdir(generation_dir)
+               if entry.endswith('.npy') and not entry.startswith('user_')) / 1024 ** 2
+
+
+def memory_report(inferred, compact, data_dir):
+    """Per table and column: dtype and deep memory in both representations."""
+    report = {}
+    for name in inferred:
+        before, after = _column_report(inferred[name]), _column_report(compact[name])
+        total_before = sum(column['mb'] for column in before.values())
+        total_after = sum(column['mb'] for column in after.values())
+        report[name] = {
+            'rows': len(compact[name]),
+            'inferred_mb': total_before,
+            'compact_mb': total_after,
+            'ratio': total_before / total_after if total_after else None,
+            'store_on_disk_mb': _store_mb(data_dir, name),
+            'columns': {column: {'inferred': before[column], 'compact': after[column]} for column in before},
+        }
+    return report
+
+
+# Page data work, run on either representation
+
+def _overview(tables, work_dir):
+    from utils.overview_aggregates import OverviewAggregates
+
+    overview = OverviewAggregates.from_frame(tables['milestones'])
+    return {
+        'rows': overview.rows,
+        'means': {column: overview.mean(column) for column in overview.sums},
+        'totals': {column: overview.total(column) for column in overview.sums},
+        'histograms': {column: overview.histogram(column) for column in overview.histograms},
+        'leaderboard': overview.leaderboard(),
+    }
+
+
+def _analytics(tables, work_dir):
+    from ml_models.clustering import UserSegmentationModel
+    from utils.streaming_correlation import CorrelationAccumulator
+
+    df = tables['milestones']
+    model = UserSegmentationModel(n_clusters=3)
+    clusters = model.fit_predict(df)
+    return {
+        'correlation': CorrelationAccumulator.from_frame(df).correlation(),
+        'clusters': clusters,
+        'cluster_stats': model.get_cluster_stats(df, clusters),
+    }
+
+
+def _predictions(tables, work_dir):
+    from ml_models.registry import ModelRegistry
+    from ml_models.regression import SavingsPredictionModel, get_prediction_table
+
+    df = tables['milestones']
+    model = SavingsPredictionModel()
+    model.fit(df)
+    table = get_prediction_table(df, ModelRegistry(tempfile.mkdtemp(dir=work_dir)))
+    return {
+        'metrics': model.get_metrics(),
+        'table': table.table,
+        'slider': [table.lookup(value) for value in range(0, 2500, 50)],
+    }
+
+
+def _rewards(tables, work_dir):
+    from utils.overview_aggregates import OverviewAggregates
+    from utils.rewards_index import RewardsIndex
+
+    index = RewardsIndex()
+    index.update(tables['rewards'])
+    overview = OverviewAggregates.from_frame(tables['milestones'])
+    return {
+        'total_points': overview.total('points'),
+        'mean_points': overview.mean('points'),
+        'status_counts': index.status_counts(),
+        'type_counts': index.type_counts(),
+        'wallet_leaderboard': index.leaderboard(10, 'redeemed'),
+        'earners_leaderboard': overview.earners_leaderboard(),
+    }
+
+
+PAGES = {'overview': _overview, 'analytics': _analytics, 'predictions': _predictions, 'rewards': _rewards}
+
+
+def _user_rows(df, user_ids):
+    """Rows of each user, as the User Detail page lists them."""
+    rows = df[df['user_id'].astype(str).isin(user_ids)]
+    return {user_id: group.reset_index(drop=True) for user_id, group in rows.groupby(rows['user_id'].astype(str))}
+
+
+def _plain(value):
+    """Frames with categorical and narrowed columns compared by value."""
+    if isinstance(value, pd.Series):
+        value = value.to_frame()
+    frame = value.reset_index(drop=True)
+    return frame.astype({column: object for column in frame.columns})
+
+
+def first_difference(a, b, path=''):
+    """
+    Path of the first value that differs between two page results.
+
+    Returns:
+        str: Path such as ``histograms.money_saved[1]``, or None if equal
+    """
+    if isinstance(a, dict):
+        if set(a) != set(b):
+            return f"{path} keys"
+        for key in a:
+            found = first_difference(a[key], b[key], f"{path}.{key}" if path else str(key))
+            if found:
+                return found
+        return None
+    if isinstance(a, (list, tuple)):
+        if len(a) != len(b):
+            return f"{path} length"
+        for i, (x, y) in enumerate(zip(a, b)):
+            found = first_difference(x, y, f"{path}[{i}]")
+            if found:
+                return found
+        return None
+    if isinstance(a, (pd.DataFrame, pd.Series)):
+        a, b = _plain(a), _plain(b)
+        if list(a.columns) != list(b.columns) or not a.equals(b):
+            return path
+        return None
+    if isinstance(a, (np.ndarray, pd.Categorical)):
+        a, b = np.asarray(a), np.asarray(b)
+        if a.shape != b.shape or not np.array_equal(a, b, equal_nan=a.dtype.kind == 'f' and b.dtype.kind == 'f'):
+            return path
+        return None
+    if isinstance(a, float) and isinstance(b, float) and np.isnan(a) and np.isnan(b):
+        return None
+    return None if a == b else path
+
+
+def check_pages(inferred, compact, data_dir, work_dir):
+    """
+    Run every page's data work on both representations and compare.
+
+    Returns:
+        dict: Page -> {'identical': bool, 'difference': path or None, timings}
+    """
+    from utils.user_index import USER_TABLES, UserTableIndex
+
+    results = {}
+    for page, function in PAGES.items():
+        with Timer() as before:
+            expected = function(inferred, work_dir)
+        with Timer() as after:
+            actual = function(compact, work_dir)
+        difference = first_difference(expected, actual)
+        results[page] = {'identical': difference is None, 'difference': difference,
+                         'inferred_s': before.seconds, 'compact_s': after.seconds}
+
+    # User Detail reads the per-user index over the store, not a frame
+    rng = np.random.default_rng(0)
+    users = inferred['milestones']['user_id'].astype(str).to_numpy()
+    sample = list(users[rng.integers(0, len(users), SAMPLE_USERS)])
+    difference = None
+    for name in USER_TABLES:
+        expected = _user_rows(inferred[name], sample)
+        index = UserTableIndex.open(name, data_dir)
+        for user_id in sample:
+            rows = index.lookup(user_id)
+            if user_id not in expected:
+                found = None if rows.empty else f"{name}.{user_id}"
+            else:
+                found = first_difference(expected[user_id], rows, f"{name}.{user_id}")
+            difference = difference or found
+    results['user_detail'] = {'identical': difference is None, 'difference': difference, 'users': len(sample)}
+    return results
+
+
+def load_inferred(data_dir):
+    """Tables as ``pd.read_csv`` infers them (id columns read as text, dates parsed)."""
+    from utils.columnar_store import TABLES
+
+    tables = {}
+    for name, table in TABLES.items():
+        text = {column: str for column, encoding in table['columns'].items() if encoding == 'string'}
+        dates = [column for column, encoding in table['columns'].items() if encoding == 'datetime']
+        tables[name] = pd.read_csv(os.path.join(data_dir, table['csv']), dtype=text, parse_dates=dates)
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--rewards', type=int, default=2_000_000)
+    parser.add_argument('--notifications', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    from utils.columnar_store import TABLES, load_table
+
+    results = {'users': args.users, 'rewards_rows': args.rewards, 'notifications_rows': args.notifications}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'data')
+        write_dataset(data_dir, args.users, args.rewards, args.notifications)
+        inferred = load_inferred(data_dir)
+        with Timer() as convert:
+            compact = {name: load_table(name, data_dir) for name in TABLES}
+        results['convert_s'] = convert.seconds
+        results['memory'] = memory_report(inferred, compact, data_dir)
+        results['pages'] = check_pages(inferred, compact, data_dir, tmp)
+    results['identical'] = all(page['identical'] for page in results['pages'].values())
+
+    print(json.dumps(results, indent=2, default=str))
+    sys.exit(0 if results['identical'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+STREAMING CORRELATION BENCHMARK
+===============================
+
+Times CorrelationAccumulator against DataFrame.corr on large milestone
+tables:
+
+- before: DataFrame.corr over the four Analytics columns on every rerun
+- build: one streaming pass over chunks, and per-partition accumulators
+  merged together
+- rerun: producing the Pearson matrix from the accumulator
+- append: folding appended rows in versus recomputing DataFrame.corr
+
+Agreement with DataFrame.corr is checked on small data by
+check_correctness.py (run by run_suite.py); here only the largest
+difference at full size is reported.
+
+Usage:
+    python benchmarks/bench_correlation.py --rows 10000000
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import Timer
+from synthetic_data import milestones_frame
+
+
+def build_frame(rows, columns, chunk_rows=1_000_000):
+    parts = [milestones_frame(min(chunk_rows, rows - start), start=start)[columns]
+             for start in range(0, rows, chunk_rows)]
+    return pd.concat(parts, ignore_index=True)
+
+
+def max_diff(result, reference):
+    return float(np.nanmax(np.abs(result.to_numpy() - reference.to_numpy())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--append', type=int, default=100_000)
+    parser.add_argument('--partitions', type=int, default=8)
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    from utils.streaming_correlation import CORRELATION_COLUMNS, CorrelationAccumulator
+
+    df = build_frame(args.rows, CORRELATION_COLUMNS)
+    tail = milestones_frame(args.append, seed=7, start=args.rows)[CORRELATION_COLUMNS]
+    # Shift the tail so the append visibly moves the means and co-moments
+    tail = tail * 1.5 + 100
+    results = {'rows': args.rows, 'append_rows': args.append}
+
+    with Timer() as timer:
+        reference = df.corr()
+    results['before_corr_s'] = timer.seconds
+
+    with Timer() as timer:
+        streamed = CorrelationAccumulator()
+        for start in range(0, len(df), args.chunk_rows):
+            streamed.update(df.iloc[start:start + args.chunk_rows])
+    results['build_streamed_s'] = timer.seconds
+
+    with Timer() as timer:
+        merged = CorrelationAccumulator()
+        for part in np.array_split(np.arange(len(df)), args.partitions):
+            merged.merge(CorrelationAccumulator.from_frame(df.iloc[part[0]:part[-1] + 1]))
+    results['build_partitions_merged_s'] = timer.seconds
+
+    with Timer() as timer:
+        matrix = streamed.correlation()
+    results['rerun_s'] = timer.seconds
+
+    with Timer() as timer:
+        streamed.update(tail)
+        appended = streamed.correlation()
+    results['append_update_s'] = timer.seconds
+    combined = pd.concat([df, tail], ignore_index=True)
+    with Timer() as timer:
+        appended_reference = combined.corr()
+    results['append_recompute_s'] = timer.seconds
+
+    results['max_diff'] = {
+        'streamed': max_diff(matrix, reference),
+        'partitions_merged': max_diff(merged.correlation(), reference),
+        'after_append': max_diff(appended, appended_reference),
+    }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
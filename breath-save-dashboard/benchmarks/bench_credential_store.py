@@ -0,0 +1,120 @@
+"""
+CREDENTIAL STORE LOAD TEST
+==========================
+
+Measures login latency of the SQLite credential store at 10k, 100k and 1M
+users while parallel threads mix logins with new registrations. The legacy
+users.json full-file scan is measured alongside for the smaller sizes.
+
+Usage:
+    python benchmarks/bench_credential_store.py --users 10000 100000 1000000 --threads 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bench_utils import Timer
+from utils.credential_store import CredentialStore
+
+
+def _hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def _populate(store, n_users):
+    rows = ((f"user{i}", _hash(f"pw{i}")) for i in range(n_users))
+    with store._connect() as conn:
+        conn.executemany("INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)", rows)
+
+
+def _percentiles(latencies):
+    ms = np.asarray(latencies) * 1000
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p99_ms': float(np.percentile(ms, 99))}
+
+
+def run_store(n_users, threads, operations, register_ratio, tmp):
+    store = CredentialStore(os.path.join(tmp, f"users_{n_users}.db"), legacy_json=None)
+    with Timer() as populate:
+        _populate(store, n_users)
+
+    def login(i):
+        user = random.randrange(n_users)
+        start = time.perf_counter()
+        ok = store.get_hash(f"user{user}") == _hash(f"pw{user}")
+        return 'login', time.perf_counter() - start, ok
+
+    def register(i):
+        start = time.perf_counter()
+        ok = store.add_user(f"new{n_users}_{i}", _hash('secret'))
+        return 'register', time.perf_counter() - start, ok
+
+    ops = [register if random.random() < register_ratio else login for _ in range(operations)]
+    with Timer() as run, ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda pair: pair[1](pair[0]), enumerate(ops)))
+
+    logins = [r[1] for r in results if r[0] == 'login']
+    registrations = [r[1] for r in results if r[0] == 'register']
+    return {
+        'backend': 'sqlite',
+        'users': n_users,
+        'populate_seconds': populate.seconds,
+        'ops_per_second': operations / run.seconds,
+        'failed_logins': sum(1 for r in results if r[0] == 'login' and not r[2]),
+        'lost_registrations': sum(1 for r in results if r[0] == 'register' and not r[2]),
+        'stored_users': store.count(),
+        'login': _percentiles(logins),
+        'register': _percentiles(registrations) if registrations else None,
+    }
+
+
+def run_legacy(n_users, operations, tmp):
+    """The previous behaviour: parse the whole users.json for every login."""
+    path = os.path.join(tmp, f"users_{n_users}.json")
+    with open(path, 'w') as f:
+        json.dump({f"user{i}": _hash(f"pw{i}") for i in range(n_users)}, f)
+    latencies = []
+    for _ in range(operations):
+        user = random.randrange(n_users)
+        start = time.perf_counter()
+        with open(path, 'r') as f:
+            users = json.load(f)
+        users.get(f"user{user}") == _hash(f"pw{user}")
+        latencies.append(time.perf_counter() - start)
+    return {'backend': 'json', 'users': n_users, 'login': _percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=20_000)
+    parser.add_argument('--register-ratio', type=float, default=0.1)
+    parser.add_argument('--legacy-max-users', type=int, default=100_000)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_users in args.users:
+            result = run_store(n_users, args.threads, args.operations, args.register_ratio, tmp)
+            results.append(result)
+            print(f"sqlite {n_users:>9,} users: {result['ops_per_second']:>9,.0f} ops/s  "
+                  f"login p50 {result['login']['p50_ms']:.3f} ms  p99 {result['login']['p99_ms']:.3f} ms  "
+                  f"lost registrations {result['lost_registrations']}")
+            if n_users <= args.legacy_max_users:
+                legacy = run_legacy(n_users, min(200, args.operations), tmp)
+                results.append(legacy)
+                print(f"json   {n_users:>9,} users: login p50 {legacy['login']['p50_ms']:.3f} ms  "
+                      f"p99 {legacy['login']['p99_ms']:.3f} ms")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+GOAL FORECAST THROUGHPUT BENCHMARK
+==================================
+
+Users forecast per second by GoalForecaster.forecast (days to the next
+milestone and savings target for every user, as NumPy array operations)
+as the population grows, next to a per-user Python loop doing the same
+arithmetic on the first --loop-users users. The loop's results are
+checked against the batched ones (float32 outputs, so within 1e-3
+relative).
+
+Also times what the Predictions page does with a forecast: the "closest to
+next milestone" leaderboard (first call and memoized rerun), a sorted
+top-100 and a full sort, and the CSV export (--csv, users per second).
+
+Usage:
+    python benchmarks/bench_goal_forecast.py --users 100000 1000000 5000000 --repeat 5
+"""
+
+import argparse
+import io
+import json
+import statistics
+
+import numpy as np
+
+from bench_utils import Timer
+from synthetic_data import milestones_frame
+from ml_models.forecasting import CIGS_MILESTONES, SAVINGS_TARGETS, GoalForecaster
+from ml_models.regression import SavingsPredictionModel
+
+
+def forecast_loop(df, forecaster):
+    """Per-user loop equivalent of GoalForecaster.forecast (baseline)."""
+    days_all = df['total_days'].tolist()
+    avoided_all = df['total_cigs_avoided'].tolist()
+    saved_all = df['money_saved'].tolist()
+    population_rate = sum(avoided_all) / sum(days_all)
+    rows = []
+    for days, avoided, saved in zip(days_all, avoided_all, saved_all):
+        weight = days / (days + forecaster.prior_days)
+        cig_rate = weight * (avoided / days if days else 0.0) + (1 - weight) * population_rate
+        money_rate = weight * (saved / days if days else 0.0) + (1 - weight) * forecaster.coefficient * population_rate
+        milestone = next((m for m in CIGS_MILESTONES if m > avoided), None)
+        target = next((t for t in SAVINGS_TARGETS if t > saved), None)
+        to_milestone = (milestone - avoided) / cig_rate if milestone is not None and cig_rate > 0 else float('nan')
+        to_target = (target - saved) / money_rate if target is not None and money_rate > 0 else float('nan')
+        rows.append((cig_rate, money_rate, to_milestone, to_target))
+    return np.array(rows)
+
+
+def _median_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            result = function()
+        times.append(timer.seconds)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--loop-users', type=int, default=100_000)
+    parser.add_argument('--csv', action='store_true', help="Also time the CSV export")
+    args = parser.parse_args()
+
+    results = []
+    for users in args.users:
+        df = milestones_frame(users)
+        model = SavingsPredictionModel(mode='sufficient_stats')
+        model.fit(df)
+        forecaster = GoalForecaster.from_prediction(model)
+        seconds, forecast = _median_time(lambda: forecaster.forecast(df), args.repeat)
+        result = {
+            'users': users,
+            'forecast_s': seconds,
+            'users_per_s': users / seconds,
+            'forecast_mb': forecast.nbytes / 1024 ** 2,
+            # First calls rank the users; later ones (page reruns) reuse the result
+            'leaderboard_ms': _median_time(lambda: forecast.leaderboard(10), 1)[0] * 1000,
+            'leaderboard_rerun_ms': _median_time(lambda: forecast.leaderboard(10), args.repeat)[0] * 1000,
+            'top100_ms': _median_time(lambda: forecast.sort('days_to_next', n=100), 1)[0] * 1000,
+            'full_sort_ms': _median_time(lambda: forecast.order('days_to_next'), 1)[0] * 1000,
+        }
+
+        # Baseline on a prefix; the population rate must come from the same rows
+        head = df.iloc[:min(users, args.loop_users)]
+        with Timer() as loop:
+            expected = forecast_loop(head, forecaster)
+        batched = forecaster.forecast(head)
+        actual = np.column_stack([batched.columns[name] for name in
+                                  ('cig_rate', 'money_rate', 'days_to_milestone', 'days_to_savings_target')])
+        result['loop_users'] = len(head)
+        result['loop_users_per_s'] = len(head) / loop.seconds
+        result['speedup'] = result['users_per_s'] / result['loop_users_per_s']
+        result['matches_loop'] = bool(np.allclose(actual, expected, rtol=1e-3, equal_nan=True))
+
+        if args.csv:
+            with Timer() as export:
+                forecast.to_csv(io.StringIO())
+            result['csv_s'] = export.seconds
+            result['csv_users_per_s'] = users / export.seconds
+        results.append(result)
+        print(f"{users:>10,} users: {result['users_per_s']:>12,.0f} users/s  "
+              f"(loop {result['loop_users_per_s']:>10,.0f}/s, {result['speedup']:.0f}x)  "
+              f"leaderboard {result['leaderboard_ms']:.1f} ms  matches {result['matches_loop']}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
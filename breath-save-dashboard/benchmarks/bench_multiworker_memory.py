@@ -0,0 +1,187 @@
+"""
+MULTI-WORKER MEMORY BENCHMARK
+=============================
+
+Total memory of N dashboard worker processes serving the same data, each
+doing the data work of every page (wallet counters and leaderboard,
+notification summary, Overview aggregates, Analytics correlation and the
+page column views):
+
+- private: every worker loads the tables itself, as ``get_table_cache``
+  does without BREATHSAVE_SHARED_DIR.
+- shared: one publisher process loads the tables and publishes them
+  (utils/shared_datasets.py); workers attach to the memory-mapped files.
+  The publisher's memory is reported separately and included in the total.
+
+Memory is summed PSS (shared pages divided among the processes mapping
+them) from /proc/<pid>/smaps_rollup, so Linux only. After the shared runs,
+rows are appended to the wallet, a new version is published and every
+worker is asked to switch; the handover time and the removal of the
+superseded version are reported.
+
+Usage:
+    python benchmarks/bench_multiworker_memory.py --users 500000 --rewards 5000000 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_utils import Timer, pss_mb
+from synthetic_data import REWARDS_CSV, write_dataset
+
+
+def _render(cache):
+    """The data work behind every page; returns a summary of what was served."""
+    from utils.data_access import PAGE_COLUMNS
+
+    rewards = cache.get('rewards')
+    rewards.status_counts()
+    rewards.type_counts()
+    rewards.leaderboard()
+    cache.get('notifications').summary()
+    cache.get('milestones')
+    loader = cache.loaders['milestones']
+    loader.overview.leaderboard()
+    loader.correlation.correlation()
+    for tables in PAGE_COLUMNS.values():
+        for table, columns in tables.items():
+            cache.get(table).frame(columns)
+    return {'rewards_rows': int(rewards.rows), 'version': getattr(cache, 'version', None)}
+
+
+def _worker(mode, data_dir, root):
+    from utils.data_cache import TableCache
+    from utils.notification_rollups import NotificationRollupLoader
+    from utils.overview_aggregates import MilestonesLoader
+    from utils.rewards_index import RewardsIndexLoader
+    from utils.shared_datasets import SharedDatasets
+
+    if mode == 'shared':
+        cache = SharedDatasets(root, data_dir)
+    else:
+        cache = TableCache(data_dir, loaders={
+            'notifications': NotificationRollupLoader(),
+            'milestones': MilestonesLoader(),
+            'rewards': RewardsIndexLoader(),
+        })
+    print(json.dumps(_render(cache)), flush=True)
+    # One line per 'refresh' command until the parent closes stdin
+    for _ in sys.stdin:
+        print(json.dumps(_render(cache)), flush=True)
+
+
+def _publisher(data_dir, root):
+    from utils.shared_datasets import DatasetPublisher
+
+    publisher = DatasetPublisher(data_dir, root, grace_seconds=0)
+    print(json.dumps({'version': publisher.refresh()}), flush=True)
+    for _ in sys.stdin:
+        with Timer() as timer:
+            version = publisher.refresh()
+        print(json.dumps({'version': version, 'seconds': timer.seconds,
+                          'versions_on_disk': sorted(e for e in os.listdir(root) if not e.startswith('.') and e != 'CURRENT')}),
+              flush=True)
+
+
+def _spawn(*args):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), *args],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+
+def _ask(process, command=None):
+    if command is not None:
+        process.stdin.write(command + '\n')
+        process.stdin.flush()
+    return json.loads(process.stdout.readline())
+
+
+def _stop(processes):
+    for process in processes:
+        process.stdin.close()
+    for process in processes:
+        process.wait()
+
+
+def _total(usages):
+    return {kind: sum(usage.get(kind, 0.0) for usage in usages) for kind in ('pss', 'anon', 'file')}
+
+
+def _run(mode, n_workers, data_dir, root, handover=False):
+    publisher = None
+    if mode == 'shared':
+        publisher = _spawn('--publisher', data_dir, root)
+        _ask(publisher)
+    with Timer() as startup:
+        workers = [_spawn('--worker', mode, data_dir, root) for _ in range(n_workers)]
+        served = [_ask(worker) for worker in workers]
+    usages = [pss_mb(worker.pid) for worker in workers]
+    result = {'workers': n_workers, 'startup_s': startup.seconds, 'workers_mb': _total(usages)}
+    result['per_worker_pss_mb'] = result['workers_mb']['pss'] / n_workers
+    result['total_pss_mb'] = result['workers_mb']['pss']
+    if publisher is not None:
+        result['publisher_mb'] = _total([pss_mb(publisher.pid)])
+        result['total_pss_mb'] += result['publisher_mb']['pss']
+    result['rewards_rows'] = served[0]['rewards_rows']
+
+    if handover:
+        # Append a few wallet rows and publish them as a new version
+        with open(os.path.join(data_dir, REWARDS_CSV), 'r') as f:
+            f.readline()
+            rows = [f.readline() for _ in range(100)]
+        with open(os.path.join(data_dir, REWARDS_CSV), 'a') as f:
+            f.writelines(rows)
+        published = _ask(publisher, 'refresh')
+        with Timer() as switch:
+            switched = [_ask(worker, 'refresh') for worker in workers]
+        result['handover'] = {
+            'publish_s': published['seconds'],
+            'workers_switch_s': switch.seconds,
+            'all_workers_on_new_version': all(s['version'] == published['version'] for s in switched),
+            'rewards_rows_after': [s['rewards_rows'] for s in switched][0],
+            'versions_on_disk': len(published['versions_on_disk']),
+        }
+    _stop(workers + ([publisher] if publisher else []))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500_000)
+    parser.add_argument('--rewards', type=int, default=5_000_000)
+    parser.add_argument('--notifications', type=int, default=5_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--worker', nargs=3, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--publisher', nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(*args.worker)
+        return
+    if args.publisher:
+        _publisher(*args.publisher)
+        return
+
+    from utils.columnar_store import TABLES, open_generation
+
+    results = {'users': args.users, 'rewards_rows': args.rewards, 'notifications_rows': args.notifications}
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(tmp, args.users, args.rewards, args.notifications)
+        # Convert once up front so workers don't race to write the store
+        for name in TABLES:
+            open_generation(name, tmp)
+        root = os.path.join(tmp, '.shared')
+        for mode in ('private', 'shared'):
+            results[mode] = [_run(mode, n, tmp, root, handover=(mode == 'shared' and n == args.workers[-1]))
+                             for n in args.workers]
+    results['total_pss_mb'] = {mode: {r['workers']: round(r['total_pss_mb'], 1) for r in results[mode]}
+                               for mode in ('private', 'shared')}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+NOTIFICATION DISPATCH BENCHMARK
+===============================
+
+Sustained dispatch rate and scheduling lag of NotificationDispatcher
+(utils/notification_dispatcher.py) with millions of queued notifications.
+
+For each --rows a synthetic schedule is written and its unsent rows are
+loaded into the queue (load time and rows per second are reported). Then:
+
+- Backlog: every notification is already due, so the dispatcher runs flat
+  out into an in-process sink. Reports dispatches per second, the lag of
+  the last rows behind the start of the run, journal flushes, and the time
+  to compact the journal into the CSV. Checks that every unsent row was
+  delivered exactly once and that no unsent row is left after compaction.
+- Paced: the same rows get due times spread evenly over --window seconds
+  starting shortly after the run starts, so the dispatcher sleeps until
+  each due time. Reports lag percentiles (due time to hand-off to the
+  sink); the rate offered is rows / window.
+
+--latency adds a simulated delivery time per batch and --failure-rate
+makes that share of deliveries fail and retry.
+
+Usage:
+    python benchmarks/bench_notification_dispatch.py --rows 1000000 4000000 --window 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bench_utils import Timer
+from synthetic_data import NOTIFICATIONS_CSV, write_notifications
+from utils.notification_dispatcher import (MemorySink, NotificationDispatcher, ScheduleQueue,
+                                           SentFlagJournal, load_pending)
+
+PACED_LEAD_S = 1.0
+
+
+def _dispatcher(pending, journal, args):
+    sink = MemorySink(latency_s=args.latency, failure_rate=args.failure_rate)
+    dispatcher = NotificationDispatcher(ScheduleQueue(pending), sink, journal, concurrency=args.concurrency,
+                                        batch_size=args.batch_size, backoff_s=0.01, max_attempts=20, seed=0)
+    return dispatcher, sink
+
+
+def backlog_run(csv_path, pending, args):
+    """Everything due now: maximum sustained rate, then compaction."""
+    journal = SentFlagJournal(csv_path)
+    dispatcher, sink = _dispatcher(pending, journal, args)
+    summary = asyncio.run(dispatcher.run())
+    ids = sink.delivered_ids()
+    journalled = len(journal)
+    with Timer() as compact:
+        compacted = journal.compact()
+    summary.update({
+        'journalled_rows': journalled,
+        'compact_s': compact.seconds,
+        'compacted_rows': compacted,
+        'exactly_once': bool(len(ids) == len(pending) and len(np.unique(ids)) == len(ids)),
+        'unsent_after_compact': len(load_pending(csv_path)),
+    })
+    return summary
+
+
+def paced_run(pending, args):
+    """Due times spread over the window: lag behind each due time."""
+    rng = np.random.default_rng(0)
+    start = time.time_ns() + int(PACED_LEAD_S * 1e9)
+    pending.due_ns[:] = start + rng.integers(0, int(args.window * 1e9), len(pending))
+    dispatcher, sink = _dispatcher(pending, None, args)
+    summary = asyncio.run(dispatcher.run())
+    summary['offered_per_s'] = len(pending) / args.window
+    summary['delivered_all'] = bool(len(sink.delivered_ids()) == len(pending))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 4_000_000])
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per sink delivery")
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--window', type=float, default=30.0, help="Seconds the paced schedule spans")
+    parser.add_argument('--skip-paced', action='store_true')
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, NOTIFICATIONS_CSV)
+            write_notifications(csv_path, rows, args.users)
+            with Timer() as load:
+                pending = load_pending(csv_path)
+            result = {
+                'rows': rows,
+                'queued': len(pending),
+                'load_s': load.seconds,
+                'load_rows_per_s': rows / load.seconds,
+                'backlog': backlog_run(csv_path, pending, args),
+            }
+            if not args.skip_paced:
+                result['paced'] = paced_run(pending, args)
+        results.append(result)
+
+        backlog = result['backlog']
+        line = (f"{rows:>10,} rows ({len(pending):,} queued): load {load.seconds:.1f}s  "
+                f"backlog {backlog['dispatches_per_s']:>10,.0f}/s  compact {backlog['compact_s']:.2f}s  "
+                f"exactly once {backlog['exactly_once']}")
+        if 'paced' in result:
+            lag = result['paced']['lag']
+            line += (f"  paced {result['paced']['offered_per_s']:,.0f}/s offered: lag p50 {lag['p50_s'] * 1000:.1f} ms "
+                     f"p99 {lag['p99_s'] * 1000:.1f} ms max {lag['max_s'] * 1000:.1f} ms")
+        print(line)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
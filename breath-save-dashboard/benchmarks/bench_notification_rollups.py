@@ -0,0 +1,84 @@
+"""
+NOTIFICATION ROLLUP BENCHMARK
+=============================
+
+Streams a synthetic notification schedule through the chunked rollup
+pipeline and checks that peak memory stays within the configured ingestion
+ceiling plus the per-user rollup state (which scales with users, not
+rows). The default 50M rows (~2.5 GB of CSV) mirrors a multi-GB production
+schedule; use --rows to scale down on a laptop.
+
+Usage:
+    python benchmarks/bench_notification_rollups.py --rows 50000000 --users 1000000 --memory-mb 256
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_utils import Timer, current_rss_mb, peak_rss_mb
+from synthetic_data import NOTIFICATIONS_CSV, write_notifications
+
+
+def _child(path, memory_mb):
+    from utils.notification_rollups import iter_notification_chunks, rollup_notifications
+
+    # Parse a few rows first so lazily imported parser modules are not
+    # counted against the ingestion ceiling
+    next(iter_notification_chunks(path, chunk_rows=10))
+    baseline = current_rss_mb()
+    with Timer() as timer:
+        rollup = rollup_notifications(path, memory_limit_mb=memory_mb)
+    summary = rollup.summary()
+    peak_delta = peak_rss_mb() - baseline
+    state_mb = rollup.nbytes / 1024 ** 2
+    print(json.dumps({
+        'rows': rollup.rows,
+        'users': len(summary),
+        'seconds': timer.seconds,
+        'rows_per_second': rollup.rows / timer.seconds,
+        'peak_rss_delta_mb': peak_delta,
+        'rollup_state_mb': state_mb,
+        'memory_limit_mb': memory_mb,
+        'within_limit': peak_delta <= memory_mb + state_mb,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--memory-mb', type=float, default=256)
+    parser.add_argument('--csv', default=None, help='Existing notifications CSV (skips generation)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.csv, args.memory_mb)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv
+        if path is None:
+            path = os.path.join(tmp, NOTIFICATIONS_CSV)
+            with Timer() as timer:
+                write_notifications(path, args.rows, args.users)
+            print(f"generated {args.rows:,} rows ({os.path.getsize(path) / 1024 ** 3:.2f} GB) "
+                  f"in {timer.seconds:.1f}s")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--csv', path,
+             '--memory-mb', str(args.memory_mb)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(result, indent=2))
+    if not result['within_limit']:
+        sys.exit(f"peak RSS grew {result['peak_rss_delta_mb']:.1f} MB, over the {args.memory_mb} MB "
+                 f"ceiling plus {result['rollup_state_mb']:.1f} MB of rollup state")
+
+
+if __name__ == '__main__':
+    main()
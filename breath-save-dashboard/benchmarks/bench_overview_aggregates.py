@@ -0,0 +1,103 @@
+"""
+OVERVIEW AGGREGATES BENCHMARK
+=============================
+
+Compares the Overview page's per-render work before (means, sums,
+nlargest and px.histogram over every row) and after (figures from the
+precomputed OverviewAggregates arrays), and the cost of folding appended
+rows into the aggregates versus rebuilding them.
+
+Usage:
+    python benchmarks/bench_overview_aggregates.py --users 1000000 --append 10000
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import Timer
+from synthetic_data import milestones_frame
+
+
+def render_before(df):
+    """Data and figure work of the original overview_page."""
+    import plotly.express as px
+
+    df['total_cigs_avoided'].mean()
+    df['money_saved'].sum()
+    df['total_days'].mean()
+    payload = 0
+    for column in ('money_saved', 'total_cigs_avoided'):
+        payload += len(px.histogram(df, x=column, nbins=40).to_json())
+    top = df.nlargest(15, 'money_saved')[['user_id', 'money_saved', 'total_cigs_avoided']]
+    payload += len(px.bar(top, x='user_id', y='money_saved').to_json())
+    return payload
+
+
+def render_after(overview):
+    """Data and figure work of overview_page with precomputed aggregates."""
+    import plotly.express as px
+
+    overview.mean('total_cigs_avoided')
+    overview.total('money_saved')
+    overview.mean('total_days')
+    payload = 0
+    for column in ('money_saved', 'total_cigs_avoided'):
+        centers, counts, width = overview.histogram(column)
+        payload += len(px.bar(x=centers, y=counts).update_traces(width=width).to_json())
+    top = pd.DataFrame(overview.leaderboard(), columns=['user_id', 'money_saved', 'total_cigs_avoided'])
+    payload += len(px.bar(top, x='user_id', y='money_saved').to_json())
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--append', type=int, default=10_000)
+    args = parser.parse_args()
+
+    import copy
+
+    from utils.overview_aggregates import OverviewAggregates
+
+    width = len(str(args.users + args.append))
+    df = milestones_frame(args.users, width=width)
+    tail = milestones_frame(args.append, start=args.users, width=width)
+    render_before(df.head(100))  # warm up plotly
+
+    results = {'users': args.users, 'append_rows': args.append}
+    with Timer() as timer:
+        payload = render_before(df)
+    results['before_render_s'], results['before_payload_kb'] = timer.seconds, payload / 1e3
+
+    with Timer() as timer:
+        overview = OverviewAggregates.from_frame(df)
+    results['build_s'] = timer.seconds
+    with Timer() as timer:
+        payload = render_after(overview)
+    results['after_render_s'], results['after_payload_kb'] = timer.seconds, payload / 1e3
+
+    with Timer() as timer:
+        updated = copy.deepcopy(overview)
+        updated.update(tail)
+    results['append_update_s'] = timer.seconds
+    combined = pd.concat([df, tail], ignore_index=True)
+    with Timer() as timer:
+        rebuilt = OverviewAggregates.from_frame(combined)
+    results['append_rebuild_s'] = timer.seconds
+
+    reference = combined.nlargest(15, 'money_saved')
+    results['leaderboard_matches'] = [row['user_id'] for row in updated.leaderboard()] == list(reference['user_id'])
+    results['sum_matches'] = bool(np.isclose(updated.total('money_saved'), combined['money_saved'].sum()))
+    results['counts_match_rebuild'] = int(updated.histogram('money_saved')[1].sum()) == len(combined) \
+        == int(rebuilt.histogram('money_saved')[1].sum())
+
+    for name, value in results.items():
+        print(f"{name:>22}: {value:,.4f}" if isinstance(value, float) else f"{name:>22}: {value}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+PASSWORD HASHING BENCHMARK
+==========================
+
+Reports sustained logins per second and p50/p99 login latency for each
+cost preset, with concurrent clients submitting verifications to the
+bounded hashing pool. Use the results to choose parameters for the
+deployment hardware.
+
+Usage:
+    python benchmarks/bench_password_hashing.py --clients 16 --logins 200
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bench_utils import Timer
+from utils import password_hashing
+from utils.password_hashing import COST_PRESETS, HashingPool, hash_password
+
+
+def run_preset(name, clients, logins, workers):
+    if name == 'legacy-sha256':
+        import hashlib
+        stored = hashlib.sha256(b'correct horse').hexdigest()
+    else:
+        stored = hash_password('correct horse', COST_PRESETS[name])
+    pool = HashingPool(max_workers=workers)
+
+    def login(_):
+        start = time.perf_counter()
+        ok = pool.verify('correct horse', stored)
+        return time.perf_counter() - start, ok
+
+    with Timer() as timer, ThreadPoolExecutor(clients) as client_pool:
+        results = list(client_pool.map(login, range(logins)))
+    latencies = np.array([r[0] for r in results]) * 1000
+    return {
+        'preset': name,
+        'params': COST_PRESETS.get(name),
+        'workers': workers,
+        'clients': clients,
+        'logins_per_second': logins / timer.seconds,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'all_verified': all(r[1] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--presets', nargs='+', default=['legacy-sha256', *COST_PRESETS])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=password_hashing.MAX_WORKERS)
+    args = parser.parse_args()
+
+    results = []
+    for name in args.presets:
+        result = run_preset(name, args.clients, args.logins, args.workers)
+        results.append(result)
+        print(f"{name:>14}: {result['logins_per_second']:>10,.1f} logins/s  "
+              f"p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
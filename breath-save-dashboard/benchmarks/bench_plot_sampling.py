@@ -0,0 +1,98 @@
+"""
+PLOT DATA REDUCTION BENCHMARK
+=============================
+
+Builds the Analytics page's 3D segmentation scatter and the Predictions
+page's savings scatter for synthetic user bases and reports, per reduction
+mode, the server time (reduction + figure build + JSON serialization) and
+the JSON payload Streamlit sends to the browser. "full" is the original
+behaviour and is skipped above --full-max rows.
+
+Usage:
+    python benchmarks/bench_plot_sampling.py --sizes 10000 1000000 10000000
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import Timer
+from synthetic_data import milestones_frame
+
+FEATURES_3D = ['total_cigs_avoided', 'money_saved', 'total_cigs_smoked']
+FEATURES_2D = ['total_cigs_avoided', 'money_saved']
+
+
+def build_frame(rows, chunk_rows=1_000_000):
+    """Milestones with a skewed synthetic cluster column."""
+    parts = [milestones_frame(min(chunk_rows, rows - start), start=start, width=len(str(rows)))
+             for start in range(0, rows, chunk_rows)]
+    df = pd.concat(parts, ignore_index=True)
+    df['cluster'] = np.random.default_rng(7).choice(3, rows, p=[0.7, 0.25, 0.05])
+    return df
+
+
+def scatter_3d(df, mode):
+    import plotly.express as px
+    from utils.plot_sampling import reduce_plot_data
+
+    plot_df, info = reduce_plot_data(df, FEATURES_3D, by='cluster', mode=mode)
+    binned = info['mode'] == 'binned'
+    fig = px.scatter_3d(plot_df, x=FEATURES_3D[0], y=FEATURES_3D[1], z=FEATURES_3D[2], color='cluster',
+                        size='count' if binned else None,
+                        hover_data=['count'] if binned else ['user_id', 'points'])
+    return fig, info
+
+
+def scatter_2d(df, mode):
+    import plotly.graph_objects as go
+    from utils.plot_sampling import reduce_plot_data
+
+    plot_df, info = reduce_plot_data(df, FEATURES_2D, mode=mode)
+    size = 8
+    if info['mode'] == 'binned':
+        size = 4 + 16 * np.sqrt(plot_df['count'] / plot_df['count'].max())
+    fig = go.Figure(go.Scatter(x=plot_df[FEATURES_2D[0]], y=plot_df[FEATURES_2D[1]],
+                               mode='markers', marker=dict(size=size)))
+    return fig, info
+
+
+def measure(build, df, mode):
+    with Timer() as timer:
+        fig, info = build(df, mode)
+        payload = fig.to_json()
+    return {'mode': info['mode'], 'points': info['points'], 'server_s': timer.seconds,
+            'payload_mb': len(payload) / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--full-max', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # Warm up plotly so import and template loading are not timed
+    scatter_3d(build_frame(100), 'full')[0].to_json()
+    scatter_2d(build_frame(100), 'full')[0].to_json()
+
+    results = []
+    for rows in args.sizes:
+        df = build_frame(rows)
+        for chart, build in (('analytics_3d', scatter_3d), ('predictions_2d', scatter_2d)):
+            modes = ['auto', 'density', 'binned'] + (['stratified'] if chart == 'analytics_3d' else [])
+            if rows <= args.full_max:
+                modes.insert(0, 'full')
+            for mode in modes:
+                result = {'rows': rows, 'chart': chart, 'requested': mode, **measure(build, df, mode)}
+                results.append(result)
+                print(f"{rows:>10,} {chart:>15} {mode:>10} -> {result['mode']:>10}: "
+                      f"{result['points']:>9,} points  {result['server_s']:7.3f} s  "
+                      f"{result['payload_mb']:9.2f} MB")
+        del df
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+PRECOMPUTE SCHEDULER BENCHMARK
+==============================
+
+Request-path latency of the Analytics and Predictions data work when the
+milestones data changes:
+
+- before: the first render after a change fits K-Means, the cluster
+  statistics and the savings regression inline (cold model registry).
+- after: the PrecomputeScheduler (utils/precompute.py) fits them on a
+  thread pool; renders read the newest published results. Render latency
+  is sampled continuously while the jobs run, both on a fresh start (no
+  results yet) and after rows are appended (the previous model assigns
+  the new rows until the refit is published).
+
+Also reports job durations, the time until every job is published, and
+how many jobs ran when many sessions ask for a rebuild of the same
+version at once (deduplication).
+
+Usage:
+    python benchmarks/bench_precompute.py --users 1000000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from bench_utils import Timer
+from synthetic_data import MILESTONES_CSV, milestones_frame, write_milestones
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return {'p50_ms': float(np.percentile(samples, 50)), 'max_ms': float(samples.max()), 'renders': len(samples)}
+
+
+def render(cache, scheduler, overlay):
+    """Analytics and Predictions data work as the pages do it; True if served from a model."""
+    from pages.analytics import _assign_clusters
+    from utils.data_access import PAGE_COLUMNS
+
+    scheduler.check()
+    view = cache.get('milestones').frame(PAGE_COLUMNS['analytics']['milestones'])
+    segmentation = scheduler.latest('segmentation')
+    clusters = _assign_clusters(view, overlay, segmentation)
+    if clusters is not None:
+        stats = scheduler.latest('cluster_stats')
+        if stats is None or stats.version != view.attrs['version']:
+            segmentation.value['model'].get_cluster_stats(view, clusters)
+    prediction = scheduler.latest('prediction')
+    return clusters is not None and prediction is not None
+
+
+def sample_until_published(cache, scheduler, interval=0.05):
+    """Rerun one session until every job is published for the current version."""
+    from utils.data_access import SessionOverlay
+
+    overlay = SessionOverlay()
+    samples, served = [], 0
+    with Timer() as total:
+        while True:
+            with Timer() as timer:
+                served += render(cache, scheduler, overlay)
+            samples.append(timer.seconds)
+            published = scheduler.status()['published']
+            if all(published.get(name, {}).get('version') == scheduler.version
+                   for name in ('segmentation', 'cluster_stats', 'prediction', 'overview', 'correlation')):
+                break
+            time.sleep(interval)
+    return {'render': percentiles(samples), 'renders_with_model': served, 'all_published_s': total.seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--append', type=int, default=10_000, help="Rows appended to trigger a rebuild")
+    parser.add_argument('--sessions', type=int, default=32, help="Concurrent rebuild requests for deduplication")
+    args = parser.parse_args()
+
+    from ml_models.clustering import UserSegmentationModel
+    from ml_models.registry import ModelRegistry
+    from ml_models.regression import get_prediction_table
+    from utils.data_access import PAGE_COLUMNS
+    from utils.data_cache import TableCache
+    from utils.overview_aggregates import MilestonesLoader
+    from utils.precompute import MIN_INTERVALS, PRECOMPUTE_JOBS, PrecomputeScheduler
+    # Imported up front so the first sampled render is not charged for importing streamlit
+    import pages.analytics  # noqa: F401
+
+    results = {'users': args.users, 'appended_rows': args.append}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, MILESTONES_CSV)
+        write_milestones(path, args.users)
+
+        cache = TableCache(tmp, loaders={'milestones': MilestonesLoader()})
+        registry = ModelRegistry(os.path.join(tmp, 'before'))
+        analytics = cache.get('milestones').frame(PAGE_COLUMNS['analytics']['milestones'])
+        predictions = cache.get('milestones').frame(PAGE_COLUMNS['predictions']['milestones'])
+        with Timer() as before:
+            model = UserSegmentationModel(n_clusters=3)
+            clusters = model.fit_predict_cached(analytics, registry)
+            model.get_cluster_stats(analytics, clusters)
+            get_prediction_table(predictions, registry)
+        results['before'] = {'first_render_after_change_ms': before.seconds * 1000}
+
+        cache = TableCache(tmp, loaders={'milestones': MilestonesLoader()})
+        scheduler = PrecomputeScheduler(cache, ModelRegistry(os.path.join(tmp, 'after')), interval=0.2).start()
+        results['after_cold_start'] = sample_until_published(cache, scheduler)
+
+        new_rows = milestones_frame(args.append, seed=7, start=args.users, width=len(str(args.users + args.append)))
+        with open(path, 'a', newline='') as f:
+            new_rows.to_csv(f, index=False, header=False)
+        results['after_append'] = sample_until_published(cache, scheduler)
+        status = scheduler.status()
+        results['job_durations'] = status['durations']
+
+        # Many sessions notice the same change at once
+        with open(path, 'a', newline='') as f:
+            milestones_frame(10, seed=8, start=args.users + args.append).to_csv(f, index=False, header=False)
+        submitted_before = status['counters']['submitted']
+        barrier = threading.Barrier(args.sessions)
+
+        def request():
+            barrier.wait()
+            scheduler.check()
+            for name in ('segmentation', 'prediction'):
+                scheduler.submit(name, scheduler.version)
+
+        threads = [threading.Thread(target=request) for _ in range(args.sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        scheduler.wait()
+        counters = scheduler.status()['counters']
+        results['deduplication'] = {
+            'sessions': args.sessions,
+            'jobs_run': counters['submitted'] - submitted_before,
+            # Rate-limited jobs (the sweep) already ran for the cold start
+            'jobs_per_version': len(PRECOMPUTE_JOBS) - len(MIN_INTERVALS),
+            'deduplicated_requests': counters['deduplicated'],
+            'failed': counters['failed'],
+        }
+        scheduler.stop()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
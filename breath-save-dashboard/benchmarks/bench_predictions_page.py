@@ -0,0 +1,98 @@
+"""
+PREDICTIONS PAGE LATENCY BENCHMARK
+==================================
+
+Times the model work the Predictions page does between a slider movement
+and the render: "before" refits the regression, rebuilds the curve and
+calls sklearn's predict for the slider value on every rerun (the original
+behaviour); "after" reads the precomputed prediction table from the model
+registry and answers the slider from its lookup table. The first "after"
+rerun on a cold registry is reported separately.
+
+Usage:
+    python benchmarks/bench_predictions_page.py --users 1000000 --moves 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import Timer
+from synthetic_data import MILESTONES_CSV, write_milestones
+
+
+def rerun_before(df, cigs_goal):
+    """Model work of the original predictions_page for one rerun."""
+    from ml_models.regression import SavingsPredictionModel
+
+    model = SavingsPredictionModel()
+    model.fit(df)
+    model.get_prediction_range(max_value=df['total_cigs_avoided'].max(), num_points=100)
+    model.get_metrics()
+    return model.predict(cigs_goal)[0]
+
+
+def rerun_after(df, cigs_goal, registry):
+    """Model work of predictions_page with the prediction table."""
+    from ml_models.regression import get_prediction_table
+
+    table = get_prediction_table(df, registry)
+    return table.lookup(cigs_goal)
+
+
+def time_moves(rerun, goals):
+    latencies = []
+    predictions = []
+    for goal in goals:
+        with Timer() as timer:
+            predictions.append(rerun(int(goal)))
+        latencies.append(timer.seconds * 1000)
+    latencies = np.array(latencies)
+    return predictions, {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--moves', type=int, default=200)
+    args = parser.parse_args()
+
+    from ml_models.registry import ModelRegistry
+    import ml_models.regression  # noqa: F401  (keep import time out of the timings)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, MILESTONES_CSV)
+        write_milestones(csv_path, args.users)
+        df = pd.read_csv(csv_path)
+        registry = ModelRegistry(os.path.join(tmp, 'models'))
+        slider_max = int(df['total_cigs_avoided'].max())
+        goals = np.random.default_rng(0).integers(0, slider_max // 50 + 1, args.moves) * 50
+
+        with Timer() as cold:
+            rerun_after(df, 500, registry)
+        before, before_stats = time_moves(lambda goal: rerun_before(df, goal), goals)
+        after, after_stats = time_moves(lambda goal: rerun_after(df, goal, registry), goals)
+
+    results = {
+        'users': args.users,
+        'moves': args.moves,
+        'before': before_stats,
+        'after_cold_ms': cold.seconds * 1000,
+        'after': after_stats,
+        'max_abs_diff': float(np.max(np.abs(np.array(before) - np.array(after)))),
+    }
+    for name in ('before', 'after'):
+        print(f"{name:>7}: p50 {results[name]['p50_ms']:10.3f} ms  p99 {results[name]['p99_ms']:10.3f} ms")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
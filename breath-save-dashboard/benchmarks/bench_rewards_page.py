@@ -0,0 +1,137 @@
+"""
+REWARDS PAGE BENCHMARK
+======================
+
+Times the Rewards page's data and figure work on a large wallet:
+
+- before: boolean masks, value_counts and px.pie over the raw wallet frame,
+  plus sum/mean/nlargest over milestones, on every render (the original
+  behaviour). The raw-frame pie is skipped above --pie-max rows, where its
+  payload no longer fits comfortably in memory.
+- after: the page reading RewardsIndex counters and OverviewAggregates.
+
+Also reports the index build time, memory of the index versus the wallet
+frame, and status-change latency (the first change builds the reward id
+lookup).
+
+Usage:
+    python benchmarks/bench_rewards_page.py --rows 20000000 --users 1000000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from bench_utils import Timer, peak_rss_mb
+from synthetic_data import MILESTONES_CSV, REWARDS_CSV, write_milestones, write_rewards
+
+
+def render_before(milestones_df, rewards_df, pie_max):
+    """Data and figure work of the original rewards_page."""
+    import plotly.express as px
+
+    milestones_df['points'].sum()
+    len(rewards_df[rewards_df['redemption_status'] == 'redeemed'])
+    len(rewards_df[rewards_df['redemption_status'] == 'pending'])
+    milestones_df['points'].mean()
+    payload = 0
+    if len(rewards_df) <= pie_max:
+        payload += len(px.pie(rewards_df, names='redemption_status').to_json())
+    counts = rewards_df['reward_type'].value_counts()
+    payload += len(px.bar(x=counts.index, y=counts.values).to_json())
+    milestones_df.nlargest(10, 'points')[['user_id', 'points', 'money_saved']]
+    return payload
+
+
+def render_after(overview, rewards_index):
+    """Data and figure work of rewards_page with precomputed views."""
+    import plotly.express as px
+
+    overview.total('points')
+    rewards_index.status_count('redeemed')
+    rewards_index.status_count('pending')
+    overview.mean('points')
+    status = rewards_index.status_counts()
+    payload = len(px.pie(names=status.index, values=status.values).to_json())
+    counts = rewards_index.type_counts()
+    payload += len(px.bar(x=counts.index, y=counts.values).to_json())
+    pd.DataFrame(overview.earners_leaderboard())
+    rewards_index.leaderboard(10, 'redeemed')
+    return payload
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return {'p50_ms': float(np.percentile(samples, 50)), 'p99_ms': float(np.percentile(samples, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000_000)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--renders', type=int, default=20)
+    parser.add_argument('--pie-max', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    from utils.columnar_store import convert_table, load_arrays, load_table
+    from utils.overview_aggregates import OverviewAggregates
+    from utils.rewards_index import RewardsIndex
+
+    results = {'rows': args.rows, 'users': args.users}
+    with tempfile.TemporaryDirectory() as tmp:
+        write_milestones(os.path.join(tmp, MILESTONES_CSV), args.users)
+        write_rewards(os.path.join(tmp, REWARDS_CSV), args.rows, args.users)
+        with Timer() as timer:
+            convert_table('rewards', tmp)
+        results['convert_to_store_s'] = timer.seconds
+        results['convert_peak_rss_mb'] = peak_rss_mb()
+        milestones_df = load_table('milestones', tmp)
+        sample = pd.DataFrame({'redemption_status': ['redeemed', 'pending'], 'reward_type': ['a', 'b']})
+        render_before(milestones_df.head(100), sample, args.pie_max)  # warm up plotly
+
+        with Timer() as timer:
+            index = RewardsIndex.from_store(tmp)
+            overview = OverviewAggregates.from_frame(milestones_df)
+        results['after_build_s'] = timer.seconds
+        results['index_mb'] = index.nbytes / 1024 ** 2
+        after = []
+        for _ in range(args.renders):
+            with Timer() as timer:
+                render_after(overview, index)
+            after.append(timer.seconds)
+        results['after_render'] = percentiles(after)
+
+        ids = load_arrays('rewards', tmp, columns=['reward_id'])['reward_id']
+        rng = np.random.default_rng(0)
+        with Timer() as timer:
+            index.set_status(ids[0], 'redeemed')
+        results['first_status_change_s'] = timer.seconds
+        changes = []
+        for row in rng.integers(0, len(ids), 1000):
+            with Timer() as timer:
+                index.set_status(ids[row], 'pending' if row % 2 else 'redeemed')
+            changes.append(timer.seconds)
+        results['status_change'] = percentiles(changes)
+        del ids, index
+
+        with Timer() as timer:
+            rewards_df = load_table('rewards', tmp)
+        results['before_load_s'] = timer.seconds
+        results['wallet_frame_mb'] = rewards_df.memory_usage(deep=True).sum() / 1024 ** 2
+        before = []
+        for _ in range(max(1, args.renders // 4)):
+            with Timer() as timer:
+                render_before(milestones_df, rewards_df, args.pie_max)
+            before.append(timer.seconds)
+        results['before_render'] = percentiles(before)
+        results['before_includes_raw_pie'] = args.rows <= args.pie_max
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+SEGMENTATION MODE BENCHMARK
+===========================
+
+Compares full-batch K-Means (UserSegmentationModel) with the chunked
+mini-batch mode (StreamingSegmentationModel) as the number of users grows:
+fit time, peak traced memory during the fit, inertia and sampled
+silhouette.
+
+Usage:
+    python benchmarks/bench_segmentation_modes.py --rows 100000 1000000 5000000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from bench_utils import Timer
+from synthetic_data import MILESTONES_CSV, write_milestones
+from ml_models.clustering import StreamingSegmentationModel, UserSegmentationModel
+
+
+def measure(model, df):
+    tracemalloc.start()
+    with Timer() as timer:
+        clusters = model.fit_predict(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'fit_seconds': timer.seconds,
+        'peak_traced_mb': peak / 1024 ** 2,
+        **model.quality(df, clusters),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000])
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, MILESTONES_CSV)
+            write_milestones(path, rows)
+            df = pd.read_csv(path)
+            for name, model in [('full_batch', UserSegmentationModel()), ('minibatch', StreamingSegmentationModel())]:
+                result = {'mode': name, **measure(model, df)}
+                results.append(result)
+                print(f"{rows:>10,} rows {name:>10}: {result['fit_seconds']:7.2f}s  "
+                      f"peak {result['peak_traced_mb']:8.1f} MB  inertia {result['inertia']:14,.0f}  "
+                      f"silhouette {result['silhouette']:.3f}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
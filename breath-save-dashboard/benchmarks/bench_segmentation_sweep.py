@@ -0,0 +1,124 @@
+"""
+SEGMENTATION SWEEP BENCHMARK
+============================
+
+Wall time of SegmentationSweep (K-Means for every k and seed, plus a
+sampled silhouette per k) with the fits in this process versus on process
+pools of increasing size. Every pool worker memory-maps one scaled feature
+matrix; the report lists its size and, for a pool started the same way,
+how much of the mapping each worker has resident after reading all of it
+and how much of that is private (a copy) rather than shared page cache.
+
+Also checks that every worker count picks the same best seed, inertia and
+silhouette for each k, and prints the per-k table of the largest pool.
+
+The speed-up is bounded by the CPU count (reported): on one CPU the pool
+only adds process start-up.
+
+Usage:
+    python benchmarks/bench_segmentation_sweep.py --rows 200000 --workers 1 2 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bench_utils import Timer
+from synthetic_data import milestones_frame
+from ml_models import clustering
+from ml_models.clustering import FEATURES, SegmentationSweep
+
+
+def _mapping_mb(path):
+    """Resident and private-dirty MB of this process's mapping of ``path`` (Linux only)."""
+    sizes, inside = {'Rss:': 0, 'Private_Dirty:': 0}, False
+    with open('/proc/self/smaps', 'r') as f:
+        for line in f:
+            fields = line.split()
+            if fields and '-' in fields[0] and not fields[0].endswith(':'):
+                inside = fields[-1] == path
+            elif inside and fields[0] in sizes:
+                sizes[fields[0]] += int(fields[1])
+    return {'matrix_rss_mb': sizes['Rss:'] / 1024, 'matrix_private_dirty_mb': sizes['Private_Dirty:'] / 1024}
+
+
+def _touch_matrix(_):
+    """In a pool worker: read the whole shared matrix, then report memory."""
+    from bench_utils import current_rss_mb
+
+    checksum = float(np.asarray(clustering._sweep_matrix).sum())
+    return {'pid': os.getpid(), 'checksum': checksum, 'rss_mb': current_rss_mb(),
+            **_mapping_mb(clustering._sweep_matrix.filename)}
+
+
+def sharing_check(df, workers):
+    """
+    Start a pool as the sweep does and read the matrix in every worker.
+
+    The matrix should be fully resident in every worker as clean pages of
+    the file mapping (shared page cache) with no private dirty pages, i.e.
+    no worker holds its own copy.
+
+    Returns:
+        list: Per worker: checksum, rss_mb, matrix_rss_mb and
+            matrix_private_dirty_mb
+    """
+    X = SegmentationSweep().scaler.fit_transform(df[FEATURES].to_numpy(dtype=float))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scaled.npy')
+        np.save(path, X)
+        context = multiprocessing.get_context('forkserver')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=clustering._init_sweep_worker,
+                                 initargs=(path, 1)) as pool:
+            reports = list(pool.map(_touch_matrix, range(4 * workers)))
+    return list({report.pop('pid'): report for report in reports}.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--ks', type=int, nargs='+', default=list(clustering.DEFAULT_SWEEP_KS))
+    parser.add_argument('--seeds', type=int, default=len(clustering.DEFAULT_SWEEP_SEEDS))
+    args = parser.parse_args()
+
+    df = milestones_frame(args.rows)
+    results = {
+        'rows': args.rows,
+        'cpus': os.cpu_count(),
+        'fits': len(args.ks) * args.seeds,
+        'shared_matrix_mb': args.rows * len(FEATURES) * np.dtype(float).itemsize / 1024 ** 2,
+        'runs': [],
+    }
+    reference = None
+    for workers in args.workers:
+        sweep = SegmentationSweep(ks=args.ks, seeds=range(args.seeds), max_workers=workers)
+        with Timer() as timer:
+            sweep.fit(df)
+        table = sweep.table()
+        key = table[['k', 'best_seed', 'inertia', 'silhouette']]
+        if reference is None:
+            reference = key
+        run = {
+            'workers': workers,
+            'wall_s': timer.seconds,
+            'fit_s_total': float(table['fit_s_total'].sum()),
+            'speedup': results['runs'][0]['wall_s'] / timer.seconds if results['runs'] else 1.0,
+            'identical_to_first': bool(np.allclose(key.to_numpy(), reference.to_numpy(), equal_nan=True)),
+        }
+        results['runs'].append(run)
+        print(f"{workers:>2} workers: {timer.seconds:7.2f}s  speed-up {run['speedup']:.2f}x  "
+              f"identical {run['identical_to_first']}")
+    results['table'] = table.to_dict(orient='records')
+    results['worker_memory_mb'] = sharing_check(df, max(args.workers))
+    results['best_k'] = sweep.best_k()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+SESSION MEMORY BENCHMARK
+========================
+
+Process memory with many concurrent dashboard sessions, each rendering
+Settings, Overview, Analytics and Predictions (data work only, one thread
+per session as in Streamlit). Every mode runs in a fresh interpreter:
+
+- shared: the original app; every rerun gets the whole cached milestones
+  frame and Analytics writes ``cluster`` into it, so sessions see each
+  other's columns.
+- copy: the same, made safe by copying the frame per session. Run with
+  fewer sessions (--copy-sessions); per-session cost is extrapolated.
+- views: the data-access layer (utils/data_access.py). Pages get read-only
+  views of their declared columns and cluster labels go into a per-session
+  overlay.
+
+Also checks that Settings loads no table and Overview only the aggregate
+columns, and that writes into a shared view raise.
+
+Usage:
+    python benchmarks/bench_session_memory.py --users 1000000 --sessions 100
+"""
+
+import argparse
+import ctypes
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_utils import Timer, peak_rss_mb, rss_breakdown_mb
+from synthetic_data import MILESTONES_CSV, write_milestones
+
+PAGES = ['settings', 'overview', 'analytics', 'predictions']
+
+
+def _release_free_memory():
+    """Return freed heap to the OS so RSS reflects what sessions still hold."""
+    gc.collect()
+    try:
+        # glibc keeps per-thread arenas after the session threads finish
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _session(mode, cache, loader, registry, barrier):
+    """Render every page once for a new session; returns its session state."""
+    from ml_models.clustering import UserSegmentationModel
+    from ml_models.regression import get_prediction_table
+    from utils.data_access import PAGE_COLUMNS, SessionOverlay
+
+    state = {'overlay': SessionOverlay()}
+    barrier.wait()
+    for page in PAGES:
+        if mode == 'views':
+            views = {table: cache.get(table).frame(columns) for table, columns in PAGE_COLUMNS[page].items()}
+            milestones = views.get('milestones')
+        else:
+            # Original app: load_data() on every rerun returns the whole frame
+            milestones = cache.get('milestones')
+            if mode == 'copy':
+                milestones = state.setdefault('frame', milestones.copy())
+        if page == 'overview' and mode == 'views':
+            loader.overview.leaderboard()
+        elif page == 'analytics':
+            model = UserSegmentationModel(n_clusters=3)
+            if mode == 'views':
+                clusters = state['overlay'].get(milestones, 'cluster')
+                if clusters is None:
+                    clusters = model.fit_predict_cached(milestones, registry)
+                    state['overlay'].set(milestones, 'cluster', clusters)
+                state['overlay'].apply(milestones)
+            else:
+                milestones['cluster'] = model.fit_predict_cached(milestones, registry)
+        elif page == 'predictions':
+            get_prediction_table(milestones, registry)
+    return state
+
+
+def _child(mode, data_dir, registry_root, sessions):
+    from ml_models.registry import ModelRegistry
+    from utils.data_cache import StoreTableLoader, TableCache
+    from utils.overview_aggregates import MilestonesLoader
+
+    registry = ModelRegistry(registry_root)
+    results = {'mode': mode, 'sessions': sessions}
+    if mode == 'views':
+        # A process that only served Settings, then only Overview
+        loader = MilestonesLoader()
+        cache = TableCache(data_dir, loaders={'milestones': loader})
+        results['settings_loads'] = sorted(cache._entries)
+        table = cache.get('milestones')
+        loader.overview
+        results['overview_loads'] = table.loaded_columns
+        del table
+        loader = MilestonesLoader()
+        cache = TableCache(data_dir, loaders={'milestones': loader})
+    else:
+        loader = StoreTableLoader('milestones')
+        cache = TableCache(data_dir, loaders={'milestones': loader})
+    cache.get('milestones')
+    _release_free_memory()
+    baseline = rss_breakdown_mb()
+
+    barrier = threading.Barrier(sessions)
+    with Timer() as timer:
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            states = list(pool.map(lambda _: _session(mode, cache, loader, registry, barrier), range(sessions)))
+    _release_free_memory()
+    after = rss_breakdown_mb()
+    results['seconds'] = timer.seconds
+    results['rss_mb'] = after
+    results['rss_growth_mb'] = {kind: after[kind] - baseline[kind] for kind in after}
+    results['anon_per_session_mb'] = results['rss_growth_mb']['anon'] / sessions
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    if mode == 'views':
+        view = cache.get('milestones').frame(['money_saved'])
+        try:
+            view['money_saved'].to_numpy()[0] = -1
+            results['shared_values_writable'] = True
+        except ValueError:
+            results['shared_values_writable'] = False
+        results['loaded_columns'] = cache.get('milestones').loaded_columns
+        # Referenced, not owned: sessions hold the registry's cached assignment array
+        results['overlay_referenced_mb_per_session'] = states[0]['overlay'].nbytes / 1024 ** 2
+        results['cluster_leaks_across_sessions'] = 'cluster' in cache.get('milestones').frame().columns
+    else:
+        results['cluster_leaks_across_sessions'] = 'cluster' in cache.get('milestones').columns
+    print(json.dumps(results))
+
+
+def _run(mode, data_dir, registry_root, sessions):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, data_dir, registry_root, str(sessions)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--copy-sessions', type=int, default=10)
+    parser.add_argument('--child', nargs=4, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, data_dir, registry_root, sessions = args.child
+        _child(mode, data_dir, registry_root, int(sessions))
+        return
+
+    from ml_models.clustering import FEATURES, UserSegmentationModel
+    from ml_models.registry import ModelRegistry
+    from utils.columnar_store import load_table
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_milestones(os.path.join(tmp, MILESTONES_CSV), args.users)
+        registry_root = os.path.join(tmp, 'models')
+        # Fit once up front so every mode loads the same model from the registry
+        UserSegmentationModel(n_clusters=3).fit_predict_cached(load_table('milestones', tmp, FEATURES),
+                                                               ModelRegistry(registry_root))
+        results = {'users': args.users}
+        for mode, sessions in (('shared', args.sessions), ('copy', args.copy_sessions), ('views', args.sessions)):
+            results[mode] = _run(mode, tmp, registry_root, sessions)
+        results['copy']['anon_for_sessions_mb_estimate'] = results['copy']['anon_per_session_mb'] * args.sessions
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
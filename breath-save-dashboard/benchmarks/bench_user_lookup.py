@@ -0,0 +1,104 @@
+"""
+USER LOOKUP BENCHMARK
+=====================
+
+Times a per-user drill-down (one user's milestones, wallet rows and
+notification history) on a large dataset:
+
+- before: boolean mask on ``user_id`` over each fully loaded table frame
+  (a linear scan per table).
+- after: binary search in the persisted user_id index plus a gather of the
+  user's rows from the memory-mapped store (utils/user_index.py), timed
+  both as column arrays and wrapped in DataFrames (per-table times are
+  for DataFrames).
+
+Also reports the one-off index build per table and process memory around
+the indexed lookups, split into anonymous memory and pages of the
+memory-mapped store (shared page cache, reclaimable).
+
+Usage:
+    python benchmarks/bench_user_lookup.py --users 1000000 --rewards 5000000 --notifications 10000000
+"""
+
+import argparse
+import json
+import tempfile
+
+import numpy as np
+
+from bench_utils import Timer, rss_breakdown_mb
+from synthetic_data import write_dataset
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return {'p50_ms': float(np.percentile(samples, 50)), 'p99_ms': float(np.percentile(samples, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--rewards', type=int, default=5_000_000)
+    parser.add_argument('--notifications', type=int, default=10_000_000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--scans', type=int, default=10)
+    args = parser.parse_args()
+
+    from utils.columnar_store import load_table, open_generation
+    from utils.data_cache import TableCache
+    from utils.user_index import USER_TABLES, UserIndexLoader, lookup_user
+
+    results = {'users': args.users, 'rewards_rows': args.rewards, 'notifications_rows': args.notifications}
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(tmp, args.users, args.rewards, args.notifications)
+        cache = TableCache(tmp, loaders={name: UserIndexLoader(name) for name in USER_TABLES})
+        build = {}
+        for name in USER_TABLES:
+            with Timer() as convert:
+                open_generation(name, tmp)
+            with Timer() as index:
+                cache.get(name)
+            build[name] = {'convert_s': convert.seconds, 'index_s': index.seconds}
+        results['build'] = build
+
+        rng = np.random.default_rng(0)
+        keys = cache.get('milestones').keys
+        users = [str(keys[i]) for i in rng.integers(0, len(keys), args.lookups)]
+        lookup_user(cache, users[0])  # warm up
+        rss_before = rss_breakdown_mb()
+        per_table = {name: [] for name in USER_TABLES}
+        arrays, frame_times = [], []
+        for user_id in users:
+            with Timer() as timer:
+                lookup_user(cache, user_id, frames=False)
+            arrays.append(timer.seconds)
+            with Timer() as total:
+                for name in USER_TABLES:
+                    with Timer() as timer:
+                        cache.get(name).lookup(user_id)
+                    per_table[name].append(timer.seconds)
+            frame_times.append(total.seconds)
+        results['after'] = {name: percentiles(samples) for name, samples in per_table.items()}
+        results['after']['all_tables_arrays'] = percentiles(arrays)
+        results['after']['all_tables_frames'] = percentiles(frame_times)
+        rss_after = rss_breakdown_mb()
+        results['after']['rss_growth_mb'] = {kind: rss_after[kind] - rss_before[kind] for kind in rss_after}
+        results['after_rss_mb'] = rss_after
+
+        with Timer() as timer:
+            frames = {name: load_table(name, tmp) for name in USER_TABLES}
+        results['before_load_s'] = timer.seconds
+        results['frames_mb'] = sum(df.memory_usage(deep=True).sum() for df in frames.values()) / 1024 ** 2
+        scans = []
+        for user_id in users[:args.scans]:
+            with Timer() as timer:
+                for df in frames.values():
+                    df[df['user_id'] == user_id]
+            scans.append(timer.seconds)
+        results['before'] = {'all_tables': percentiles(scans)}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
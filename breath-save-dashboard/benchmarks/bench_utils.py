@@ -0,0 +1,102 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+Benchmarks are run from the breath-save-dashboard directory, e.g.
+``python benchmarks/bench_columnar_store.py``.
+"""
+
+import os
+import resource
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, else peak)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def rss_breakdown_mb():
+    """
+    Anonymous and file-backed resident memory in MB (Linux only).
+
+    Pages of memory-mapped files count towards RSS but live in the shared
+    page cache and can be dropped under pressure; anonymous pages cannot.
+
+    Returns:
+        dict: ``anon`` and ``file`` in MB (empty if unavailable)
+    """
+    fields = {'RssAnon:': 'anon', 'RssFile:': 'file'}
+    breakdown = {}
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                key = line.split(None, 1)[0]
+                if key in fields:
+                    breakdown[fields[key]] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return breakdown
+
+
+def pss_mb(pid):
+    """
+    Proportional set size of a process in MB (Linux only).
+
+    Shared pages (e.g. of a file mapped by several processes) are divided
+    among the processes mapping them, so summing PSS over processes gives
+    their total memory without counting shared pages twice.
+
+    Args:
+        pid (int): Process id
+
+    Returns:
+        dict: ``pss``, ``anon``, ``file`` and ``shmem`` in MB (empty if unavailable)
+    """
+    fields = {'Pss:': 'pss', 'Pss_Anon:': 'anon', 'Pss_File:': 'file', 'Pss_Shmem:': 'shmem'}
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                key = line.split(None, 1)[0]
+                if key in fields:
+                    usage[fields[key]] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return usage
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    # VmHWM resets on exec; ru_maxrss is inherited from the parent process
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class Timer:
+    """Context manager that records elapsed wall time in ``seconds``."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        return False
@@ -0,0 +1,355 @@
+"""
+CORRECTNESS CHECKS
+==================
+
+Fast equivalence checks for the optimized code paths, on small synthetic
+data so they run in seconds. Each check compares a fast path with the
+straightforward computation it replaces and fails on any difference
+beyond floating-point tolerance:
+
+- regression: SavingsPredictionModel(mode='sufficient_stats') fit, and
+  partial_fit plus merge over several batch sizes, against sklearn
+  (coefficient, intercept, R² and predict; metrics are plain floats).
+- correlation: CorrelationAccumulator built by update (several chunk
+  sizes), by merging partitions (several partition counts) and after an
+  append, against DataFrame.corr and DataFrame.cov, including the NaN
+  layout for a constant column.
+- density_sample: every occupied grid cell keeps at least one row and the
+  sample size stays near the target.
+- append_during_load: rows appended to a CSV while the table cache is
+  loading it are counted once, whether the loader already read them or
+  not, for the plain, shared and rollup loaders.
+- concurrent_convert: threads converting the same CSV revision at once
+  (table loads and user index builds) all get the complete table.
+- columnar_ids: zero-padded user ids (and digit-only categories) come back
+  from the columnar store and from appended rows exactly as written.
+- blank_ints: blank cells in integer columns are stored and parsed as
+  NaN, and the Overview aggregates and savings model skip them like
+  DataFrame.mean and a fit on the complete rows.
+- shared_append_text: text appended to a shared table keeps its full
+  length when it is longer than every stored value.
+- shared_generation: a worker attaching to a published version still reads
+  the milestones after the store removed that version's generation.
+
+run_suite.py runs these before timing anything. Exits with status 1 if
+any check fails.
+
+Usage:
+    python benchmarks/check_correctness.py
+    python benchmarks/check_correctness.py --checks regression
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import traceback
+
+import numpy as np
+
+from bench_utils import Timer
+from synthetic_data import milestones_frame
+
+ROWS = 20_000
+BATCH_SIZES = [7, 100, 1000, ROWS]
+RTOL = 1e-9
+
+
+def check_regression():
+    from ml_models.regression import SavingsPredictionModel
+
+    df = milestones_frame(ROWS)
+    reference = SavingsPredictionModel()
+    reference.fit(df)
+    expected = reference.get_metrics()
+    x = np.linspace(0, 5000, 101)
+
+    fitted = SavingsPredictionModel(mode='sufficient_stats')
+    fitted.fit(df)
+    candidates = {'fit': fitted}
+    for batch_size in BATCH_SIZES:
+        batches = SavingsPredictionModel(mode='sufficient_stats')
+        shards = [SavingsPredictionModel(mode='sufficient_stats') for _ in range(3)]
+        for number, start in enumerate(range(0, ROWS, batch_size)):
+            batch = df.iloc[start:start + batch_size]
+            batches.partial_fit(batch)
+            shards[number % 3].partial_fit(batch)
+        for shard in shards[1:]:
+            shards[0].merge(shard)
+        candidates[f"partial_fit[{batch_size}]"] = batches
+        candidates[f"merge[{batch_size}]"] = shards[0]
+
+    for model in [reference, *candidates.values()]:
+        metrics = model.get_metrics()
+        for key in ('r2_score', 'coefficient', 'intercept'):
+            assert type(metrics[key]) is float, f"{model.mode} {key} is {type(metrics[key]).__name__}"
+    for name, model in candidates.items():
+        metrics = model.get_metrics()
+        for key in ('r2_score', 'coefficient', 'intercept'):
+            np.testing.assert_allclose(metrics[key], expected[key], rtol=RTOL, err_msg=f"{name} {key}")
+        np.testing.assert_allclose(model.predict(x), reference.predict(x), rtol=RTOL, err_msg=f"{name} predict")
+        np.testing.assert_allclose(model.predict(1234.0), reference.predict(1234.0), rtol=RTOL,
+                                   err_msg=f"{name} predict scalar")
+
+
+def check_correlation():
+    import pandas as pd
+    from utils.streaming_correlation import CORRELATION_COLUMNS, CorrelationAccumulator
+
+    df = milestones_frame(ROWS)[CORRELATION_COLUMNS]
+    # Shifted so the append visibly moves the means and co-moments
+    tail = milestones_frame(1_000, seed=7, start=ROWS)[CORRELATION_COLUMNS] * 1.5 + 100
+    reference = df.corr().to_numpy()
+
+    for chunk_rows in (13, 97, 1000, ROWS):
+        streamed = CorrelationAccumulator()
+        for start in range(0, ROWS, chunk_rows):
+            streamed.update(df.iloc[start:start + chunk_rows])
+        np.testing.assert_allclose(streamed.correlation().to_numpy(), reference, rtol=0, atol=RTOL,
+                                   err_msg=f"update in chunks of {chunk_rows}")
+        streamed.update(tail)
+        np.testing.assert_allclose(streamed.correlation().to_numpy(),
+                                   pd.concat([df, tail], ignore_index=True).corr().to_numpy(),
+                                   rtol=0, atol=RTOL, err_msg=f"append after chunks of {chunk_rows}")
+
+    for partitions in (2, 5, 17):
+        merged = CorrelationAccumulator()
+        for part in np.array_split(np.arange(ROWS), partitions):
+            merged.merge(CorrelationAccumulator.from_frame(df.iloc[part[0]:part[-1] + 1]))
+        np.testing.assert_allclose(merged.correlation().to_numpy(), reference, rtol=0, atol=RTOL,
+                                   err_msg=f"merge of {partitions} partitions")
+        np.testing.assert_allclose(merged.covariance().to_numpy(), df.cov().to_numpy(), rtol=RTOL,
+                                   err_msg=f"covariance of {partitions} partitions")
+
+    small = df.head(1000).assign(points=1)
+    np.testing.assert_array_equal(CorrelationAccumulator.from_frame(small).correlation().isna().to_numpy(),
+                                  small.corr().isna().to_numpy(), err_msg="constant column NaN layout")
+
+
+def check_density_sample():
+    from utils.plot_sampling import GRID_BINS, _grid_codes, density_sample
+
+    columns = ['total_days', 'total_cigs_avoided', 'money_saved']
+    df = milestones_frame(200_000)
+    for max_points in (500, 2_000, 20_000):
+        sample = density_sample(df, columns, max_points=max_points)
+        codes, _ = _grid_codes(df[columns].to_numpy(dtype=float), GRID_BINS)
+        kept = np.zeros(len(df), dtype=bool)
+        kept[df.index.get_indexer(sample.index)] = True
+        missing = len(np.setdiff1d(np.unique(codes), codes[kept]))
+        assert missing == 0, f"max_points={max_points}: {missing} occupied cells lost every row"
+        target = max(max_points, len(np.unique(codes)))
+        assert len(sample) <= 1.2 * target, f"max_points={max_points}: kept {len(sample)} rows"
+
+
+def check_append_during_load():
+    from synthetic_data import NOTIFICATIONS_CSV, write_milestones, write_notifications
+    from utils.columnar_store import TABLES
+    from utils.data_access import SharedTableLoader
+    from utils.data_cache import StoreTableLoader, TableCache
+    from utils.notification_rollups import NotificationRollupLoader
+
+    users = 50
+    row = ','.join(['user_late', '10', '1', '50', '12.5', '1', '100']) + '\n'
+    notification = 'n_late,user_late,craving_alert,2024-01-01 08:00:00,1\n'
+    cases = [('milestones', StoreTableLoader, row, len),
+             ('milestones', SharedTableLoader, row, lambda value: value.rows),
+             ('notifications', NotificationRollupLoader, notification, lambda value: value.rows)]
+    for name, loader_class, line, count in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, TABLES[name]['csv'])
+            if name == 'milestones':
+                write_milestones(path, users)
+            else:
+                write_notifications(os.path.join(tmp, NOTIFICATIONS_CSV), 200, users)
+
+            class AppendingLoader(loader_class):
+                # Another writer appends while the table is loading
+                def load(self, data_dir):
+                    with open(path, 'a') as f:
+                        f.write(line)
+                    return super().load(data_dir)
+
+            cache = TableCache(tmp, loaders={name: AppendingLoader(name) if name == 'milestones'
+                                             else AppendingLoader()})
+            with open(path, 'rb') as f:
+                # Lines before the load; the header stands in for the row appended during it
+                expected = sum(1 for _ in f)
+            counts = [count(cache.get(name)) for _ in range(2)]
+            label = f"{name} {loader_class.__name__}"
+            assert counts == [expected, expected], f"{label}: {counts} rows, expected {expected}"
+            assert cache.stats()['partial_reloads'] == 0, f"{label}: rows read during the load parsed again"
+
+
+def check_concurrent_convert():
+    from synthetic_data import MILESTONES_CSV, write_milestones
+    from utils.columnar_store import load_table
+    from utils.user_index import UserTableIndex
+
+    users = 100_000
+    for _ in range(2):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_milestones(os.path.join(tmp, MILESTONES_CSV), users)
+            errors = []
+
+            def load(index):
+                try:
+                    if index:
+                        assert UserTableIndex.open('milestones', tmp).n_users == users
+                    else:
+                        assert len(load_table('milestones', tmp)) == users
+                except Exception as e:
+                    errors.append(repr(e))
+
+            threads = [threading.Thread(target=load, args=(number % 2,)) for number in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert not errors, f"concurrent conversion failed: {errors[0]}"
+
+
+def check_columnar_ids():
+    from utils.columnar_store import TABLES, load_table, parse_rows
+
+    ids = ['00012', '12', '0', '000', '007']
+    columns = list(TABLES['milestones']['columns'])
+    rows = [f"{user_id},10,1,50,12.5,1,100" for user_id in ids]
+    rewards_columns = list(TABLES['rewards']['columns'])
+    rewards_rows = [f"R{number},{user_id},0{number},100,01,2024-01-0{number + 1}"
+                    for number, user_id in enumerate(ids)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, header, lines in (('milestones', columns, rows), ('rewards', rewards_columns, rewards_rows)):
+            with open(os.path.join(tmp, TABLES[name]['csv']), 'w') as f:
+                f.write(','.join(header) + '\n' + '\n'.join(lines) + '\n')
+        stored = load_table('milestones', tmp)
+        rewards = load_table('rewards', tmp)
+    appended = parse_rows('milestones', '\n'.join(rows).encode(), columns)
+
+    assert list(stored['user_id'].astype(str)) == ids, f"store: {list(stored['user_id'].astype(str))}"
+    assert list(appended['user_id'].astype(str)) == ids, f"appended rows: {list(appended['user_id'].astype(str))}"
+    assert list(rewards['user_id'].astype(str)) == ids, f"rewards store: {list(rewards['user_id'].astype(str))}"
+    assert list(rewards['reward_type'].astype(str)) == [f"0{number}" for number in range(len(ids))], \
+        f"category: {list(rewards['reward_type'].astype(str))}"
+
+
+def check_blank_ints():
+    from ml_models.regression import SavingsPredictionModel
+    from utils.columnar_store import TABLES, load_table, parse_rows
+    from utils.overview_aggregates import SUMMARY_COLUMNS, OverviewAggregates
+
+    columns = list(TABLES['milestones']['columns'])
+    rows = ['u1,10,1,50,12.5,1,100', 'u2,,2,,13.5,2,', 'u3,30,3,70,20.0,,300']
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, TABLES['milestones']['csv']), 'w') as f:
+            f.write(','.join(columns) + '\n' + '\n'.join(rows) + '\n')
+        stored = load_table('milestones', tmp)
+    appended = parse_rows('milestones', '\n'.join(rows).encode(), columns)
+    for label, df in (('store', stored), ('appended rows', appended)):
+        assert list(df['total_days'].isna()) == [False, True, False], f"{label}: {list(df['total_days'])}"
+        assert df['total_cigs_smoked'].dtype.kind == 'i', f"{label}: total_cigs_smoked is {df['total_cigs_smoked'].dtype}"
+
+    overview = OverviewAggregates.from_frame(stored)
+    for column in SUMMARY_COLUMNS:
+        assert np.isclose(overview.mean(column), stored[column].mean()), \
+            f"mean {column}: {overview.mean(column)} vs {stored[column].mean()}"
+    complete = stored.dropna(subset=['total_cigs_avoided', 'money_saved'])
+    coefficient, intercept = np.polyfit(complete['total_cigs_avoided'], complete['money_saved'], 1)
+    for mode in ('sufficient_stats', 'sklearn'):
+        model = SavingsPredictionModel(mode=mode)
+        model.fit(stored)
+        predicted = float(model.predict(100)[0])
+        assert np.isclose(predicted, coefficient * 100 + intercept), \
+            f"{mode} fit with blank cells predicts {predicted}, expected {coefficient * 100 + intercept}"
+
+
+def check_shared_append_text():
+    from utils.columnar_store import TABLES, parse_rows
+    from utils.data_access import SharedTable
+
+    # Columns not in TABLES are stored as fixed-width text
+    columns = list(TABLES['milestones']['columns']) + ['note']
+    notes = ['ab', 'a much longer note']
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, TABLES['milestones']['csv']), 'w') as f:
+            f.write(','.join(columns) + f"\nu1,10,1,50,12.5,1,100,{notes[0]}\n")
+        table = SharedTable('milestones', tmp)
+        table.append(parse_rows('milestones', f"u2,10,1,50,12.5,1,100,{notes[1]}\n".encode(), columns))
+        combined = list(table.frame(['note'])['note'])
+    assert combined == notes, f"notes: {combined}"
+
+
+def check_shared_generation():
+    import time
+
+    from synthetic_data import MILESTONES_CSV, write_dataset, write_milestones
+    from utils.columnar_store import GENERATION_GRACE_SECONDS, _remove_superseded, open_generation
+    from utils.shared_datasets import DatasetPublisher, SharedDatasets
+
+    users = 500
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(tmp, users)
+        publisher = DatasetPublisher(tmp)
+        version = publisher.refresh()
+        # The CSV is rewritten and the store drops the published generation after its grace period
+        write_milestones(os.path.join(tmp, MILESTONES_CSV), users + 1, seed=7)
+        generation_dir, schema = open_generation('milestones', tmp)
+        for now in (None, time.time() + GENERATION_GRACE_SECONDS + 1):
+            _remove_superseded(os.path.dirname(generation_dir), schema['signature'], now)
+        worker = SharedDatasets(publisher.root, tmp)
+        try:
+            milestones = worker.get('milestones')
+        except FileNotFoundError as e:
+            raise AssertionError(f"attaching to the published version failed: {e}")
+        assert worker.version == version, f"attached {worker.version}, expected {version}"
+        assert len(milestones.frame()) == users, f"{len(milestones.frame())} rows, expected {users}"
+
+
+CHECKS = {
+    'regression': check_regression,
+    'correlation': check_correlation,
+    'density_sample': check_density_sample,
+    'append_during_load': check_append_during_load,
+    'concurrent_convert': check_concurrent_convert,
+    'columnar_ids': check_columnar_ids,
+    'blank_ints': check_blank_ints,
+    'shared_append_text': check_shared_append_text,
+    'shared_generation': check_shared_generation,
+}
+
+
+def run_checks(names=None):
+    """
+    Run checks by name (default: all).
+
+    Returns:
+        dict: Check -> {'ok': bool, 'seconds': float, 'error': message or None}
+    """
+    results = {}
+    for name, check in CHECKS.items():
+        if names and name not in names:
+            continue
+        error = None
+        with Timer() as timer:
+            try:
+                check()
+            except AssertionError as e:
+                error = str(e).strip() or traceback.format_exc(limit=2)
+        results[name] = {'ok': error is None, 'seconds': timer.seconds, 'error': error}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', nargs='+', choices=sorted(CHECKS), default=None)
+    args = parser.parse_args()
+
+    results = run_checks(args.checks)
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if all(result['ok'] for result in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
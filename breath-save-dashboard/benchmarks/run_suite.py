@@ -0,0 +1,540 @@
+"""
+BENCHMARK SUITE
+===============
+
+Runs a fixed set of cases against one synthetic dataset (see
+synthetic_data.py) and writes the timings as JSON, so that runs at the same
+scale can be compared to catch regressions. No browser is involved: page
+cases do the data work a page does before it builds its charts.
+
+Cases (select with --cases, prefix match):
+
+- load.*: the original CSV read, conversion into the columnar store, and
+  the table cache cold (fresh process) and warm (rerun, nothing changed).
+- model.*: UserSegmentationModel.fit_predict and get_cluster_stats,
+  SavingsPredictionModel.fit and predict, GoalForecaster.forecast (ops/s
+  is users forecast per second).
+- auth.*: password hashing, registration, login and password change
+  against a temporary credential database.
+- page.*: Overview, Analytics, Predictions, Rewards and User Detail data
+  work.
+
+The correctness checks in check_correctness.py run first; the suite exits
+with status 1 without timing anything if one fails (--skip-checks skips
+them).
+
+Each case is run ``--repeat`` times after one untimed warm-up run (except
+cases that measure a cold start) and reports min, median and max seconds
+plus the change in resident memory. ``--compare`` reads an earlier results
+file and flags cases whose median got slower by more than ``--threshold``
+(and by at least ``--min-delta`` seconds); the exit status is 1 if any did.
+
+Scales (users / wallet rows / notification rows):
+
+    small    10k / 30k / 30k
+    medium   100k / 1M / 1M
+    large    1M / 10M / 10M
+    xlarge   5M / 20M / 30M
+
+Usage:
+    python benchmarks/run_suite.py --scale small --out results.json
+    python benchmarks/run_suite.py --scale small --compare results.json
+    python benchmarks/run_suite.py --scale large --data-dir /tmp/breathsave-large --cases page. model.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench_utils import Timer, current_rss_mb, peak_rss_mb
+from check_correctness import run_checks
+from synthetic_data import MILESTONES_CSV, NOTIFICATIONS_CSV, REWARDS_CSV, write_dataset
+
+SCALES = {
+    'small': {'users': 10_000, 'rewards': 30_000, 'notifications': 30_000},
+    'medium': {'users': 100_000, 'rewards': 1_000_000, 'notifications': 1_000_000},
+    'large': {'users': 1_000_000, 'rewards': 10_000_000, 'notifications': 10_000_000},
+    'xlarge': {'users': 5_000_000, 'rewards': 20_000_000, 'notifications': 30_000_000},
+}
+# Written next to the generated CSVs so --data-dir can be reused
+MANIFEST = 'suite_dataset.json'
+AUTH_USERS = 5
+LOOKUP_USERS = 100
+DEFAULT_THRESHOLD = 0.25
+# Sub-millisecond cases jitter by more than the threshold; ignore smaller changes
+DEFAULT_MIN_DELTA_S = 0.001
+
+
+class Case:
+    """One benchmark: ``run(ctx, arg)`` is timed, ``setup(ctx)`` is not."""
+
+    def __init__(self, name, run, setup=None, ops=1, warmup=True):
+        """
+        Args:
+            name (str): Case name, e.g. ``model.savings.fit``
+            run (callable): Timed function of (ctx, setup result)
+            setup (callable): Untimed function of ctx run before every repeat
+            ops (int or callable): Operations per run (or function of ctx),
+                for ops/s
+            warmup (bool): Run once untimed first (off for cold-start cases)
+        """
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.ops = ops
+        self.warmup = warmup
+
+
+class Context:
+    """State shared between cases; expensive inputs are built on first use."""
+
+    def __init__(self, data_dir, work_dir):
+        self.data_dir = data_dir
+        self.work_dir = work_dir
+        self._values = {}
+
+    def get(self, key, build):
+        if key not in self._values:
+            self._values[key] = build(self)
+        return self._values[key]
+
+    def table_cache(self):
+        from utils.data_cache import TableCache
+        from utils.notification_rollups import NotificationRollupLoader
+        from utils.overview_aggregates import MilestonesLoader
+        from utils.rewards_index import RewardsIndexLoader
+
+        # Same loaders as get_table_cache in utils/data_loader.py
+        return TableCache(self.data_dir, loaders={
+            'notifications': NotificationRollupLoader(),
+            'milestones': MilestonesLoader(),
+            'rewards': RewardsIndexLoader(),
+        })
+
+    def cache(self):
+        return self.get('cache', Context.table_cache)
+
+    def page_frame(self, page):
+        from utils.data_access import PAGE_COLUMNS
+
+        return self.cache().get('milestones').frame(PAGE_COLUMNS[page]['milestones'])
+
+    def registry(self, name):
+        from ml_models.registry import ModelRegistry
+
+        return ModelRegistry(tempfile.mkdtemp(prefix=f'{name}-', dir=self.work_dir))
+
+
+# load.*
+
+def _read_csvs(ctx, arg):
+    import pandas as pd
+
+    # What load_data() did before the columnar store: parse every CSV
+    return [len(pd.read_csv(os.path.join(ctx.data_dir, name)))
+            for name in (MILESTONES_CSV, REWARDS_CSV, NOTIFICATIONS_CSV)]
+
+
+def _drop_store(ctx):
+    from utils.columnar_store import STORE_DIR
+
+    shutil.rmtree(os.path.join(ctx.data_dir, STORE_DIR), ignore_errors=True)
+
+
+def _convert_store(ctx, arg):
+    from utils.columnar_store import TABLES, convert_table
+
+    for name in TABLES:
+        convert_table(name, ctx.data_dir)
+
+
+def _cold_cache(ctx, arg):
+    cache = ctx.table_cache()
+    for name in ('milestones', 'rewards', 'notifications'):
+        cache.get(name)
+    return cache
+
+
+def _warm_cache(ctx, arg):
+    cache = ctx.cache()
+    for name in ('milestones', 'rewards', 'notifications'):
+        cache.get(name)
+
+
+# model.*
+
+def _fit_segmentation(ctx, arg):
+    from ml_models.clustering import UserSegmentationModel
+
+    model = UserSegmentationModel(n_clusters=3)
+    return model, model.fit_predict(ctx.page_frame('analytics'))
+
+
+def _segmentation(ctx):
+    return _fit_segmentation(ctx, None)
+
+
+def _cluster_stats(ctx, arg):
+    model, clusters = ctx.get('segmentation', _segmentation)
+    return model.get_cluster_stats(ctx.page_frame('analytics'), clusters)
+
+
+def _fit_savings(ctx, arg):
+    from ml_models.regression import SavingsPredictionModel
+
+    model = SavingsPredictionModel()
+    model.fit(ctx.page_frame('predictions'))
+    return model
+
+
+def _predict_savings(ctx, arg):
+    model = ctx.get('savings', lambda ctx: _fit_savings(ctx, None))
+    return model.predict(ctx.page_frame('predictions')['total_cigs_avoided'].to_numpy())
+
+
+def _forecast_goals(ctx, arg):
+    from ml_models.forecasting import GoalForecaster
+
+    model = ctx.get('savings', lambda ctx: _fit_savings(ctx, None))
+    return GoalForecaster.from_prediction(model).forecast(ctx.page_frame('predictions'))
+
+
+# auth.*
+
+def _credential_store(ctx):
+    from utils import credential_store
+
+    # auth.py uses the process-wide store; point it at a scratch database
+    credential_store._store = credential_store.CredentialStore(
+        os.path.join(ctx.work_dir, 'users.db'), legacy_json=None)
+    return credential_store._store
+
+
+def _hash_passwords(ctx, arg):
+    from utils.auth import hash_password
+
+    return [hash_password(f"password-{i}") for i in range(AUTH_USERS)]
+
+
+def _new_usernames(ctx):
+    ctx.get('credentials', _credential_store)
+    batch = next(ctx.get('auth_batches', lambda ctx: itertools.count(1)))
+    return [f"bench_{batch}_{i}" for i in range(AUTH_USERS)]
+
+
+def _register(ctx, usernames):
+    from utils.auth import register_user
+
+    for username in usernames:
+        assert register_user(username, f"pw-{username}")[0]
+
+
+def _registered_users(ctx):
+    usernames = _new_usernames(ctx)
+    _register(ctx, usernames)
+    return usernames
+
+
+def _verify(ctx, usernames):
+    from utils.auth import verify_user
+
+    for username in usernames:
+        assert verify_user(username, f"pw-{username}")
+
+
+def _change_password(ctx, usernames):
+    from utils.auth import update_password
+
+    for username in usernames:
+        # Changes to the same password so every repeat can log in again
+        assert update_password(username, f"pw-{username}", f"pw-{username}")[0]
+
+
+# page.*
+
+def _overview_page(ctx, arg):
+    ctx.cache().get('milestones')
+    overview = ctx.cache().loaders['milestones'].overview
+    metrics = (overview.rows, overview.mean('total_cigs_avoided'), overview.total('money_saved'),
+               overview.mean('total_days'))
+    histograms = [overview.histogram(column) for column in ('money_saved', 'total_cigs_avoided')]
+    return metrics, histograms, overview.leaderboard()
+
+
+def _analytics_page(ctx, arg):
+    from pages.analytics import _assign_clusters
+    from utils.data_access import SessionOverlay
+    from utils.plot_sampling import reduce_plot_data
+    from utils.precompute import PublishedResult
+
+    view = ctx.page_frame('analytics')
+    model, clusters = ctx.get('segmentation', _segmentation)
+    overlay = SessionOverlay()
+    segmentation = PublishedResult('segmentation', view.attrs.get('version'), 1,
+                                   {'model': model, 'clusters': clusters}, 0.0)
+    _assign_clusters(view, overlay, segmentation)
+    plot_df, sampling = reduce_plot_data(overlay.apply(view), ['total_cigs_avoided', 'money_saved', 'total_cigs_smoked'],
+                                         by='cluster')
+    ctx.cache().get('milestones')
+    return plot_df, ctx.cache().loaders['milestones'].correlation.correlation()
+
+
+def _fresh_registry(ctx):
+    ctx.page_frame('predictions')
+    return ctx.registry('predictions')
+
+
+def _predictions_page(ctx, registry):
+    from ml_models.regression import get_prediction_table
+
+    # Fresh registry per repeat: measures the first render after a data change
+    table = get_prediction_table(ctx.page_frame('predictions'), registry)
+    return [table.lookup(value) for value in range(0, 2500, 50)]
+
+
+def _rewards_page(ctx, arg):
+    cache = ctx.cache()
+    rewards = cache.get('rewards')
+    cache.get('milestones')
+    overview = cache.loaders['milestones'].overview
+    return (overview.total('points'), rewards.status_count('redeemed'), rewards.status_count('pending'),
+            overview.mean('points'), rewards.status_counts(), rewards.type_counts(),
+            overview.earners_leaderboard(), rewards.leaderboard(10, 'redeemed'))
+
+
+def _user_index_cache(ctx):
+    from utils.data_cache import TableCache
+    from utils.user_index import USER_TABLES, UserIndexLoader
+
+    return TableCache(ctx.data_dir, loaders={name: UserIndexLoader(name) for name in USER_TABLES})
+
+
+def _lookup_users(ctx):
+    users = ctx.cache().get('milestones').frame(['user_id'])['user_id']
+    rng = np.random.default_rng(0)
+    return [users.iloc[i] for i in rng.integers(0, len(users), LOOKUP_USERS)]
+
+
+def _user_detail_page(ctx, arg):
+    from utils.user_index import lookup_user
+
+    cache = ctx.get('user_index', _user_index_cache)
+    for user_id in ctx.get('lookup_users', _lookup_users):
+        lookup_user(cache, user_id)
+
+
+CASES = [
+    Case('load.csv_read', _read_csvs, warmup=False),
+    Case('load.store_convert', _convert_store, setup=_drop_store, warmup=False),
+    Case('load.table_cache_cold', _cold_cache, warmup=False),
+    Case('load.table_cache_warm', _warm_cache),
+    Case('model.segmentation.fit_predict', _fit_segmentation),
+    Case('model.segmentation.cluster_stats', _cluster_stats),
+    Case('model.savings.fit', _fit_savings),
+    Case('model.savings.predict', _predict_savings),
+    Case('model.forecast.forecast', _forecast_goals, ops=lambda ctx: len(ctx.page_frame('predictions'))),
+    Case('auth.hash_password', _hash_passwords, ops=AUTH_USERS),
+    Case('auth.register_user', _register, setup=_new_usernames, ops=AUTH_USERS, warmup=False),
+    Case('auth.verify_user', _verify, setup=lambda ctx: ctx.get('auth_users', _registered_users), ops=AUTH_USERS),
+    Case('auth.update_password', _change_password, setup=lambda ctx: ctx.get('auth_users', _registered_users), ops=AUTH_USERS),
+    Case('page.overview', _overview_page),
+    Case('page.analytics', _analytics_page),
+    Case('page.predictions', _predictions_page, setup=_fresh_registry, warmup=False),
+    Case('page.rewards', _rewards_page),
+    Case('page.user_detail', _user_detail_page, ops=LOOKUP_USERS),
+]
+
+
+def prepare_dataset(data_dir, users, rewards, notifications, seed):
+    """
+    Generate the dataset into ``data_dir`` unless the same one is already there.
+
+    Returns:
+        tuple: (manifest dict, seconds spent generating or 0.0 if reused)
+    """
+    manifest = {'users': users, 'rewards_rows': rewards, 'notifications_rows': notifications, 'seed': seed}
+    path = os.path.join(data_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            if json.load(f) == manifest:
+                return manifest, 0.0
+    with Timer() as timer:
+        write_dataset(data_dir, users, rewards, notifications, seed)
+    with open(path, 'w') as f:
+        json.dump(manifest, f)
+    return manifest, timer.seconds
+
+
+def run_case(case, ctx, repeat):
+    """
+    Time one case.
+
+    Returns:
+        dict: Seconds per repeat and summary statistics
+    """
+    if case.warmup:
+        case.run(ctx, case.setup(ctx) if case.setup else None)
+    samples = []
+    rss_before = current_rss_mb()
+    for _ in range(repeat):
+        arg = case.setup(ctx) if case.setup else None
+        with Timer() as timer:
+            case.run(ctx, arg)
+        samples.append(timer.seconds)
+    ops = case.ops(ctx) if callable(case.ops) else case.ops
+    median = statistics.median(samples)
+    return {
+        'repeat': repeat,
+        'seconds': samples,
+        'min_s': min(samples),
+        'median_s': median,
+        'max_s': max(samples),
+        'ops_per_s': ops / median if median > 0 else None,
+        'rss_delta_mb': current_rss_mb() - rss_before,
+    }
+
+
+def environment():
+    """Interpreter, library versions and commit, for telling runs apart."""
+    import pandas as pd
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+def compare(results, baseline, threshold, min_delta=DEFAULT_MIN_DELTA_S):
+    """
+    Median ratios against an earlier run of the suite.
+
+    Args:
+        results (dict): This run
+        baseline (dict): Earlier results file
+        threshold (float): Allowed slowdown, e.g. 0.25 for 25 %
+        min_delta (float): Changes of fewer seconds are never flagged
+
+    Returns:
+        dict: Per case: baseline and current median, ratio and status
+            ('regression', 'improvement' or 'ok')
+    """
+    report = {}
+    for name, current in results['cases'].items():
+        before = baseline.get('cases', {}).get(name)
+        if before is None or 'median_s' not in before or 'median_s' not in current:
+            continue
+        ratio = current['median_s'] / before['median_s'] if before['median_s'] > 0 else float('inf')
+        status = 'ok'
+        if abs(current['median_s'] - before['median_s']) < min_delta:
+            pass
+        elif ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improvement'
+        report[name] = {'baseline_s': before['median_s'], 'current_s': current['median_s'],
+                        'ratio': ratio, 'status': status}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--users', type=int, default=None, help="Override the scale's user count")
+    parser.add_argument('--rewards', type=int, default=None, help="Override the scale's wallet rows")
+    parser.add_argument('--notifications', type=int, default=None, help="Override the scale's notification rows")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', nargs='+', default=None, help="Run only cases starting with these prefixes")
+    parser.add_argument('--data-dir', default=None, help="Keep the generated dataset here and reuse it")
+    parser.add_argument('--out', default=None, help="Write results to this file (default: stdout)")
+    parser.add_argument('--compare', default=None, help="Earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA_S,
+                        help="Ignore median changes smaller than this many seconds")
+    parser.add_argument('--skip-checks', action='store_true', help="Do not run check_correctness.py first")
+    args = parser.parse_args()
+
+    checks = {} if args.skip_checks else run_checks()
+    failed = [name for name, result in checks.items() if not result['ok']]
+    for name in failed:
+        print(f"check failed: {name}: {checks[name]['error']}", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+    scale = dict(SCALES[args.scale])
+    for key in ('users', 'rewards', 'notifications'):
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+    cases = [case for case in CASES
+             if args.cases is None or any(case.name.startswith(prefix) for prefix in args.cases)]
+
+    work_dir = tempfile.mkdtemp(prefix='breathsave-suite-')
+    data_dir = args.data_dir or os.path.join(work_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    try:
+        dataset, generate_s = prepare_dataset(data_dir, scale['users'], scale['rewards'],
+                                              scale['notifications'], args.seed)
+        results = {
+            'suite': 'breathsave',
+            'scale': args.scale,
+            'dataset': dataset,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'environment': environment(),
+            'generate_s': generate_s,
+            'checks': checks,
+            'cases': {},
+        }
+        ctx = Context(data_dir, work_dir)
+        for case in cases:
+            print(f"{case.name} ...", file=sys.stderr, flush=True)
+            try:
+                results['cases'][case.name] = run_case(case, ctx, args.repeat)
+            except MemoryError as e:
+                results['cases'][case.name] = {'error': repr(e)}
+        results['peak_rss_mb'] = peak_rss_mb()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('dataset') != results['dataset']:
+            print("warning: baseline was run on a different dataset", file=sys.stderr)
+        results['comparison'] = compare(results, baseline, args.threshold, args.min_delta)
+        regressions = [name for name, row in results['comparison'].items() if row['status'] == 'regression']
+        for name, row in results['comparison'].items():
+            print(f"{row['status']:>11}  {row['ratio']:6.2f}x  {name}", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
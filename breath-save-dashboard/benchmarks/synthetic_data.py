@@ -0,0 +1,186 @@
+"""
+SYNTHETIC DATA GENERATOR
+========================
+
+Writes milestones, rewards-wallet and notification CSVs that follow the
+schemas in data/ so performance work can be measured at realistic scale.
+
+Usage:
+    python benchmarks/synthetic_data.py --users 100000 --out /tmp/breathsave
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+MILESTONES_CSV = 'breathsave_savings_milestones.csv'
+REWARDS_CSV = 'breathsave_rewards_wallet.csv'
+NOTIFICATIONS_CSV = 'breathsave_notifications_schedule.csv'
+
+REWARD_TYPES = ['Discount-Cafe', 'Voucher-Netflix', 'GiftCard-200', 'Health-Consult']
+NOTIFICATION_TYPES = ['affirmation', 'craving_alert']
+
+
+def user_ids(start, stop, width):
+    """Format user ids the way the sample data does (user_0001, ...)."""
+    return np.char.add('user_', np.char.zfill(np.arange(start, stop).astype(str), width))
+
+
+def _id_width(n_users):
+    return max(4, len(str(n_users)))
+
+
+def _write_chunked(path, rows, chunk_rows, make_chunk):
+    """Write ``rows`` rows produced by ``make_chunk(start, stop)`` to ``path``."""
+    with open(path, 'w', newline='') as f:
+        for start in range(0, rows, chunk_rows):
+            stop = min(rows, start + chunk_rows)
+            make_chunk(start, stop).to_csv(f, index=False, header=(start == 0))
+
+
+def milestones_frame(n_users, seed=42, start=0, width=None):
+    """
+    Build milestone rows for users ``start + 1 .. start + n_users`` in memory.
+
+    Args:
+        n_users (int): Number of users
+        seed (int): Random seed
+        start (int): Offset of the first user id
+        width (int): Zero-padding of the numeric id part
+
+    Returns:
+        pd.DataFrame: Milestones table
+    """
+    width = width or _id_width(start + n_users)
+    rng = np.random.default_rng(seed + start)
+    days = rng.integers(7, 366, n_users)
+    avoided = (days * rng.uniform(1.0, 10.0, n_users)).astype(np.int64)
+    smoked = (days * rng.gamma(1.5, 2.5, n_users)).astype(np.int64)
+    price = rng.uniform(8.0, 30.0, n_users)
+    return pd.DataFrame({
+        'user_id': user_ids(start + 1, start + n_users + 1, width),
+        'total_days': days,
+        'total_cigs_smoked': smoked,
+        'total_cigs_avoided': avoided,
+        'money_saved': np.round(avoided * price, 2),
+        'milestones_achieved': np.minimum(10, days // 14),
+        'points': 1000 + avoided // 2,
+    })
+
+
+def write_milestones(path, n_users, seed=42, chunk_rows=1_000_000):
+    """
+    Write a milestones table with one row per user.
+
+    Args:
+        path (str): Output CSV path
+        n_users (int): Number of users
+        seed (int): Random seed
+        chunk_rows (int): Rows generated per write
+    """
+    width = _id_width(n_users)
+    _write_chunked(path, n_users, chunk_rows,
+                   lambda start, stop: milestones_frame(stop - start, seed, start, width))
+
+
+def write_rewards(path, n_rows, n_users, seed=43, chunk_rows=1_000_000):
+    """
+    Write a rewards-wallet table with ``n_rows`` redemptions.
+
+    Args:
+        path (str): Output CSV path
+        n_rows (int): Number of wallet rows
+        n_users (int): Number of users to draw from
+        seed (int): Random seed
+        chunk_rows (int): Rows generated per write
+    """
+    width = _id_width(n_users)
+    start_date = np.datetime64('2024-06-01')
+
+    def make_chunk(start, stop):
+        rng = np.random.default_rng(seed + start)
+        n = stop - start
+        users = rng.integers(1, n_users + 1, n)
+        status = np.where(rng.random(n) < 0.8, 'redeemed', 'pending')
+        dates = (start_date + rng.integers(0, 180, n)).astype(str)
+        dates = np.where(rng.random(n) < 0.6, dates, '')
+        return pd.DataFrame({
+            'reward_id': [f"{v:08x}" for v in rng.integers(0, 2 ** 32, n)],
+            'user_id': np.char.add('user_', np.char.zfill(users.astype(str), width)),
+            'reward_type': np.asarray(REWARD_TYPES)[rng.integers(0, len(REWARD_TYPES), n)],
+            'points_cost': rng.choice([100, 150, 200], n),
+            'redemption_status': status,
+            'date_redeemed': dates,
+        })
+
+    _write_chunked(path, n_rows, chunk_rows, make_chunk)
+
+
+def write_notifications(path, n_rows, n_users, seed=44, chunk_rows=1_000_000, start_id=0):
+    """
+    Write a notification schedule with ``n_rows`` scheduled pushes.
+
+    Args:
+        path (str): Output CSV path
+        n_rows (int): Number of notifications
+        n_users (int): Number of users to draw from
+        seed (int): Random seed
+        chunk_rows (int): Rows generated per write
+        start_id (int): Offset for notification ids (for appends)
+    """
+    width = _id_width(n_users)
+    start_time = np.datetime64('2024-06-01T00:00:00')
+
+    def make_chunk(start, stop):
+        rng = np.random.default_rng(seed + start_id + start)
+        n = stop - start
+        users = rng.integers(1, n_users + 1, n)
+        # Quarter-hour slots across 180 days
+        times = start_time + (rng.integers(0, 180 * 96, n) * 15).astype('timedelta64[m]')
+        return pd.DataFrame({
+            'notification_id': np.char.add('note_', np.char.zfill(
+                np.arange(start_id + start + 1, start_id + stop + 1).astype(str), 6)),
+            'user_id': np.char.add('user_', np.char.zfill(users.astype(str), width)),
+            'type': np.asarray(NOTIFICATION_TYPES)[rng.integers(0, len(NOTIFICATION_TYPES), n)],
+            'schedule_time': np.datetime_as_string(times, unit='s'),
+            'sent_flag': (rng.random(n) < 0.5).astype(np.int64),
+        })
+
+    _write_chunked(path, n_rows, chunk_rows, make_chunk)
+
+
+def write_dataset(out_dir, n_users, rewards_rows=None, notifications_rows=None, seed=42):
+    """
+    Write all three tables into ``out_dir`` using the dashboard file names.
+
+    Args:
+        out_dir (str): Output directory (created if missing)
+        n_users (int): Number of users in the milestones table
+        rewards_rows (int): Wallet rows (default: n_users)
+        notifications_rows (int): Notification rows (default: 3 * n_users)
+        seed (int): Base random seed
+
+    Returns:
+        str: ``out_dir``
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rewards_rows = n_users if rewards_rows is None else rewards_rows
+    notifications_rows = 3 * n_users if notifications_rows is None else notifications_rows
+    write_milestones(os.path.join(out_dir, MILESTONES_CSV), n_users, seed)
+    write_rewards(os.path.join(out_dir, REWARDS_CSV), rewards_rows, n_users, seed + 1)
+    write_notifications(os.path.join(out_dir, NOTIFICATIONS_CSV), notifications_rows, n_users, seed + 2)
+    return out_dir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--rewards', type=int, default=None)
+    parser.add_argument('--notifications', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+    write_dataset(args.out, args.users, args.rewards, args.notifications, args.seed)
+    print(f"Wrote synthetic dataset to {args.out}")
@@ -11,18 +11,139 @@ Algorithm Explanation:
 4. Distance: Uses Euclidean distance in scaled feature space
 
 Cluster Interpretation:
-- Cluster 0 (Red): High Achievers - Maximum savings and cigs avoided
-- Cluster 1 (Blue): Steady Performers - Moderate progress, consistent efforts
-- Cluster 2 (Green): New Members - Early stage users with growing momentum
+Names are generated from the centroid profiles, so they work for any k.
+Clusters are ranked by progress (cigs avoided + money saved - cigs smoked,
+in scaled units): the top one is High Achievers, the bottom one New
+Members and the rest Steady Performers. Names shared by several clusters
+get the centroid's most distinctive feature appended (e.g. "Steady
+Performers · High Savings").
 
 Mathematical Formula:
     J = Σ Σ ||x_i - c_j||^2
     where x_i = data point, c_j = cluster center
+
+Caching:
+fit_predict_cached stores the fitted scaler, centroids and assignments in
+the model registry (ml_models/registry.py), keyed by a fingerprint of the
+feature columns and the hyperparameters. Reruns with unchanged data load
+them instead of refitting.
+
+Streaming Mode (StreamingSegmentationModel):
+For user bases too large for full-batch K-Means, the scaler is fitted in
+one pass over chunks (running mean/variance) and centroids are learned with
+mini-batch updates over further passes. New users can be folded in with
+partial_fit (centroid updates only, scaler frozen) and assigned to existing
+clusters with predict, without a refit. quality() reports inertia and a
+sampled silhouette score for either mode so the two can be compared.
+
+Instrumentation:
+Fitting, prediction and cluster statistics run as timed stages
+(model.segmentation.*, see utils/instrumentation.py).
+
+Sweep Mode (SegmentationSweep):
+Fits K-Means for a range of k and random seeds on a process pool to
+justify the segment count. The features are scaled once and written to a
+.npy file that every worker memory-maps, so the matrix is shared through
+the page cache instead of being pickled to each process (K-Means still
+centres a private working copy while it fits). Each k reports
+the inertia of its best seed, a sampled silhouette score (same sample for
+every k) and fit times. The fitted centroids are kept, so model(k) returns
+a ready segmentation model for any swept k without refitting. Results are
+cached in the model registry like the other fits.
+
+Cluster Statistics:
+get_cluster_stats aggregates every cluster in one np.bincount pass over the
+assignment array (no DataFrame copy, any k). Optional aggregates (median,
+percentiles, std, min, max, count) and a streamed variant over
+(chunk, assignments) pairs use ClusterStatsAccumulator.
 """
 
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
 import numpy as np
+import pandas as pd
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from ml_models.registry import data_fingerprint, get_registry
+from utils.instrumentation import timed
+
+FEATURES = ['total_cigs_avoided', 'money_saved', 'total_cigs_smoked']
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_SWEEP_KS = tuple(range(2, 9))
+DEFAULT_SWEEP_SEEDS = tuple(range(5))
+# Silhouette cost grows with the square of the sample, once per swept k
+SILHOUETTE_SAMPLE = 5_000
+
+# Direction of progress for each feature, and how a centroid far above or
+# below the average on it is described
+PROGRESS_WEIGHTS = {'total_cigs_avoided': 1.0, 'money_saved': 1.0, 'total_cigs_smoked': -1.0}
+PROFILE_LABELS = {
+    'total_cigs_avoided': ('Many Avoided', 'Few Avoided'),
+    'money_saved': ('High Savings', 'Low Savings'),
+    'total_cigs_smoked': ('Heavy Smoking', 'Light Smoking'),
+}
+
+
+def _features(df):
+    """
+    The clustering features of ``df`` as a float array.
+    
+    Raises:
+        ValueError: If a feature column has blank cells; K-Means needs every value
+    """
+    X = df[FEATURES].to_numpy(dtype=float)
+    blank = np.isnan(X).sum(axis=0)
+    if blank.any():
+        columns = ', '.join(f"{feature} ({count} row(s))" for feature, count in zip(FEATURES, blank) if count)
+        raise ValueError(f"Cannot segment users with blank values in {columns}")
+    return X
+
+
+def name_clusters(centers, features=FEATURES):
+    """
+    Display names generated from centroid profiles.
+    
+    Args:
+        centers (np.array): Centroids in scaled feature space (k x features)
+        features (list): Feature of each centroid column
+        
+    Returns:
+        list: One unique name per cluster, in cluster id order
+    """
+    centers = np.asarray(centers, dtype=float)
+    k = len(centers)
+    if k == 1:
+        return ['All Users']
+    weights = np.array([PROGRESS_WEIGHTS[feature] for feature in features])
+    ranking = np.argsort(-(centers @ weights), kind='stable')
+    names = [None] * k
+    for rank, cluster_id in enumerate(ranking):
+        names[cluster_id] = ('High Achievers' if rank == 0 else
+                             'New Members' if rank == k - 1 else 'Steady Performers')
+    # Profile of each centroid: its features described from most to least distinctive
+    profiles = []
+    for center in centers:
+        order = np.argsort(-np.abs(center), kind='stable')
+        profiles.append([PROFILE_LABELS[features[f]][0 if center[f] >= 0 else 1] for f in order])
+    for name in set(names):
+        shared = [i for i in ranking if names[i] == name]
+        if len(shared) == 1:
+            continue
+        # Describe shared names with as many features as it takes to tell them apart
+        for depth in range(1, len(features) + 1):
+            labels = [f"{name} · {', '.join(profiles[i][:depth])}" for i in shared]
+            if len(set(labels)) == len(labels):
+                break
+        else:
+            labels = [f"{name} {position}" for position in range(1, len(shared) + 1)]
+        for cluster_id, label in zip(shared, labels):
+            names[cluster_id] = label
+    return names
 
 class UserSegmentationModel:
     def __init__(self, n_clusters=3, random_state=42):
@@ -34,10 +155,12 @@ class UserSegmentationModel:
             random_state (int): For reproducible results
         """
         self.n_clusters = n_clusters
+        self.random_state = random_state
         self.scaler = StandardScaler()
         self.model = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
-        self.cluster_names = ['High Achievers', 'Steady Performers', 'New Members']
+        self.cluster_names = []
         
+    @timed('model.segmentation.fit_predict')
     def fit_predict(self, df):
         """
         Fit model and predict clusters.
@@ -48,39 +171,650 @@ class UserSegmentationModel:
         Returns:
             np.array: Cluster assignments for each user
         """
-        features = ['total_cigs_avoided', 'money_saved', 'total_cigs_smoked']
-        X = df[features].values
+        X = _features(df)
         
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
         
         # Fit and predict
         clusters = self.model.fit_predict(X_scaled)
+        self.cluster_centers_ = self.model.cluster_centers_
+        self.cluster_names = name_clusters(self.cluster_centers_)
         
         return clusters
     
-    def get_cluster_stats(self, df, clusters):
+    def get_params(self):
+        """Hyperparameters that identify a fitted model version."""
+        return {'n_clusters': self.n_clusters, 'random_state': self.random_state,
+                'n_init': self.model.n_init, 'features': FEATURES}
+    
+    @timed('model.segmentation.fit_predict_cached')
+    def fit_predict_cached(self, df, registry=None):
+        """
+        Fit and predict, reusing a registry entry when the data is unchanged.
+        
+        Args:
+            df (pd.DataFrame): Data with columns: total_cigs_avoided, money_saved, total_cigs_smoked
+            registry (ModelRegistry): Registry to use (default: process-wide)
+            
+        Returns:
+            np.array: Cluster assignments for each user
+        """
+        registry = registry or get_registry()
+        fingerprint = data_fingerprint(df, FEATURES)
+        key = registry.key('segmentation', fingerprint, self.get_params())
+        state = registry.load(key)
+        if state is not None:
+            self.load_state(state)
+            return state['assignments']
+        
+        clusters = self.fit_predict(df)
+        registry.save(key, self.to_state(clusters))
+        registry.prune('segmentation', fingerprint)
+        return clusters
+    
+    def to_state(self, clusters):
+        """
+        Export fitted parameters and assignments as plain arrays.
+        
+        Args:
+            clusters (np.array): Assignments returned by fit_predict
+            
+        Returns:
+            dict: Name -> np.ndarray
+        """
+        return {
+            'scaler_mean': self.scaler.mean_,
+            'scaler_scale': self.scaler.scale_,
+            'centers': self.cluster_centers_,
+            'inertia': np.array(self.model.inertia_),
+            'assignments': np.asarray(clusters, dtype=np.int32),
+        }
+    
+    def load_state(self, state):
+        """
+        Restore fitted parameters exported by to_state.
+        
+        Args:
+            state (dict): Arrays from to_state
+        """
+        self.scaler.mean_ = state['scaler_mean']
+        self.scaler.scale_ = state['scaler_scale']
+        self.scaler.var_ = state['scaler_scale'] ** 2
+        self.scaler.n_features_in_ = len(state['scaler_mean'])
+        self.cluster_centers_ = state['centers']
+        self.cluster_names = name_clusters(self.cluster_centers_)
+    
+    @timed('model.segmentation.predict')
+    def predict(self, df):
+        """
+        Assign users to the nearest fitted centroid.
+        
+        Works after fit_predict or after load_state, without refitting.
+        
+        Args:
+            df (pd.DataFrame): Data with the model's feature columns
+            
+        Returns:
+            np.array: Cluster assignments
+        """
+        X_scaled = (df[FEATURES].to_numpy(dtype=float) - self.scaler.mean_) / self.scaler.scale_
+        distances = ((X_scaled[:, None, :] - self.cluster_centers_[None, :, :]) ** 2).sum(axis=2)
+        return distances.argmin(axis=1)
+    
+    @timed('model.segmentation.cluster_stats')
+    def get_cluster_stats(self, df, clusters, aggregates=None):
         """
-        Calculate statistics for each cluster.
+        Calculate statistics for each cluster in one grouped pass.
+        
+        Counts, sums and sums of squares come from np.bincount over the
+        assignment array, so no copy of ``df`` is made and the cost is O(n)
+        for any number of clusters. Percentiles sort each feature once.
         
         Args:
             df (pd.DataFrame): Original data
             clusters (np.array): Cluster assignments
+            aggregates (list): Extra per-feature statistics, any of
+                'mean', 'std', 'min', 'max', 'count', 'median' or 'pNN'
+                (e.g. 'p90'); added as '<feature>_<aggregate>'
             
         Returns:
             dict: Statistics for each cluster
         """
-        df_copy = df.copy()
-        df_copy['cluster'] = clusters
+        accumulator = ClusterStatsAccumulator(self.n_clusters, order_stats=_needs_order_stats(aggregates),
+                                              exact_percentiles=True)
+        accumulator.update(df, clusters)
+        return self._format_stats(accumulator, aggregates)
+    
+    def get_cluster_stats_streamed(self, chunks, aggregates=None):
+        """
+        Calculate cluster statistics from streamed (chunk, assignments) pairs.
         
+        Only running totals are kept; percentiles are estimated from a
+        bounded per-cluster reservoir sample.
+        
+        Args:
+            chunks (iterable): Pairs of (pd.DataFrame chunk, np.array assignments)
+            aggregates (list): See get_cluster_stats
+            
+        Returns:
+            dict: Statistics for each cluster
+        """
+        accumulator = ClusterStatsAccumulator(self.n_clusters, order_stats=_needs_order_stats(aggregates),
+                                              random_state=self.random_state)
+        for chunk, clusters in chunks:
+            accumulator.update(chunk, clusters)
+        return self._format_stats(accumulator, aggregates)
+    
+    def cluster_name(self, cluster_id):
+        """Display name for a cluster id (generic before the model is fitted)."""
+        if cluster_id < len(self.cluster_names):
+            return self.cluster_names[cluster_id]
+        return f"Segment {cluster_id + 1}"
+    
+    def _format_stats(self, accumulator, aggregates):
+        means = accumulator.aggregate('mean')
         stats = {}
         for cluster_id in range(self.n_clusters):
-            cluster_data = df_copy[df_copy['cluster'] == cluster_id]
-            stats[self.cluster_names[cluster_id]] = {
-                'users': len(cluster_data),
-                'avg_savings': cluster_data['money_saved'].mean(),
-                'avg_cigs_avoided': cluster_data['total_cigs_avoided'].mean(),
-                'avg_cigs_smoked': cluster_data['total_cigs_smoked'].mean()
+            stats[self.cluster_name(cluster_id)] = {
+                'users': int(accumulator.counts[cluster_id]),
+                'avg_savings': means['money_saved'][cluster_id],
+                'avg_cigs_avoided': means['total_cigs_avoided'][cluster_id],
+                'avg_cigs_smoked': means['total_cigs_smoked'][cluster_id]
             }
-        
+        for name in aggregates or []:
+            values = accumulator.aggregate(name)
+            for feature in accumulator.features:
+                for cluster_id in range(self.n_clusters):
+                    stats[self.cluster_name(cluster_id)][f"{feature}_{name}"] = values[feature][cluster_id]
         return stats
+    
+    def quality(self, df, clusters=None, sample_size=10_000):
+        """
+        Report clustering quality in scaled feature space.
+        
+        Args:
+            df (pd.DataFrame): Data with the model's feature columns
+            clusters (np.array): Assignments (default: predict(df))
+            sample_size (int): Rows sampled for the silhouette score
+            
+        Returns:
+            dict: inertia (sum of squared distances to the assigned centroid),
+                silhouette (on a random sample) and rows
+        """
+        if clusters is None:
+            clusters = self.predict(df)
+        clusters = np.asarray(clusters)
+        inertia = 0.0
+        for start in range(0, len(df), DEFAULT_CHUNK_ROWS):
+            chunk = df.iloc[start:start + DEFAULT_CHUNK_ROWS]
+            X_scaled = self.scaler.transform(chunk[FEATURES].to_numpy(dtype=float))
+            diff = X_scaled - self.cluster_centers_[clusters[start:start + DEFAULT_CHUNK_ROWS]]
+            inertia += float((diff ** 2).sum())
+        
+        rng = np.random.default_rng(self.random_state)
+        sample = rng.choice(len(df), size=min(sample_size, len(df)), replace=False)
+        X_sample = self.scaler.transform(df[FEATURES].to_numpy(dtype=float)[sample])
+        labels = clusters[sample]
+        silhouette = float(silhouette_score(X_sample, labels)) if len(np.unique(labels)) > 1 else float('nan')
+        return {'inertia': inertia, 'silhouette': silhouette, 'rows': len(df)}
+
+
+def _needs_order_stats(aggregates):
+    return any(name not in ('mean', 'std', 'count') for name in aggregates or [])
+
+
+class ClusterStatsAccumulator:
+    def __init__(self, n_clusters, features=FEATURES, order_stats=True, exact_percentiles=False,
+                 reservoir_size=10_000, random_state=42):
+        """
+        Running per-cluster statistics over one or more chunks.
+        
+        Args:
+            n_clusters (int): Number of clusters
+            features (list): Feature columns to aggregate
+            order_stats (bool): Track min, max and percentiles (needs a
+                per-chunk sort); without them updates are pure bincounts
+            exact_percentiles (bool): Keep every value for exact percentiles
+                (single-pass use); otherwise keep a reservoir sample
+            reservoir_size (int): Values kept per cluster and feature
+            random_state (int): Seed for reservoir sampling
+        """
+        self.n_clusters = n_clusters
+        self.features = list(features)
+        self.order_stats = order_stats
+        self.exact_percentiles = exact_percentiles
+        self.reservoir_size = reservoir_size
+        self.rng = np.random.default_rng(random_state)
+        self.counts = np.zeros(n_clusters, dtype=np.int64)
+        # Per-cluster means and centered second moments (Chan et al. merge)
+        self.means = {f: np.zeros(n_clusters) for f in self.features}
+        self.m2 = {f: np.zeros(n_clusters) for f in self.features}
+        self.mins = {f: np.full(n_clusters, np.inf) for f in self.features}
+        self.maxs = {f: np.full(n_clusters, -np.inf) for f in self.features}
+        self.samples = {f: [[] for _ in range(n_clusters)] for f in self.features}
+        self.sample_keys = {f: [None] * n_clusters for f in self.features}
+    
+    def update(self, df, clusters):
+        """
+        Fold a chunk and its assignments into the running statistics.
+        
+        Args:
+            df (pd.DataFrame): Chunk with the feature columns
+            clusters (np.array): Cluster assignment for each row of the chunk
+        """
+        clusters = np.asarray(clusters, dtype=np.int64)
+        k = self.n_clusters
+        batch_counts = np.bincount(clusters, minlength=k)
+        before = self.counts.astype(float)
+        self.counts += batch_counts
+        total = self.counts.astype(float)
+        present = batch_counts > 0
+        if self.order_stats:
+            order = np.argsort(clusters, kind='stable')
+            bounds = np.searchsorted(clusters[order], np.arange(k + 1))
+        for feature in self.features:
+            values = df[feature].to_numpy(dtype=float)
+            batch_mean = np.zeros(k)
+            batch_mean[present] = np.bincount(clusters, weights=values, minlength=k)[present] / batch_counts[present]
+            batch_m2 = np.bincount(clusters, weights=(values - batch_mean[clusters]) ** 2, minlength=k)
+            delta = batch_mean - self.means[feature]
+            self.m2[feature][present] += (batch_m2 + delta ** 2 * before * batch_counts / np.maximum(total, 1))[present]
+            self.means[feature][present] += (delta * batch_counts / np.maximum(total, 1))[present]
+            if not self.order_stats:
+                continue
+            grouped = values[order]
+            for cluster_id in range(k):
+                part = grouped[bounds[cluster_id]:bounds[cluster_id + 1]]
+                if len(part) == 0:
+                    continue
+                self.mins[feature][cluster_id] = min(self.mins[feature][cluster_id], part.min())
+                self.maxs[feature][cluster_id] = max(self.maxs[feature][cluster_id], part.max())
+                self._sample(feature, cluster_id, part)
+    
+    def _sample(self, feature, cluster_id, part):
+        kept = self.samples[feature][cluster_id]
+        if self.exact_percentiles:
+            kept.append(part)
+            return
+        # Bottom-k sampling: tag values with random keys and keep the
+        # reservoir_size smallest, a uniform sample over every chunk seen
+        keys = self.rng.random(len(part))
+        if kept:
+            keys = np.concatenate([self.sample_keys[feature][cluster_id], keys])
+            part = np.concatenate([kept[0], part])
+        if len(part) > self.reservoir_size:
+            keep = np.argpartition(keys, self.reservoir_size)[:self.reservoir_size]
+            keys, part = keys[keep], part[keep]
+        self.samples[feature][cluster_id] = [part]
+        self.sample_keys[feature][cluster_id] = keys
+    
+    def aggregate(self, name):
+        """
+        Compute one statistic for every feature and cluster.
+        
+        Args:
+            name (str): 'mean', 'std', 'min', 'max', 'count', 'median' or 'pNN'
+            
+        Returns:
+            dict: feature -> np.array of length n_clusters (NaN for empty clusters)
+        """
+        counts = self.counts.astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = {}
+            for feature in self.features:
+                if name == 'mean':
+                    values = np.where(counts > 0, self.means[feature], np.nan)
+                elif name == 'std':
+                    # Sample standard deviation (ddof=1), matching pandas
+                    values = np.where(counts > 1, np.sqrt(self.m2[feature] / (counts - 1)), np.nan)
+                elif name == 'count':
+                    values = self.counts.copy()
+                elif name in ('min', 'max', 'median') or name.startswith('p'):
+                    if not self.order_stats:
+                        raise ValueError(f"Aggregate {name} needs order_stats=True")
+                    values = self._order_stat(feature, name, counts)
+                else:
+                    raise ValueError(f"Unknown aggregate: {name}")
+                result[feature] = values
+        return result
+    
+    def _order_stat(self, feature, name, counts):
+        if name == 'min':
+            return np.where(counts > 0, self.mins[feature], np.nan)
+        if name == 'max':
+            return np.where(counts > 0, self.maxs[feature], np.nan)
+        if name != 'median' and not name[1:].isdigit():
+            raise ValueError(f"Unknown aggregate: {name}")
+        q = 50 if name == 'median' else int(name[1:])
+        return np.array([
+            np.percentile(np.concatenate(parts), q) if parts else np.nan
+            for parts in self.samples[feature]
+        ])
+
+
+def iter_chunks(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yield consecutive row slices of a DataFrame.
+    
+    Args:
+        df (pd.DataFrame): Data to split
+        chunk_rows (int): Rows per chunk
+        
+    Yields:
+        pd.DataFrame: Row slice (a view where pandas allows it)
+    """
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+class StreamingSegmentationModel(UserSegmentationModel):
+    def __init__(self, n_clusters=3, random_state=42, batch_size=4096, chunk_rows=DEFAULT_CHUNK_ROWS, epochs=1):
+        """
+        Initialize mini-batch K-Means for chunked / online segmentation.
+        
+        Args:
+            n_clusters (int): Number of segments (default: 3)
+            random_state (int): For reproducible results
+            batch_size (int): Mini-batch size for centroid updates
+            chunk_rows (int): Rows per chunk when fitting a whole DataFrame
+            epochs (int): Passes over the chunks for centroid updates
+        """
+        super().__init__(n_clusters, random_state)
+        self.batch_size = batch_size
+        self.chunk_rows = chunk_rows
+        self.epochs = epochs
+        self.model = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state,
+                                     batch_size=batch_size, n_init=3)
+        
+    def get_params(self):
+        """Hyperparameters that identify a fitted model version."""
+        return {**super().get_params(), 'mode': 'minibatch', 'batch_size': self.batch_size,
+                'chunk_rows': self.chunk_rows, 'epochs': self.epochs}
+    
+    def fit_stream(self, make_chunks):
+        """
+        Fit from chunks: one pass for the scaler, then ``epochs`` passes of
+        mini-batch centroid updates.
+        
+        Args:
+            make_chunks (callable): Returns a fresh iterator of DataFrame
+                chunks; called once per pass
+        """
+        self.scaler = StandardScaler()
+        self.__dict__.pop('cluster_centers_', None)
+        for chunk in make_chunks():
+            self.scaler.partial_fit(_features(chunk))
+        for _ in range(self.epochs):
+            for chunk in make_chunks():
+                self.partial_fit(chunk)
+        
+    def partial_fit(self, df):
+        """
+        Update centroids with a chunk of (new) users.
+        
+        The scaler is not changed, so existing assignments stay comparable.
+        
+        Args:
+            df (pd.DataFrame): Users with the model's feature columns
+        """
+        X = _features(df)
+        if not hasattr(self, 'cluster_centers_') and len(X) < self.n_clusters:
+            return
+        if not hasattr(self.scaler, 'mean_'):
+            self.scaler.fit(X)
+        X_scaled = self.scaler.transform(X)
+        if not hasattr(self, 'cluster_centers_'):
+            self._seed_centroids(X_scaled)
+        for start in range(0, len(X_scaled), self.batch_size):
+            self.model.partial_fit(X_scaled[start:start + self.batch_size])
+        self.cluster_centers_ = self.model.cluster_centers_
+        self.cluster_names = name_clusters(self.cluster_centers_)
+    
+    def _seed_centroids(self, X_scaled):
+        """Start from full K-Means (10 restarts) on a sample of the first chunk."""
+        rng = np.random.default_rng(self.random_state)
+        sample = X_scaled[rng.choice(len(X_scaled), size=min(len(X_scaled), 10 * self.batch_size), replace=False)]
+        seed = KMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=10).fit(sample)
+        self.model = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=self.random_state,
+                                     batch_size=self.batch_size, init=seed.cluster_centers_, n_init=1)
+        self.cluster_centers_ = seed.cluster_centers_
+    
+    def fit_predict(self, df):
+        """
+        Fit on ``df`` chunk by chunk and predict clusters.
+        
+        Args:
+            df (pd.DataFrame): Data with columns: total_cigs_avoided, money_saved, total_cigs_smoked
+            
+        Returns:
+            np.array: Cluster assignments for each user
+        """
+        self.fit_stream(lambda: iter_chunks(df, self.chunk_rows))
+        return np.concatenate([self.predict(chunk) for chunk in iter_chunks(df, self.chunk_rows)])
+
+
+# Scaled feature matrix of the running sweep, memory-mapped in each pool worker
+_sweep_matrix = None
+
+
+def _init_sweep_worker(path, threads):
+    """Pool initializer: map the shared matrix and cap native threads."""
+    global _sweep_matrix
+    from threadpoolctl import threadpool_limits
+    
+    # Workers split the CPUs between them instead of each using all of them
+    threadpool_limits(threads)
+    _sweep_matrix = np.load(path, mmap_mode='r')
+
+
+def _sweep_fit(k, seed, X=None):
+    """Fit K-Means once for (k, seed) on the shared matrix (or ``X``)."""
+    X = _sweep_matrix if X is None else X
+    start = time.perf_counter()
+    model = KMeans(n_clusters=k, random_state=seed, n_init=1).fit(X)
+    return {'k': k, 'seed': seed, 'inertia': float(model.inertia_), 'n_iter': int(model.n_iter_),
+            'fit_s': time.perf_counter() - start, 'centers': model.cluster_centers_}
+
+
+def _sweep_silhouette(centers, sample, X=None):
+    """Silhouette of the rows in ``sample`` assigned to their nearest centroid."""
+    X = _sweep_matrix if X is None else X
+    points = np.asarray(X[sample])
+    labels = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    if len(np.unique(labels)) < 2:
+        return float('nan')
+    return float(silhouette_score(points, labels))
+
+
+class SegmentationSweep:
+    # Per-k results kept in the registry entry, besides centroids and scaler
+    RESULT_FIELDS = ('inertia', 'silhouette', 'best_seed', 'n_iter', 'fit_s', 'fit_s_total')
+    
+    def __init__(self, ks=DEFAULT_SWEEP_KS, seeds=DEFAULT_SWEEP_SEEDS, sample_size=SILHOUETTE_SAMPLE,
+                 max_workers=None, random_state=42):
+        """
+        Initialize a K-Means sweep over segment counts and seeds.
+        
+        Args:
+            ks (iterable): Segment counts to try
+            seeds (iterable): Random seeds per k; the best (lowest inertia)
+                fit is kept, like n_init restarts
+            sample_size (int): Rows sampled for the silhouette scores
+            max_workers (int): Pool processes (default: one per CPU); 1 fits
+                in this process
+            random_state (int): Seed for the silhouette sample
+        """
+        self.ks = tuple(ks)
+        self.seeds = tuple(seeds)
+        self.sample_size = sample_size
+        self.max_workers = max_workers
+        self.random_state = random_state
+        self.scaler = StandardScaler()
+        self.results = {}
+        self.centers = {}
+        self.wall_s = None
+    
+    def get_params(self):
+        """Hyperparameters that identify a sweep."""
+        return {'ks': list(self.ks), 'seeds': list(self.seeds), 'sample_size': self.sample_size,
+                'random_state': self.random_state, 'features': FEATURES}
+    
+    def _workers(self, tasks):
+        workers = self.max_workers or os.cpu_count() or 1
+        return max(1, min(workers, tasks))
+    
+    @timed('model.segmentation.sweep')
+    def fit(self, df):
+        """
+        Fit every (k, seed) pair and score the best fit of each k.
+        
+        Args:
+            df (pd.DataFrame): Data with columns: total_cigs_avoided, money_saved, total_cigs_smoked
+            
+        Returns:
+            SegmentationSweep: self
+        """
+        X = self.scaler.fit_transform(_features(df))
+        rng = np.random.default_rng(self.random_state)
+        # One sample for every k so the scores are comparable
+        sample = np.sort(rng.choice(len(X), size=min(self.sample_size, len(X)), replace=False))
+        ks = [k for k in self.ks if k <= len(X)]
+        tasks = [(k, seed) for k in ks for seed in self.seeds]
+        workers = self._workers(len(tasks))
+        
+        start = time.perf_counter()
+        if workers == 1:
+            fits = [_sweep_fit(k, seed, X) for k, seed in tasks]
+            best = self._best(fits)
+            silhouettes = [_sweep_silhouette(best[k]['centers'], sample, X) for k in ks]
+        else:
+            with tempfile.TemporaryDirectory(prefix='segmentation-sweep-') as tmp:
+                path = os.path.join(tmp, 'scaled.npy')
+                np.save(path, X)
+                # forkserver: forking a process whose OpenMP runtime is already in use can hang
+                context = multiprocessing.get_context('forkserver')
+                threads = max(1, (os.cpu_count() or 1) // workers)
+                with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_sweep_worker,
+                                         initargs=(path, threads)) as pool:
+                    fits = list(pool.map(_sweep_fit, *zip(*tasks)))
+                    best = self._best(fits)
+                    silhouettes = list(pool.map(_sweep_silhouette, [best[k]['centers'] for k in ks],
+                                                [sample] * len(ks)))
+        self.wall_s = time.perf_counter() - start
+        
+        self.results, self.centers = {}, {}
+        for k, silhouette in zip(ks, silhouettes):
+            times = [fit['fit_s'] for fit in fits if fit['k'] == k]
+            self.results[k] = {
+                'k': k,
+                'inertia': best[k]['inertia'],
+                'silhouette': silhouette,
+                'best_seed': best[k]['seed'],
+                'n_iter': best[k]['n_iter'],
+                'fit_s': sum(times) / len(times),
+                'fit_s_total': sum(times),
+            }
+            self.centers[k] = best[k]['centers']
+        return self
+    
+    @staticmethod
+    def _best(fits):
+        best = {}
+        for fit in fits:
+            if fit['k'] not in best or fit['inertia'] < best[fit['k']]['inertia']:
+                best[fit['k']] = fit
+        return best
+    
+    def fit_cached(self, df, registry=None):
+        """
+        Fit, reusing a registry entry when the data is unchanged.
+        
+        Args:
+            df (pd.DataFrame): Data with the model's feature columns
+            registry (ModelRegistry): Registry to use (default: process-wide)
+            
+        Returns:
+            SegmentationSweep: self
+        """
+        registry = registry or get_registry()
+        fingerprint = data_fingerprint(df, FEATURES)
+        key = registry.key('segmentation_sweep', fingerprint, self.get_params())
+        state = registry.load(key)
+        if state is not None:
+            self.load_state(state)
+            return self
+        
+        self.fit(df)
+        registry.save(key, self.to_state())
+        registry.prune('segmentation_sweep', fingerprint)
+        return self
+    
+    def to_state(self):
+        """
+        Export results, centroids and scaler as plain arrays.
+        
+        Returns:
+            dict: Name -> np.ndarray (centroids padded with NaN to the largest k)
+        """
+        ks = sorted(self.results)
+        centers = np.full((len(ks), max(ks, default=0), len(FEATURES)), np.nan)
+        for i, k in enumerate(ks):
+            centers[i, :k] = self.centers[k]
+        state = {field: np.array([self.results[k][field] for k in ks], dtype=float) for field in self.RESULT_FIELDS}
+        state.update({
+            'ks': np.array(ks, dtype=np.int64),
+            'centers': centers,
+            'scaler_mean': self.scaler.mean_,
+            'scaler_scale': self.scaler.scale_,
+            'wall_s': np.array(self.wall_s),
+        })
+        return state
+    
+    def load_state(self, state):
+        """
+        Restore a sweep exported by to_state.
+        
+        Args:
+            state (dict): Arrays from to_state
+        """
+        self.scaler.mean_ = state['scaler_mean']
+        self.scaler.scale_ = state['scaler_scale']
+        self.scaler.var_ = state['scaler_scale'] ** 2
+        self.scaler.n_features_in_ = len(state['scaler_mean'])
+        self.results, self.centers = {}, {}
+        for i, k in enumerate(int(k) for k in state['ks']):
+            result = {'k': k, **{field: float(state[field][i]) for field in self.RESULT_FIELDS}}
+            result['best_seed'], result['n_iter'] = int(result['best_seed']), int(result['n_iter'])
+            self.results[k] = result
+            self.centers[k] = state['centers'][i, :k]
+        self.wall_s = float(state['wall_s'])
+    
+    def table(self):
+        """
+        One row per k: inertia, silhouette, fit times and the best seed.
+        
+        Returns:
+            pd.DataFrame: Rows in increasing k
+        """
+        return pd.DataFrame([self.results[k] for k in sorted(self.results)])
+    
+    def best_k(self):
+        """Swept k with the highest silhouette score (None if none is defined)."""
+        scored = [k for k in self.results if not np.isnan(self.results[k]['silhouette'])]
+        return max(scored, key=lambda k: self.results[k]['silhouette']) if scored else None
+    
+    def model(self, k):
+        """
+        Segmentation model for a swept k, from the kept centroids (no refit).
+        
+        Args:
+            k (int): Segment count in ``results``
+            
+        Returns:
+            UserSegmentationModel: Model ready for predict and get_cluster_stats
+        """
+        model = UserSegmentationModel(n_clusters=k, random_state=self.results[k]['best_seed'])
+        model.load_state({'scaler_mean': self.scaler.mean_, 'scaler_scale': self.scaler.scale_,
+                          'centers': self.centers[k]})
+        return model
@@ -0,0 +1,346 @@
+"""
+GOAL FORECASTING
+================
+
+Purpose: Estimate, for every user, the days until their next milestone and
+their next savings target
+
+Targets:
+- Milestones: a ladder of cigarettes avoided (CIGS_MILESTONES)
+- Savings targets: a ladder of money saved (SAVINGS_TARGETS)
+The next target is the first rung above the user's current total.
+
+Rates (per day):
+1. Personal: total_cigs_avoided / total_days and money_saved / total_days
+2. Population: Σ cigs avoided / Σ days, and the savings regression's slope
+   ($ per cig avoided, ml_models/regression.py) times the population
+   cigarette rate for the money rate
+3. Blend: weight each user's own pace by the length of their history
+       w          = total_days / (total_days + prior_days)
+       cig_rate   = w · personal_cig_rate + (1 - w) · population_cig_rate
+       money_rate = w · personal_money_rate + (1 - w) · coefficient · population_cig_rate
+   New users lean on the population, long histories on their own pace.
+
+Forecast:
+    days = (next target - current total) / blended rate
+Users past the top rung, or with no progress at all, get NaN.
+
+Batching:
+GoalForecaster.forecast is NumPy array arithmetic over chunks of the
+columns, written into preallocated float32 outputs; there is no per-user
+Python loop, so millions of users take one pass. The GoalForecast it
+returns sorts by any column, ranks the users closest to their next
+milestone (argpartition, no full sort) and exports CSV.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import timed
+
+FORECAST_COLUMNS = ['user_id', 'total_days', 'total_cigs_avoided', 'money_saved']
+CIGS_MILESTONES = (100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000)
+SAVINGS_TARGETS = (100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000)
+DEFAULT_PRIOR_DAYS = 30
+DEFAULT_CHUNK_ROWS = 1_000_000
+NEXT_GOALS = ['milestone', 'savings target']
+
+def _next_rung(ladder, values):
+    """First rung above each value, NaN past the top."""
+    rungs = np.append(ladder, np.nan)
+    return rungs[np.searchsorted(ladder, values, side='right')]
+
+def _days_to(target, current, rate):
+    """(target - current) / rate where the rate is positive, else NaN."""
+    days = np.full(len(current), np.nan)
+    np.divide(target - current, rate, out=days, where=rate > 0)
+    return days
+
+class GoalForecaster:
+    def __init__(self, coefficient, prior_days=DEFAULT_PRIOR_DAYS, milestones=CIGS_MILESTONES,
+                 savings_targets=SAVINGS_TARGETS, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Initialize a batched forecaster.
+        
+        Args:
+            coefficient (float): $ saved per cigarette avoided (population regression)
+            prior_days (float): Days of history at which a user's own rate
+                and the population rate weigh the same
+            milestones (tuple): Cigarettes-avoided milestones, increasing
+            savings_targets (tuple): Money-saved targets, increasing
+            chunk_rows (int): Rows per chunk (bounds temporary arrays)
+        """
+        self.coefficient = float(coefficient)
+        self.prior_days = prior_days
+        self.milestones = np.asarray(milestones, dtype=float)
+        self.savings_targets = np.asarray(savings_targets, dtype=float)
+        self.chunk_rows = chunk_rows
+    
+    @classmethod
+    def from_prediction(cls, prediction, **kwargs):
+        """
+        Forecaster using a fitted savings regression.
+        
+        Args:
+            prediction (PredictionTable or SavingsPredictionModel): Fitted regression
+            **kwargs: See __init__
+        
+        Returns:
+            GoalForecaster: Forecaster with the regression's slope
+        """
+        coefficient = getattr(prediction, 'coefficient', None)
+        if coefficient is None:
+            coefficient = prediction.get_metrics()['coefficient']
+        return cls(coefficient, **kwargs)
+    
+    @timed('model.forecast.forecast')
+    def forecast(self, df):
+        """
+        Days to the next milestone and savings target for every user.
+        
+        Args:
+            df (pd.DataFrame): Data with columns: user_id, total_days,
+                total_cigs_avoided, money_saved
+        
+        Returns:
+            GoalForecast: One entry per row of ``df``
+        """
+        days = df['total_days'].to_numpy()
+        avoided = df['total_cigs_avoided'].to_numpy()
+        saved = df['money_saved'].to_numpy()
+        # Users with a blank day count or cigarettes avoided don't count towards the population's pace
+        known = ~(np.isnan(days) | np.isnan(avoided))
+        total_days = float(days[known].sum(dtype=np.float64))
+        population_rate = float(avoided[known].sum(dtype=np.float64)) / total_days if total_days > 0 else 0.0
+        
+        n = len(df)
+        columns = {name: np.empty(n, dtype=np.float32) for name in GoalForecast.NUMERIC}
+        next_goal = np.empty(n, dtype=np.int8)
+        for start in range(0, n, self.chunk_rows):
+            rows = slice(start, start + self.chunk_rows)
+            chunk = self._forecast_chunk(days[rows].astype(float), avoided[rows].astype(float),
+                                         saved[rows].astype(float), population_rate)
+            for name, values in chunk.items():
+                if name == 'next_goal':
+                    next_goal[rows] = values
+                else:
+                    columns[name][rows] = values
+        return GoalForecast(df['user_id'].array, columns, next_goal, population_rate, self)
+    
+    def _forecast_chunk(self, days, avoided, saved, population_rate):
+        personal_cig_rate = np.zeros(len(days))
+        personal_money_rate = np.zeros(len(days))
+        np.divide(avoided, days, out=personal_cig_rate, where=days > 0)
+        np.divide(saved, days, out=personal_money_rate, where=days > 0)
+        weight = days / (days + self.prior_days)
+        cig_rate = weight * personal_cig_rate + (1 - weight) * population_rate
+        money_rate = weight * personal_money_rate + (1 - weight) * self.coefficient * population_rate
+        
+        next_milestone = _next_rung(self.milestones, avoided)
+        next_target = _next_rung(self.savings_targets, saved)
+        days_to_milestone = _days_to(next_milestone, avoided, cig_rate)
+        days_to_target = _days_to(next_target, saved, money_rate)
+        # fmin ignores a NaN on one side; ties go to the milestone
+        days_to_next = np.fmin(days_to_milestone, days_to_target)
+        next_goal = np.where(np.isnan(days_to_next), -1, np.where(days_to_milestone == days_to_next, 0, 1))
+        return {
+            'cig_rate': cig_rate,
+            'money_rate': money_rate,
+            'next_milestone': next_milestone,
+            'days_to_milestone': days_to_milestone,
+            'next_savings_target': next_target,
+            'days_to_savings_target': days_to_target,
+            'days_to_next': days_to_next,
+            'next_goal': next_goal,
+        }
+
+
+class GoalForecast:
+    # Float32 columns, in export order after user_id
+    NUMERIC = ['cig_rate', 'money_rate', 'next_milestone', 'days_to_milestone', 'next_savings_target',
+               'days_to_savings_target', 'days_to_next']
+    
+    def __init__(self, user_ids, columns, next_goal, population_cig_rate, forecaster):
+        """
+        Forecast arrays for a population, one entry per user.
+        
+        Args:
+            user_ids (array-like): User id of each entry
+            columns (dict): NUMERIC column -> np.ndarray
+            next_goal (np.ndarray): Index into NEXT_GOALS of the sooner goal (-1 if none)
+            population_cig_rate (float): Population cigarettes avoided per day
+            forecaster (GoalForecaster): Forecaster that produced the arrays
+        """
+        self.user_ids = user_ids
+        self.columns = columns
+        self.next_goal = next_goal
+        self.population_cig_rate = population_cig_rate
+        self.coefficient = forecaster.coefficient
+        self.prior_days = forecaster.prior_days
+        # The arrays never change, so rankings and summaries are computed once
+        self._memo = {}
+    
+    def _memoized(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+    
+    def __len__(self):
+        return len(self.next_goal)
+    
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values()) + self.next_goal.nbytes
+    
+    def frame(self, rows=None):
+        """
+        Forecast as a DataFrame.
+        
+        Args:
+            rows (np.array): Row positions to include, in this order (default: all)
+        
+        Returns:
+            pd.DataFrame: user_id, next_goal and the NUMERIC columns
+        """
+        take = (lambda values: values) if rows is None else (lambda values: values.take(rows))
+        data = {'user_id': np.asarray(take(self.user_ids))}
+        data['next_goal'] = pd.Categorical.from_codes(take(self.next_goal), NEXT_GOALS)
+        data.update({name: take(values) for name, values in self.columns.items()})
+        return pd.DataFrame(data)
+    
+    def order(self, by='days_to_next', ascending=True, n=None):
+        """
+        Row positions sorted by a column, NaN last, ties in row order.
+        
+        Top-``n`` orders are kept for repeated calls.
+        
+        Args:
+            by (str): NUMERIC column
+            ascending (bool): Smallest first
+            n (int): Only the first ``n`` positions (argpartition, no full sort)
+        
+        Returns:
+            np.ndarray: Row positions
+        """
+        if n is not None:
+            return self._memoized(('order', by, ascending, n), lambda: self._order(by, ascending, n))
+        return self._order(by, ascending, n)
+    
+    def _order(self, by, ascending, n):
+        values = self.columns[by].astype(np.float64)
+        keys = values if ascending else -values
+        keys = np.where(np.isnan(keys), np.inf, keys)
+        rows = np.arange(len(keys))
+        if n is not None and len(keys) > n:
+            # Keep everything tied with the n-th key so ties resolve by row order below
+            kth = np.partition(keys, n - 1)[n - 1]
+            rows = np.flatnonzero(keys <= kth)
+        rows = rows[np.lexsort((rows, keys[rows]))]
+        return rows if n is None else rows[:n]
+    
+    def sort(self, by='days_to_next', ascending=True, n=None):
+        """
+        Forecast sorted by a column.
+        
+        Args:
+            by (str): NUMERIC column
+            ascending (bool): Smallest first
+            n (int): Number of rows (default: all)
+        
+        Returns:
+            pd.DataFrame: See frame
+        """
+        return self.frame(self.order(by, ascending, n))
+    
+    def leaderboard(self, n=10):
+        """
+        Users closest to their next milestone, soonest first.
+        
+        Args:
+            n (int): Number of users
+        
+        Returns:
+            pd.DataFrame: user_id, next_milestone, cigarettes to go,
+                days_to_milestone and cig_rate
+        """
+        return self._memoized(('leaderboard', n), lambda: self._leaderboard(n))
+    
+    def _leaderboard(self, n):
+        rows = self.order('days_to_milestone', n=n)
+        rows = rows[~np.isnan(self.columns['days_to_milestone'][rows])]
+        board = self.frame(rows)
+        board['cigs_to_go'] = (board['days_to_milestone'] * board['cig_rate']).round()
+        return board[['user_id', 'next_milestone', 'cigs_to_go', 'days_to_milestone', 'cig_rate']]
+    
+    def summary(self, within_days=7):
+        """
+        Population summary of the forecast.
+        
+        Args:
+            within_days (int): Horizon for the "due soon" count
+        
+        Returns:
+            dict: users, users with a next milestone, users due within
+                ``within_days`` and median days to the next goal
+        """
+        return self._memoized(('summary', within_days), lambda: self._summary(within_days))
+    
+    def _summary(self, within_days):
+        days_to_next = self.columns['days_to_next']
+        return {
+            'users': len(self),
+            'with_milestone': int(np.count_nonzero(~np.isnan(self.columns['days_to_milestone']))),
+            'due_soon': int(np.count_nonzero(days_to_next <= within_days)),
+            'median_days_to_next': float(np.nanmedian(days_to_next)) if len(self) else float('nan'),
+        }
+    
+    def to_csv(self, path_or_buf=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Export every user's forecast as CSV, in row order.
+        
+        Written in chunks, so exporting millions of users never builds
+        one DataFrame of all of them.
+        
+        Args:
+            path_or_buf (str or file): Destination (default: return the text)
+            chunk_rows (int): Rows per chunk
+        
+        Returns:
+            str: CSV text if ``path_or_buf`` is None
+        """
+        buffer = io.StringIO() if path_or_buf is None else None
+        target = buffer if buffer is not None else path_or_buf
+        close = isinstance(target, str)
+        handle = open(target, 'w', newline='') if close else target
+        try:
+            for start in range(0, max(len(self), 1), chunk_rows):
+                rows = np.arange(start, min(start + chunk_rows, len(self)))
+                chunk = self.frame(rows)
+                # Rounded float64 writes faster than a float_format on float32
+                chunk[self.NUMERIC] = chunk[self.NUMERIC].astype(np.float64).round(2)
+                chunk.to_csv(handle, index=False, header=(start == 0))
+        finally:
+            if close:
+                handle.close()
+        return buffer.getvalue() if buffer is not None else None
+    
+    def to_csv_bytes(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Export every user's forecast as UTF-8 CSV bytes (for downloads).
+        
+        Each chunk is encoded as it is written, so the export is held once
+        as bytes rather than as text plus its encoded copy.
+        
+        Args:
+            chunk_rows (int): Rows per chunk
+        
+        Returns:
+            bytes: CSV file contents
+        """
+        buffer = io.BytesIO()
+        handle = io.TextIOWrapper(buffer, encoding='utf-8', newline='', write_through=True)
+        self.to_csv(handle, chunk_rows)
+        handle.detach()
+        return buffer.getvalue()
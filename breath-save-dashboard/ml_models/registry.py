@@ -0,0 +1,210 @@
+"""
+MODEL REGISTRY
+==============
+
+Purpose: Persist fitted model state so pages reuse it instead of refitting
+
+How it works:
+1. Key: model name + fingerprint of the training data + hyperparameters
+2. Lookup: in-process memory first, then a .npz file on disk
+3. Miss: the caller fits the model and saves its state under the key
+4. Any change to the data or the hyperparameters produces a new key
+
+Because entries live on disk, fitted state and cluster assignments are
+shared by every session in a process and by every worker process on the
+host. Writes go to a temporary file first and are renamed into place, so
+a reader never sees a half-written entry.
+
+Fingerprint:
+    blake2b(shape || dtype || raw feature bytes)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import weakref
+
+import numpy as np
+
+REGISTRY_VERSION = 1
+DEFAULT_ROOT = os.path.join('data', '.models')
+
+
+def data_fingerprint(df, columns):
+    """
+    Fingerprint the columns of a DataFrame that a model trains on.
+
+    Fingerprints are memoized per DataFrame object (or per table version
+    for shared views), so repeated calls with the same cached frame cost a
+    dictionary lookup.
+
+    Args:
+        df (pd.DataFrame): Training data
+        columns (list): Columns the model reads
+
+    Returns:
+        str: Hex digest
+    """
+    version = df.attrs.get('version')
+    if version is not None:
+        # Shared views (utils/data_access.py) are new objects on every render
+        # but carry their table version
+        memo_key = (df.attrs.get('table'), version, tuple(columns))
+        with _fingerprints_lock:
+            cached = _fingerprints.get(memo_key)
+        if cached is not None:
+            return cached[1]
+    else:
+        memo_key = (id(df), tuple(columns))
+        with _fingerprints_lock:
+            cached = _fingerprints.get(memo_key)
+        if cached is not None and cached[0]() is df:
+            return cached[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    for column in columns:
+        values = np.ascontiguousarray(df[column].to_numpy())
+        digest.update(f"{column}:{values.dtype.str}:{values.shape}".encode())
+        digest.update(values.tobytes())
+    fingerprint = digest.hexdigest()
+    with _fingerprints_lock:
+        # Drop frames that were garbage collected and older versions of this view
+        stale = [k for k, (ref, _) in _fingerprints.items()
+                 if (ref is not None and ref() is None)
+                 or (version is not None and ref is None and k[0] == memo_key[0] and k[2] == memo_key[2])]
+        for key in stale:
+            del _fingerprints[key]
+        _fingerprints[memo_key] = (None if version is not None else weakref.ref(df), fingerprint)
+    return fingerprint
+
+
+# Background fits and page threads fingerprint concurrently
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_ROOT):
+        """
+        Initialize registry rooted at a directory.
+
+        Args:
+            root (str): Directory for persisted entries
+        """
+        self.root = root
+        self._memory = {}
+        self._lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def key(self, name, fingerprint, params):
+        """
+        Build the registry key for a model version.
+
+        Args:
+            name (str): Model name
+            fingerprint (str): Training-data fingerprint
+            params (dict): Hyperparameters
+
+        Returns:
+            str: Key safe to use as a file name
+        """
+        payload = json.dumps({'v': REGISTRY_VERSION, 'params': params}, sort_keys=True, default=str)
+        params_hash = hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+        return f"{name}-{fingerprint}-{params_hash}"
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.npz")
+
+    def load(self, key):
+        """
+        Fetch a stored entry.
+
+        Args:
+            key (str): Registry key
+
+        Returns:
+            dict or None: Arrays saved under the key, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self.counters['memory_hits'] += 1
+                return self._memory[key]
+        path = self._path(key)
+        if not os.path.exists(path):
+            with self._lock:
+                self.counters['misses'] += 1
+            return None
+        with np.load(path, allow_pickle=False) as stored:
+            state = {name: stored[name] for name in stored.files}
+        with self._lock:
+            self._memory[key] = state
+            self.counters['disk_hits'] += 1
+        return state
+
+    def save(self, key, state):
+        """
+        Store an entry atomically.
+
+        Args:
+            key (str): Registry key
+            state (dict): Name -> np.ndarray
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._memory[key] = state
+
+    def stats(self):
+        """
+        Report lookup effectiveness.
+        
+        Returns:
+            dict: Counters and hit rate (memory and disk hits over all lookups)
+        """
+        with self._lock:
+            total = sum(self.counters.values())
+            hits = self.counters['memory_hits'] + self.counters['disk_hits']
+            return {**self.counters, 'hit_rate': hits / total if total else 0.0}
+    
+    def prune(self, name, fingerprint):
+        """
+        Delete entries of ``name`` that were trained on other data.
+
+        Entries for the current data with other hyperparameters are kept.
+
+        Args:
+            name (str): Model name
+            fingerprint (str): Fingerprint of the current training data
+        """
+        current = f"{name}-{fingerprint}-"
+        stale = lambda key: key.startswith(f"{name}-") and not key.startswith(current)
+        if os.path.isdir(self.root):
+            for entry in os.listdir(self.root):
+                if entry.endswith('.npz') and stale(entry):
+                    try:
+                        os.remove(os.path.join(self.root, entry))
+                    except FileNotFoundError:
+                        pass  # Another worker pruned it first
+        with self._lock:
+            for key in [k for k in self._memory if stale(k)]:
+                del self._memory[key]
+
+
+_registry = None
+
+
+def get_registry():
+    """
+    Process-wide ModelRegistry under data/.models.
+
+    Returns:
+        ModelRegistry: Shared registry
+    """
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
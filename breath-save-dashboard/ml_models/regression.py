@@ -25,18 +25,141 @@ Limitations:
 - Linear relationship assumption
 - May not capture behavior changes over time
 - Outliers can affect model accuracy
+
+Sufficient-Statistics Mode:
+For a single feature, least squares needs only n, Σx, Σy, Σxx, Σxy, Σyy:
+    m  = Sxy / Sxx
+    b  = ȳ - m·x̄
+    R² = Sxy² / (Sxx · Syy)
+    where Sxy = Σxy - n·x̄·ȳ (and likewise Sxx, Syy)
+SavingsPredictionModel(mode='sufficient_stats') keeps only these (as
+means and centered co-moments, which merge without cancellation error),
+supports partial_fit on new batches and merge of shard statistics, and
+reports the same coefficient, intercept and R² as sklearn in O(1) memory.
+
+Serving:
+The Predictions page does not refit on reruns. get_prediction_table fits
+once per model version (training-data fingerprint + table parameters),
+stores the plotted curve, the metrics and a dense lookup table over the
+slider domain (one entry per slider step) in the model registry, and the
+personal-prediction tool answers from that table with an array index.
+Fits, predictions and table builds are recorded as model.savings.* stages
+for the diagnostics page.
 """
 
 import numpy as np
 from sklearn.linear_model import LinearRegression
 
-class SavingsPredictionModel:
+from ml_models.registry import data_fingerprint, get_registry
+from utils.instrumentation import timed
+
+FEATURES = ['total_cigs_avoided', 'money_saved']
+
+class RegressionSufficientStats:
     def __init__(self):
-        """Initialize Linear Regression model."""
+        """Initialize empty statistics for y = mx + b."""
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.cxx = 0.0  # Σ(x - x̄)²
+        self.cxy = 0.0  # Σ(x - x̄)(y - ȳ)
+        self.cyy = 0.0  # Σ(y - ȳ)²
+    
+    def update(self, x, y):
+        """
+        Add a batch of observations.
+        
+        Args:
+            x (array-like): Feature values
+            y (array-like): Target values
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        # Rows with a blank value are left out of the fit
+        complete = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[complete], y[complete]
+        if len(x) == 0:
+            return
+        batch = RegressionSufficientStats()
+        batch.n = len(x)
+        batch.mean_x = x.mean()
+        batch.mean_y = y.mean()
+        dx = x - batch.mean_x
+        dy = y - batch.mean_y
+        batch.cxx = float(dx @ dx)
+        batch.cxy = float(dx @ dy)
+        batch.cyy = float(dy @ dy)
+        self.merge(batch)
+    
+    def merge(self, other):
+        """
+        Combine statistics from another batch or shard (Chan et al.).
+        
+        Args:
+            other (RegressionSufficientStats): Statistics to merge in
+        """
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.cxx += other.cxx + delta_x * delta_x * weight
+        self.cxy += other.cxy + delta_x * delta_y * weight
+        self.cyy += other.cyy + delta_y * delta_y * weight
+        self.mean_x += delta_x * other.n / n
+        self.mean_y += delta_y * other.n / n
+        self.n = n
+    
+    def sums(self):
+        """
+        Raw sufficient statistics.
+        
+        Returns:
+            dict: n, sum_x, sum_y, sum_xx, sum_xy, sum_yy
+        """
+        return {
+            'n': self.n,
+            'sum_x': self.n * self.mean_x,
+            'sum_y': self.n * self.mean_y,
+            'sum_xx': self.cxx + self.n * self.mean_x ** 2,
+            'sum_xy': self.cxy + self.n * self.mean_x * self.mean_y,
+            'sum_yy': self.cyy + self.n * self.mean_y ** 2,
+        }
+    
+    @property
+    def coefficient(self):
+        return self.cxy / self.cxx if self.cxx > 0 else 0.0
+    
+    @property
+    def intercept(self):
+        return self.mean_y - self.coefficient * self.mean_x
+    
+    @property
+    def r2_score(self):
+        if self.n < 2:
+            return float('nan')
+        if self.cyy == 0:
+            return 1.0  # Constant target is fitted exactly (sklearn convention)
+        return 1.0 - (self.cyy - self.coefficient * self.cxy) / self.cyy
+
+class SavingsPredictionModel:
+    def __init__(self, mode='sklearn'):
+        """
+        Initialize Linear Regression model.
+        
+        Args:
+            mode (str): 'sklearn' (default) or 'sufficient_stats'
+        """
+        if mode not in ('sklearn', 'sufficient_stats'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
         self.model = LinearRegression()
         self.X_train = None
         self.y_train = None
+        self.stats = RegressionSufficientStats() if mode == 'sufficient_stats' else None
         
+    @timed('model.savings.fit')
     def fit(self, df):
         """
         Fit regression model to data.
@@ -44,10 +167,44 @@ class SavingsPredictionModel:
         Args:
             df (pd.DataFrame): Data with columns: total_cigs_avoided, money_saved
         """
+        if self.stats is not None:
+            self.stats = RegressionSufficientStats()
+            self.partial_fit(df)
+            return
+        df = df[FEATURES].dropna()
         self.X_train = df['total_cigs_avoided'].values.reshape(-1, 1)
         self.y_train = df['money_saved'].values
         self.model.fit(self.X_train, self.y_train)
+    
+    def partial_fit(self, df):
+        """
+        Update the fit with a new batch (sufficient_stats mode only).
         
+        Args:
+            df (pd.DataFrame): Data with columns: total_cigs_avoided, money_saved
+        """
+        if self.stats is None:
+            raise ValueError("partial_fit requires mode='sufficient_stats'")
+        self.stats.update(df['total_cigs_avoided'].values, df['money_saved'].values)
+    
+    def merge(self, other):
+        """
+        Merge a model fitted on another shard (sufficient_stats mode only).
+        
+        Args:
+            other (SavingsPredictionModel or RegressionSufficientStats): Shard fit
+        """
+        if self.stats is None:
+            raise ValueError("merge requires mode='sufficient_stats'")
+        self.stats.merge(other.stats if isinstance(other, SavingsPredictionModel) else other)
+    
+    def _line(self):
+        """(coefficient, intercept) of the fitted line."""
+        if self.stats is not None:
+            return self.stats.coefficient, self.stats.intercept
+        return self.model.coef_[0], self.model.intercept_
+        
+    @timed('model.savings.predict')
     def predict(self, cigs_avoided):
         """
         Predict savings for given cigarettes avoided.
@@ -62,7 +219,10 @@ class SavingsPredictionModel:
             cigs_avoided = np.array([[cigs_avoided]])
         else:
             cigs_avoided = np.array(cigs_avoided).reshape(-1, 1)
-            
+        
+        if self.stats is not None:
+            coefficient, intercept = self._line()
+            return coefficient * cigs_avoided[:, 0].astype(float) + intercept
         return self.model.predict(cigs_avoided)
     
     def get_metrics(self):
@@ -72,13 +232,17 @@ class SavingsPredictionModel:
         Returns:
             dict: R² score, coefficient, intercept
         """
-        r2_score = self.model.score(self.X_train, self.y_train)
+        if self.stats is not None:
+            r2_score = self.stats.r2_score
+        else:
+            r2_score = self.model.score(self.X_train, self.y_train)
+        coefficient, intercept = self._line()
         
         return {
-            'r2_score': r2_score,
-            'coefficient': self.model.coef_[0],  # $ per cig avoided
-            'intercept': self.model.intercept_,
-            'interpretation': f"Each cigarette avoided = ${self.model.coef_[0]:.2f} saved"
+            'r2_score': float(r2_score),
+            'coefficient': float(coefficient),  # $ per cig avoided
+            'intercept': float(intercept),
+            'interpretation': f"Each cigarette avoided = ${coefficient:.2f} saved"
         }
     
     def get_prediction_range(self, max_value=2500, num_points=100):
@@ -92,6 +256,102 @@ class SavingsPredictionModel:
         Returns:
             tuple: (X values, y predictions)
         """
-        X_range = np.linspace(0, max_value, num_points).reshape(-1, 1)
-        y_pred = self.model.predict(X_range)
-        return X_range.flatten(), y_pred
+        X_range = np.linspace(0, max_value, num_points)
+        y_pred = self.predict(X_range)
+        return X_range, y_pred
+
+
+class PredictionTable:
+    def __init__(self, state):
+        """
+        Wrap arrays exported by PredictionTable.build.
+        
+        Args:
+            state (dict): Name -> np.ndarray (see build)
+        """
+        self.state = state
+        self.step = int(state['step'])
+        self.slider_max = int(state['slider_max'])
+        self.curve_x = state['curve_x']
+        self.curve_y = state['curve_y']
+        self.table = state['table']
+        self.coefficient = float(state['coefficient'])
+        self.intercept = float(state['intercept'])
+        self.metrics = {
+            'r2_score': float(state['r2_score']),
+            'coefficient': self.coefficient,
+            'intercept': self.intercept,
+            'interpretation': f"Each cigarette avoided = ${self.coefficient:.2f} saved",
+        }
+    
+    @classmethod
+    def build(cls, model, slider_max, step=50, num_points=100):
+        """
+        Precompute the curve and slider lookup table from a fitted model.
+        
+        Args:
+            model (SavingsPredictionModel): Fitted model
+            slider_max (int): Largest slider value
+            step (int): Slider step
+            num_points (int): Points on the plotted curve
+            
+        Returns:
+            PredictionTable: Table for this model version
+        """
+        metrics = model.get_metrics()
+        curve_x, curve_y = model.get_prediction_range(max_value=slider_max, num_points=num_points)
+        slider_values = np.arange(0, slider_max + 1, step)
+        return cls({
+            'step': np.array(step),
+            'slider_max': np.array(slider_max),
+            'curve_x': curve_x,
+            'curve_y': curve_y,
+            'table': np.asarray(model.predict(slider_values), dtype=float),
+            'coefficient': np.array(metrics['coefficient'], dtype=float),
+            'intercept': np.array(metrics['intercept'], dtype=float),
+            'r2_score': np.array(metrics['r2_score'], dtype=float),
+        })
+    
+    def lookup(self, cigs_avoided):
+        """
+        Predicted savings for a slider value.
+        
+        Args:
+            cigs_avoided (int): Slider value
+            
+        Returns:
+            float: Predicted savings amount
+        """
+        index, remainder = divmod(int(cigs_avoided), self.step)
+        if remainder == 0 and 0 <= index < len(self.table):
+            return float(self.table[index])
+        # Off-grid values (e.g. the slider maximum) use the stored line
+        return self.coefficient * cigs_avoided + self.intercept
+
+@timed('model.savings.prediction_table')
+def get_prediction_table(df, registry=None, step=50, num_points=100):
+    """
+    Prediction curve and slider table for the current data, fitted once.
+    
+    Args:
+        df (pd.DataFrame): Data with columns: total_cigs_avoided, money_saved
+        registry (ModelRegistry): Registry to use (default: process-wide)
+        step (int): Slider step
+        num_points (int): Points on the plotted curve
+        
+    Returns:
+        PredictionTable: Table for the current model version
+    """
+    registry = registry or get_registry()
+    fingerprint = data_fingerprint(df, FEATURES)
+    key = registry.key('prediction', fingerprint, {'step': step, 'num_points': num_points})
+    state = registry.load(key)
+    if state is not None:
+        return PredictionTable(state)
+    
+    model = SavingsPredictionModel(mode='sufficient_stats')
+    model.fit(df)
+    table = PredictionTable.build(model, int(df['total_cigs_avoided'].max()), step, num_points)
+    registry.save(key, table.state)
+    registry.prune('prediction', fingerprint)
+    return table
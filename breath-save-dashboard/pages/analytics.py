@@ -1,34 +1,114 @@
 import streamlit as st
 import plotly.express as px
-from ml_models.clustering import UserSegmentationModel
+from utils.instrumentation import plotly_chart, timed
+from utils.plot_sampling import reduce_plot_data
+from utils.precompute import failure_message
 
-def analytics_page(milestones_df):
-    """ML analytics with K-Means clustering and correlations."""
+CLUSTER_COLORS = ['#ef4444', '#3b82f6', '#10b981', '#f59e0b', '#8b5cf6', '#ec4899', '#14b8a6', '#84cc16']
+
+def _assign_clusters(milestones_df, overlay, segmentation):
+    """Cluster labels for this view from the newest fitted model, or None."""
+    clusters = overlay.get(milestones_df, 'cluster')
+    if clusters is None and segmentation is not None:
+        if segmentation.version == milestones_df.attrs.get('version'):
+            clusters = segmentation.value['clusters']
+        else:
+            # Rows changed since the last fit: use its centroids until the refit is published
+            clusters = segmentation.value['model'].predict(milestones_df)
+        overlay.set(milestones_df, 'cluster', clusters)
+    return clusters
+
+def _assign_swept_clusters(milestones_df, overlay, model):
+    """Cluster labels for this view from a swept model, cached per k in the overlay."""
+    column = f"cluster_k{model.n_clusters}"
+    clusters = overlay.get(milestones_df, column)
+    if clusters is None:
+        clusters = model.predict(milestones_df)
+        overlay.set(milestones_df, column, clusters)
+    return clusters
+
+def _sweep_section(sweep, current_k):
+    """Sweep results and the segment count picker; returns the chosen k."""
+    with st.expander("Choose the number of segments", expanded=False):
+        table = sweep.table()
+        st.caption(f"K-Means fitted for k = {min(sweep.results)}–{max(sweep.results)} with "
+                   f"{len(sweep.seeds)} seeds each in {sweep.wall_s:.1f} s. Inertia is the best seed's; "
+                   f"silhouette is scored on a {sweep.sample_size:,}-user sample (higher is better).")
+        col1, col2 = st.columns(2)
+        with col1:
+            plotly_chart(px.line(table, x='k', y='inertia', markers=True, title='Inertia (elbow)'),
+                         use_container_width=True)
+        with col2:
+            plotly_chart(px.line(table, x='k', y='silhouette', markers=True, title='Silhouette'),
+                         use_container_width=True)
+        st.dataframe(table, use_container_width=True, hide_index=True,
+                     column_config={'fit_s': st.column_config.NumberColumn("mean fit_s", format="%.3f"),
+                                    'fit_s_total': st.column_config.NumberColumn(format="%.3f"),
+                                    'silhouette': st.column_config.NumberColumn(format="%.3f")})
+    options = sorted(set(sweep.results) | {current_k})
+    best = sweep.best_k()
+    return st.selectbox("Segments (k)", options, index=options.index(current_k),
+                        format_func=lambda k: f"{k} (best silhouette)" if k == best else str(k))
+
+@timed('page.analytics')
+def analytics_page(milestones_df, correlation, overlay, segmentation, cluster_stats, sweep=None, failures=None):
+    """ML analytics with K-Means clustering and correlations (see utils/streaming_correlation.py)."""
     st.title("🤖 ML Analytics - User Segmentation")
     
-    # Initialize and run clustering model
-    segmentation_model = UserSegmentationModel(n_clusters=3)
-    clusters = segmentation_model.fit_predict(milestones_df)
-    milestones_df['cluster'] = clusters
+    # The model is fitted by the background scheduler (utils/precompute.py);
+    # labels live in the session overlay because milestones_df is a
+    # read-only view shared by every session
+    clusters = _assign_clusters(milestones_df, overlay, segmentation)
+    model = None if clusters is None else segmentation.value['model']
+    
+    # Other segment counts come from the background sweep's centroids, without refitting
+    if model is not None and sweep is not None:
+        k = _sweep_section(sweep.value, model.n_clusters)
+        if k != model.n_clusters:
+            model = sweep.value.model(k)
+            clusters = _assign_swept_clusters(milestones_df, overlay, model)
+            cluster_stats = None
+    n_segments = model.n_clusters if model is not None else 3
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("3D User Segmentation (K-Means)")
-        st.info("This visualization uses K-Means clustering to segment users into 3 groups based on:\n"
+        st.info(f"This visualization uses K-Means clustering to segment users into {n_segments} groups based on:\n"
                 "- Cigarettes avoided\n- Money saved\n- Cigarettes smoked")
         
-        fig_3d = px.scatter_3d(
-            milestones_df,
-            x='total_cigs_avoided',
-            y='money_saved',
-            z='total_cigs_smoked',
-            color='cluster',
-            title='K-Means Clustering (3 User Segments)',
-            color_discrete_sequence=['#ef4444', '#3b82f6', '#10b981'],
-            hover_data=['user_id', 'points']
-        )
-        st.plotly_chart(fig_3d, use_container_width=True)
+        if clusters is None:
+            failure = (failures or {}).get('segmentation')
+            if failure is not None:
+                st.error(failure_message("Training the segmentation model", failure), icon="⚠️")
+            else:
+                st.warning("The segmentation model is being trained in the background.", icon="⏳")
+            st.button("Check again")
+        else:
+            plot_df = milestones_df.assign(cluster=clusters)
+            
+            # Large user bases are sampled per cluster or binned into voxels
+            plot_df, sampling = reduce_plot_data(
+                plot_df, ['total_cigs_avoided', 'money_saved', 'total_cigs_smoked'], by='cluster'
+            )
+            names = [model.cluster_name(cluster_id) for cluster_id in range(n_segments)]
+            plot_df = plot_df.assign(segment=[names[cluster_id] for cluster_id in plot_df['cluster']])
+            binned = sampling['mode'] == 'binned'
+            fig_3d = px.scatter_3d(
+                plot_df,
+                x='total_cigs_avoided',
+                y='money_saved',
+                z='total_cigs_smoked',
+                color='segment',
+                title=f'K-Means Clustering ({n_segments} User Segments)',
+                category_orders={'segment': names},
+                color_discrete_sequence=CLUSTER_COLORS,
+                size='count' if binned else None,
+                hover_data=['count'] if binned else ['user_id', 'points']
+            )
+            plotly_chart(fig_3d, use_container_width=True)
+            if sampling['mode'] != 'full':
+                st.caption(f"Chart shows {sampling['label']}")
     
     with col2:
         st.subheader("Feature Correlations")
@@ -37,26 +117,41 @@ def analytics_page(milestones_df):
                 "-1.0 = Perfect negative relationship\n"
                 "0.0 = No relationship")
         
-        corr_data = milestones_df[['total_cigs_avoided', 'money_saved', 'total_cigs_smoked', 'points']]
-        corr_matrix = corr_data.corr()
-        fig_heatmap = px.imshow(
-            corr_matrix,
-            title='Correlation Heatmap',
-            color_continuous_scale='RdBu',
-            zmin=-1, zmax=1,
-            labels=dict(color='Correlation')
-        )
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        # Built by the background scheduler; no pass over the rows here
+        if correlation is None:
+            failure = (failures or {}).get('correlation')
+            if failure is not None:
+                st.error(failure_message("Computing correlations", failure), icon="⚠️")
+            else:
+                st.warning("Correlations are being computed in the background.", icon="⏳")
+        else:
+            corr_matrix = correlation.correlation()
+            fig_heatmap = px.imshow(
+                corr_matrix,
+                title='Correlation Heatmap',
+                color_continuous_scale='RdBu',
+                zmin=-1, zmax=1,
+                labels=dict(color='Correlation')
+            )
+            plotly_chart(fig_heatmap, use_container_width=True)
     
     st.divider()
     
-    # Cluster Analysis with statistics
+    if clusters is None:
+        return
+    
+    # Cluster Analysis with statistics; published with the model unless rows changed since
     st.subheader("Cluster Analysis & Statistics")
-    cluster_stats = segmentation_model.get_cluster_stats(milestones_df, clusters)
+    if cluster_stats is not None and cluster_stats.version == milestones_df.attrs.get('version'):
+        cluster_stats = cluster_stats.value
+    else:
+        cluster_stats = model.get_cluster_stats(milestones_df, clusters)
     
-    cluster_cols = st.columns(3)
+    per_row = min(len(cluster_stats), 4)
     for idx, (cluster_name, stats) in enumerate(cluster_stats.items()):
-        with cluster_cols[idx]:
+        if idx % per_row == 0:
+            cluster_cols = st.columns(per_row)
+        with cluster_cols[idx % per_row]:
             with st.container(border=True):
                 st.markdown(f"### {cluster_name}")
                 st.metric("Users", stats['users'])
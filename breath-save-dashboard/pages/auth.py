@@ -1,7 +1,9 @@
 import streamlit as st
 from datetime import datetime
 from utils.auth import verify_user, register_user
+from utils.instrumentation import timed
 
+@timed('page.login')
 def login_page():
     """Display login and registration page."""
     st.markdown('<div class="main-header"><h1>🚭 Breath & Save</h1></div>', 
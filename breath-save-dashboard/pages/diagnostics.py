@@ -0,0 +1,115 @@
+import time
+import streamlit as st
+import pandas as pd
+from utils.instrumentation import PROFILE_MODES, get_instrumentation, timed
+
+PAGE_NAMES = ["📊 Overview", "🤖 Analytics", "🔮 Predictions", "🏆 Rewards", "👤 User Detail", "⚙️ Settings"]
+
+def _stage_table(stages):
+    """One row per stage, times in milliseconds."""
+    rows = []
+    for name, stats in stages.items():
+        rows.append({
+            'stage': name,
+            'calls': stats['calls'],
+            'errors': stats['errors'],
+            'mean_ms': stats['mean_s'] * 1000,
+            'p50_ms': stats['p50_s'] * 1000,
+            'p95_ms': stats['p95_s'] * 1000,
+            'p99_ms': stats['p99_s'] * 1000,
+            'max_ms': stats['max_s'] * 1000,
+            'self_total_s': stats['self_s'],
+            'mean_rss_delta_mb': stats['mean_rss_delta_mb'],
+        })
+    return pd.DataFrame(rows)
+
+@timed('page.diagnostics')
+def diagnostics_page(diagnostics, metrics_server=None):
+    """Admin-only stage timings, cache hit rates and per-request profiling (see utils/instrumentation.py)."""
+    st.title("🩺 Diagnostics")
+    
+    sources = diagnostics['sources']
+    table_cache = sources.get('table_cache', {})
+    registry = sources.get('model_registry', {})
+    
+    first_render = diagnostics['first_render_s']
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Uptime", f"{diagnostics['uptime_s'] / 60:.0f} min")
+    with col2:
+        st.metric("First Render", "–" if first_render is None else f"{first_render:.2f} s",
+                  help="From the worker's first script run to its first rendered page, including imports")
+    with col3:
+        st.metric("Page Renders", sum(s['calls'] for n, s in diagnostics['stages'].items() if n.startswith('page.')))
+    with col4:
+        st.metric("Table Cache Hit Rate", f"{table_cache.get('hit_rate', 0.0):.1%}")
+    with col5:
+        st.metric("Model Registry Hit Rate", f"{registry.get('hit_rate', 0.0):.1%}")
+    
+    st.divider()
+    
+    st.subheader("Stage Latency")
+    st.caption("Percentiles are estimated from histogram buckets. Self time excludes nested stages, so for "
+               "`page.*` it is the page's own pandas and Streamlit work; `plotly.chart` is figure serialization and `import.*` the first import of a page module. "
+               "Memory deltas are process-wide and include concurrent renders.")
+    stages = _stage_table(diagnostics['stages'])
+    if stages.empty:
+        st.info("No stages recorded yet. Open a few pages first.")
+    else:
+        st.dataframe(stages, use_container_width=True, hide_index=True,
+                     column_config={column: st.column_config.NumberColumn(format="%.2f")
+                                    for column in stages.columns if column not in ('stage', 'calls', 'errors')})
+        st.bar_chart(stages.set_index('stage')['self_total_s'], horizontal=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Table Cache")
+        if table_cache.get('tables'):
+            st.dataframe(pd.DataFrame(table_cache['tables']).T, use_container_width=True)
+    with col2:
+        st.subheader("Model Registry")
+        if registry:
+            st.dataframe(pd.Series(registry, name='value'), use_container_width=True)
+    
+    st.divider()
+    
+    st.subheader("Metrics Export")
+    if metrics_server is not None:
+        host, port = metrics_server.server_address[:2]
+        st.write(f"Prometheus endpoint: `http://{host}:{port}/metrics`")
+    else:
+        st.caption("Set BREATHSAVE_METRICS_PORT to serve `/metrics` for a local Prometheus scraper.")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download metrics (Prometheus text)", get_instrumentation().to_prometheus(),
+                           file_name="breathsave-metrics.prom", mime="text/plain", use_container_width=True)
+    with col2:
+        if st.button("Reset statistics", use_container_width=True):
+            get_instrumentation().reset()
+            st.rerun()
+    
+    st.divider()
+    
+    st.subheader("Profile a Request")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        target = st.selectbox("Page", PAGE_NAMES)
+    with col2:
+        mode = st.selectbox("Profiler", PROFILE_MODES,
+                            format_func=lambda m: "cProfile (deterministic)" if m == 'cprofile' else "Sampling (5 ms)")
+    with col3:
+        st.write("")
+        if st.button("Profile next render", use_container_width=True):
+            st.session_state.profile_next = {'page': target, 'mode': mode}
+    
+    armed = st.session_state.get('profile_next')
+    if armed:
+        st.info(f"The next render of {armed['page']} will be profiled with {armed['mode']}.")
+    
+    profile = st.session_state.get('last_profile')
+    if profile is not None:
+        st.write(f"**{profile.label}** · {profile.mode} · {profile.seconds * 1000:.0f} ms · "
+                 f"{time.strftime('%H:%M:%S', time.localtime(profile.created))}")
+        st.download_button("Download profile", profile.data, file_name=profile.filename,
+                           mime="application/octet-stream")
+        st.code(profile.summary, language=None)
@@ -1,22 +1,50 @@
 import streamlit as st
 import plotly.express as px
+import pandas as pd
+from utils.instrumentation import plotly_chart, timed
+from utils.precompute import failure_message
 
-def overview_page(milestones_df):
-    """Dashboard overview with key metrics and distributions."""
+def _histogram_figure(overview, column, title, color, label):
+    """Bar chart of a precomputed histogram."""
+    centers, counts, width = overview.histogram(column)
+    fig = px.bar(
+        x=centers,
+        y=counts,
+        title=title,
+        color_discrete_sequence=[color],
+        labels={'x': label, 'y': 'Number of Users'}
+    )
+    fig.update_traces(width=width)
+    fig.update_layout(showlegend=False, bargap=0)
+    return fig
+
+@timed('page.overview')
+def overview_page(overview, failures=None):
+    """Dashboard overview with key metrics and distributions (see utils/overview_aggregates.py)."""
     st.title("📊 Dashboard Overview")
     
+    # Built by the background scheduler (utils/precompute.py)
+    if overview is None:
+        failure = (failures or {}).get('overview')
+        if failure is not None:
+            st.error(failure_message("Computing the overview", failure), icon="⚠️")
+        else:
+            st.warning("The overview is being computed in the background.", icon="⏳")
+        st.button("Check again")
+        return
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Active Users", len(milestones_df), delta="Community")
+        st.metric("Total Active Users", overview.rows, delta="Community")
     with col2:
-        avg_cigs_avoided = milestones_df['total_cigs_avoided'].mean()
+        avg_cigs_avoided = overview.mean('total_cigs_avoided')
         st.metric("Avg Cigarettes Avoided", f"{avg_cigs_avoided:.0f}")
     with col3:
-        total_savings = milestones_df['money_saved'].sum()
+        total_savings = overview.total('money_saved')
         st.metric("Total Collective Savings", f"${total_savings:,.0f}")
     with col4:
-        avg_days = milestones_df['total_days'].mean()
+        avg_days = overview.mean('total_days')
         st.metric("Avg Days in Program", f"{avg_days:.0f}")
     
     st.divider()
@@ -24,40 +52,28 @@ def overview_page(milestones_df):
     col1, col2 = st.columns(2)
     
     with col1:
-        fig_savings = px.histogram(
-            milestones_df, 
-            x='money_saved', 
-            nbins=40,
-            title='Money Saved Distribution (All Users)',
-            color_discrete_sequence=['#10b981'],
-            labels={'money_saved': 'Money Saved ($)', 'count': 'Number of Users'}
+        fig_savings = _histogram_figure(
+            overview, 'money_saved', 'Money Saved Distribution (All Users)', '#10b981', 'Money Saved ($)'
         )
-        fig_savings.update_layout(showlegend=False)
-        st.plotly_chart(fig_savings, use_container_width=True)
+        plotly_chart(fig_savings, use_container_width=True)
     
     with col2:
-        fig_cigs = px.histogram(
-            milestones_df, 
-            x='total_cigs_avoided', 
-            nbins=40,
-            title='Cigarettes Avoided Distribution',
-            color_discrete_sequence=['#3b82f6'],
-            labels={'total_cigs_avoided': 'Cigarettes Avoided', 'count': 'Number of Users'}
+        fig_cigs = _histogram_figure(
+            overview, 'total_cigs_avoided', 'Cigarettes Avoided Distribution', '#3b82f6', 'Cigarettes Avoided'
         )
-        fig_cigs.update_layout(showlegend=False)
-        st.plotly_chart(fig_cigs, use_container_width=True)
+        plotly_chart(fig_cigs, use_container_width=True)
     
     st.divider()
     
-    top_savers = milestones_df.nlargest(15, 'money_saved')[['user_id', 'money_saved', 'total_cigs_avoided']]
+    top_savers = pd.DataFrame(overview.leaderboard(), columns=['user_id', 'money_saved', 'total_cigs_avoided'])
     fig_top = px.bar(
         top_savers, 
         x='user_id', 
         y='money_saved',
-        title='Top 15 Money Savers',
+        title=f'Top {overview.top_savers.n} Money Savers',
         hover_data=['total_cigs_avoided'],
         color='money_saved',
         color_continuous_scale='Viridis'
     )
     fig_top.update_layout(showlegend=False)
-    st.plotly_chart(fig_top, use_container_width=True)
+    plotly_chart(fig_top, use_container_width=True)
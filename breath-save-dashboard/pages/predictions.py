@@ -1,11 +1,70 @@
 import streamlit as st
 import numpy as np
 import plotly.graph_objects as go
-from ml_models.regression import SavingsPredictionModel
+from utils.instrumentation import plotly_chart, timed
+from utils.plot_sampling import reduce_plot_data
+from utils.precompute import failure_message
 
-def predictions_page(milestones_df):
+SORT_COLUMNS = {
+    'days_to_next': "Days to next goal",
+    'days_to_milestone': "Days to next milestone",
+    'days_to_savings_target': "Days to next savings target",
+    'cig_rate': "Cigarettes avoided per day",
+    'money_rate': "Money saved per day",
+}
+
+def _forecast_section(forecast):
+    """Per-user goal forecasts: summary, leaderboard, sortable table and export."""
+    st.subheader("🎯 Goal Forecasts")
+    st.info("Days until each user's next milestone (cigarettes avoided) and savings target, from their own "
+            "daily rate blended with the population: users with short histories lean on the population rate "
+            "and the regression's $ per cigarette.")
+    
+    summary = forecast.summary()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Users Forecast", f"{summary['users']:,}")
+    with col2:
+        st.metric("Next Goal Within 7 Days", f"{summary['due_soon']:,}")
+    with col3:
+        st.metric("Median Days to Next Goal", f"{summary['median_days_to_next']:.0f}")
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.markdown("**Closest to Next Milestone**")
+        st.dataframe(forecast.leaderboard(10), use_container_width=True, hide_index=True,
+                     column_config={column: st.column_config.NumberColumn(format="%.1f")
+                                    for column in ('cigs_to_go', 'days_to_milestone', 'cig_rate')})
+    with col2:
+        sort_col1, sort_col2, sort_col3 = st.columns(3)
+        with sort_col1:
+            by = st.selectbox("Sort by", list(SORT_COLUMNS), format_func=SORT_COLUMNS.get)
+        with sort_col2:
+            ascending = st.toggle("Smallest first", value=True)
+        with sort_col3:
+            rows = st.number_input("Rows", min_value=10, max_value=5000, value=100, step=10)
+        st.dataframe(forecast.sort(by, ascending, int(rows)), use_container_width=True, hide_index=True)
+    
+    # The CSV is only built when the button is clicked, encoded chunk by chunk
+    st.download_button("Download all forecasts (CSV)", forecast.to_csv_bytes,
+                       file_name="breathsave-goal-forecasts.csv", mime="text/csv")
+
+@timed('page.predictions')
+def predictions_page(milestones_df, prediction, forecast=None, failures=None):
     """ML predictions using linear regression model."""
     st.title("🔮 Savings Predictions (Linear Regression)")
+    failures = failures or {}
+    
+    # Fitted by the background scheduler (utils/precompute.py); the newest
+    # published table is used even if rows were appended since
+    if prediction is None:
+        if 'prediction' in failures:
+            st.error(failure_message("Fitting the savings model", failures['prediction']), icon="⚠️")
+        else:
+            st.warning("The savings model is being fitted in the background.", icon="⏳")
+        st.button("Check again")
+        return
+    prediction_table = prediction.value
     
     col1, col2 = st.columns([2, 1])
     
@@ -13,23 +72,22 @@ def predictions_page(milestones_df):
         st.info("This model uses Linear Regression to predict savings based on cigarettes avoided.\n"
                 "Formula: Money Saved = Coefficient × Cigarettes Avoided + Intercept")
         
-        # Train model
-        prediction_model = SavingsPredictionModel()
-        prediction_model.fit(milestones_df)
+        X_range, y_pred = prediction_table.curve_x, prediction_table.curve_y
         
-        # Get prediction range for visualization
-        X_range, y_pred = prediction_model.get_prediction_range(
-            max_value=milestones_df['total_cigs_avoided'].max(),
-            num_points=100
-        )
+        # Large user bases are density-sampled or binned before plotting
+        plot_df, sampling = reduce_plot_data(milestones_df, ['total_cigs_avoided', 'money_saved'])
+        if sampling['mode'] == 'binned':
+            marker_size = 4 + 16 * np.sqrt(plot_df['count'] / plot_df['count'].max())
+        else:
+            marker_size = 8
         
         fig_pred = go.Figure()
         fig_pred.add_trace(go.Scatter(
-            x=milestones_df['total_cigs_avoided'],
-            y=milestones_df['money_saved'],
+            x=plot_df['total_cigs_avoided'],
+            y=plot_df['money_saved'],
             mode='markers',
-            name='Actual Data',
-            marker=dict(size=8, color='#3b82f6', opacity=0.6, line=dict(width=1, color='white'))
+            name='Actual Data' if sampling['mode'] == 'full' else 'Actual Data (sampled)',
+            marker=dict(size=marker_size, color='#3b82f6', opacity=0.6, line=dict(width=1, color='white'))
         ))
         fig_pred.add_trace(go.Scatter(
             x=X_range,
@@ -45,11 +103,13 @@ def predictions_page(milestones_df):
             hovermode='closest',
             height=400
         )
-        st.plotly_chart(fig_pred, use_container_width=True)
+        plotly_chart(fig_pred, use_container_width=True)
+        if sampling['mode'] != 'full':
+            st.caption(f"Chart shows {sampling['label']}")
     
     with col2:
         st.subheader("Model Performance")
-        metrics = prediction_model.get_metrics()
+        metrics = prediction_table.metrics
         st.metric("R² Score", f"{metrics['r2_score']:.3f}")
         st.metric("Coefficient ($/cig)", f"${metrics['coefficient']:.2f}")
         st.metric("Intercept ($)", f"${metrics['intercept']:.2f}")
@@ -60,12 +120,26 @@ def predictions_page(milestones_df):
     col1, col2, col3 = st.columns(3)
     with col1:
         st.subheader("Personal Prediction Tool")
-        cigs_goal = st.slider("Cigarettes you plan to avoid", 0, int(milestones_df['total_cigs_avoided'].max()), 500, step=50)
+        cigs_goal = st.slider("Cigarettes you plan to avoid", 0, prediction_table.slider_max, 500, step=prediction_table.step)
     
     with col2:
-        predicted = prediction_model.predict(cigs_goal)[0]
+        predicted = prediction_table.lookup(cigs_goal)
         st.metric("Predicted Savings", f"${predicted:.2f}", delta=f"${predicted/max(cigs_goal, 1):.2f} per cig")
     
     with col3:
-        days_estimate = max(0, predicted / 10)
+        if forecast is not None and forecast.value.population_cig_rate > 0:
+            # At the population's pace of cigarettes avoided per day
+            days_estimate = cigs_goal / forecast.value.population_cig_rate
+        else:
+            days_estimate = max(0, predicted / 10)
         st.metric("Estimated Timeline", f"{days_estimate:.0f} days")
+    
+    st.divider()
+    
+    if forecast is None:
+        if 'forecast' in failures:
+            st.error(failure_message("Computing goal forecasts", failures['forecast']), icon="⚠️")
+        else:
+            st.warning("Goal forecasts are being computed in the background.", icon="⏳")
+    else:
+        _forecast_section(forecast.value)
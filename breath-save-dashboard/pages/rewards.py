@@ -1,40 +1,54 @@
 import streamlit as st
 import plotly.express as px
+import pandas as pd
+from utils.instrumentation import plotly_chart, timed
+from utils.precompute import failure_message
 
-def rewards_page(milestones_df, rewards_df):
-    """Rewards and wallet tracking with analytics."""
+@timed('page.rewards')
+def rewards_page(overview, rewards_index, failures=None):
+    """Rewards and wallet tracking from precomputed counters (see utils/rewards_index.py)."""
     st.title("🏆 Rewards & Wallet")
     
+    # Point totals come from the Overview aggregates, built in the background
+    if overview is None:
+        failure = (failures or {}).get('overview')
+        if failure is not None:
+            st.error(failure_message("Computing point totals", failure), icon="⚠️")
+        else:
+            st.warning("Point totals are being computed in the background.", icon="⏳")
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_points = milestones_df['points'].sum()
-        st.metric("Total Points Earned", f"{total_points:,}")
+        total_points = "—" if overview is None else f"{int(overview.total('points')):,}"
+        st.metric("Total Points Earned", total_points)
     with col2:
-        redeemed_count = len(rewards_df[rewards_df['redemption_status'] == 'redeemed'])
+        redeemed_count = rewards_index.status_count('redeemed')
         st.metric("Rewards Redeemed", redeemed_count)
     with col3:
-        pending_count = len(rewards_df[rewards_df['redemption_status'] == 'pending'])
+        pending_count = rewards_index.status_count('pending')
         st.metric("Pending Rewards", pending_count)
     with col4:
-        avg_points = milestones_df['points'].mean()
-        st.metric("Avg Points/User", f"{avg_points:.0f}")
+        avg_points = "—" if overview is None else f"{overview.mean('points'):.0f}"
+        st.metric("Avg Points/User", avg_points)
     
     st.divider()
     
     col1, col2 = st.columns(2)
     
     with col1:
+        status_counts = rewards_index.status_counts()
         fig_status = px.pie(
-            rewards_df,
-            names='redemption_status',
+            names=status_counts.index,
+            values=status_counts.values,
             title='Reward Redemption Status',
+            color=status_counts.index,
             color_discrete_map={'redeemed': '#10b981', 'pending': '#f59e0b'}
         )
-        st.plotly_chart(fig_status, use_container_width=True)
+        plotly_chart(fig_status, use_container_width=True)
     
     with col2:
-        reward_type_counts = rewards_df['reward_type'].value_counts()
+        reward_type_counts = rewards_index.type_counts()
         fig_types = px.bar(
             x=reward_type_counts.index,
             y=reward_type_counts.values,
@@ -42,9 +56,18 @@ def rewards_page(milestones_df, rewards_df):
             labels={'x': 'Reward Type', 'y': 'Count'},
             color_discrete_sequence=['#8b5cf6']
         )
-        st.plotly_chart(fig_types, use_container_width=True)
+        plotly_chart(fig_types, use_container_width=True)
     
     st.divider()
-    st.subheader("Top Reward Earners")
-    top_earners = milestones_df.nlargest(10, 'points')[['user_id', 'points', 'money_saved']]
-    st.dataframe(top_earners, use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Top Reward Earners")
+        if overview is not None:
+            top_earners = pd.DataFrame(overview.earners_leaderboard(), columns=['user_id', 'points', 'money_saved'])
+            st.dataframe(top_earners, use_container_width=True, hide_index=True)
+    
+    with col2:
+        st.subheader("Top Redeemers")
+        st.dataframe(rewards_index.leaderboard(10, 'redeemed'), use_container_width=True, hide_index=True)
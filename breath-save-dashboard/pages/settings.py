@@ -1,8 +1,11 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
 from utils.auth import update_password
+from utils.instrumentation import timed
 
-def settings_page():
+@timed('page.settings')
+def settings_page(job_status=None):
     """Account settings and data management."""
     st.title("⚙️ Settings")
     
@@ -37,3 +40,22 @@ def settings_page():
                 st.success(message)
             else:
                 st.error(message)
+    
+    if job_status is not None:
+        st.divider()
+        
+        st.subheader("Background Jobs")
+        st.caption(f"Models and aggregates are rebuilt when the data changes. Serving data version `{job_status['version']}`.")
+        counters = job_status['counters']
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Submitted", counters['submitted'])
+        col2.metric("Succeeded", counters['succeeded'])
+        col3.metric("Failed", counters['failed'])
+        col4.metric("Deduplicated", counters['deduplicated'])
+        for name, failure in job_status['failures'].items():
+            st.error(f"`{name}` failed {failure['attempts']} time(s) for this version: {failure['error']}. "
+                     f"Retrying in {failure['retry_in_s']:.0f}s.")
+        if job_status['durations']:
+            st.dataframe(pd.DataFrame(job_status['durations']).T, use_container_width=True)
+        if job_status['jobs']:
+            st.dataframe(pd.DataFrame(job_status['jobs']), use_container_width=True, hide_index=True)
@@ -0,0 +1,73 @@
+import streamlit as st
+import plotly.express as px
+from utils.data_loader import load_user_detail
+from utils.instrumentation import plotly_chart, timed
+
+@timed('page.user_detail')
+def user_detail_page():
+    """Per-user drill-down served from the user_id index (see utils/user_index.py)."""
+    st.title("👤 User Detail")
+
+    user_id = st.text_input("User ID", value=st.session_state.get('detail_user_id', ''), placeholder="e.g. user_0001").strip()
+    if not user_id:
+        st.info("Enter a user ID to see their milestones, redemptions and notifications.")
+        return
+    st.session_state.detail_user_id = user_id
+
+    detail = load_user_detail(user_id)
+    if detail is None:
+        st.error("Data files not found in /data directory")
+        return
+    milestones = detail['milestones']
+    rewards = detail['rewards']
+    notifications = detail['notifications']
+    if milestones.empty and rewards.empty and notifications.empty:
+        st.warning(f"No records found for user `{user_id}`")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    if not milestones.empty:
+        progress = milestones.iloc[-1]
+        with col1:
+            st.metric("Smoke-Free Days", f"{int(progress['total_days']):,}")
+        with col2:
+            st.metric("Cigarettes Avoided", f"{int(progress['total_cigs_avoided']):,}")
+        with col3:
+            st.metric("Money Saved", f"${progress['money_saved']:,.2f}")
+        with col4:
+            st.metric("Points", f"{int(progress['points']):,}")
+    else:
+        st.caption("No milestone record for this user.")
+
+    st.divider()
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Redemptions")
+        if rewards.empty:
+            st.caption("No wallet entries.")
+        else:
+            redeemed = rewards[rewards['redemption_status'] == 'redeemed']
+            st.write(f"**{len(redeemed)}** redeemed of **{len(rewards)}** rewards · "
+                     f"**{int(redeemed['points_cost'].sum()):,}** points spent")
+            st.dataframe(rewards.drop(columns=['user_id']), use_container_width=True, hide_index=True)
+
+    with col2:
+        st.subheader("Notification History")
+        if notifications.empty:
+            st.caption("No notifications scheduled.")
+        else:
+            history = notifications.sort_values('schedule_time', ascending=False)
+            st.write(f"**{int(history['sent_flag'].sum())}** sent of **{len(history)}** scheduled")
+            type_counts = history['type'].value_counts()
+            fig_types = px.bar(
+                x=type_counts.index,
+                y=type_counts.values,
+                labels={'x': 'Type', 'y': 'Count'},
+                color_discrete_sequence=['#3b82f6'],
+                height=250
+            )
+            plotly_chart(fig_types, use_container_width=True)
+            st.dataframe(history.drop(columns=['user_id']), use_container_width=True, hide_index=True)
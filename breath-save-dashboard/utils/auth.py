@@ -1,40 +1,24 @@
-import hashlib
-import json
 import os
+from utils.credential_store import get_credential_store
+from utils.password_hashing import get_hashing_pool, needs_rehash
+
+# Comma-separated usernames allowed to open the diagnostics page
+ADMINS_ENV = 'BREATHSAVE_ADMINS'
 
 def hash_password(password):
     """
-    Hash password using SHA-256 for secure storage.
+    Hash password with a salted KDF (scrypt by default) for secure storage.
+    
+    Runs on the shared hashing pool; cost parameters are configured in
+    utils/password_hashing.py.
     
     Args:
         password (str): Plain text password
         
     Returns:
-        str: SHA-256 hashed password
-    """
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def load_users():
-    """
-    Load user credentials from JSON file.
-    
-    Returns:
-        dict: Dictionary of username -> hashed_password mappings
-    """
-    if os.path.exists('users.json'):
-        with open('users.json', 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    """
-    Save user credentials to JSON file.
-    
-    Args:
-        users (dict): Dictionary of username -> hashed_password mappings
+        str: Encoded salted hash
     """
-    with open('users.json', 'w') as f:
-        json.dump(users, f)
+    return get_hashing_pool().hash(password)
 
 def register_user(username, password):
     """
@@ -47,17 +31,20 @@ def register_user(username, password):
     Returns:
         tuple: (success: bool, message: str)
     """
-    users = load_users()
-    if username in users:
+    store = get_credential_store()
+    if store.get_hash(username) is not None:
+        return False, "Username already exists"
+    if not store.add_user(username, hash_password(password)):
         return False, "Username already exists"
-    users[username] = hash_password(password)
-    save_users(users)
     return True, "Registration successful!"
 
 def verify_user(username, password):
     """
     Verify user login credentials.
     
+    Legacy SHA-256 hashes (and hashes made with older cost settings) are
+    upgraded transparently after a successful login.
+    
     Args:
         username (str): Username
         password (str): Plain text password
@@ -65,10 +52,16 @@ def verify_user(username, password):
     Returns:
         bool: True if credentials match, False otherwise
     """
-    users = load_users()
-    if username not in users:
+    store = get_credential_store()
+    stored = store.get_hash(username)
+    if stored is None:
+        return False
+    if not get_hashing_pool().verify(password, stored):
         return False
-    return users[username] == hash_password(password)
+    if needs_rehash(stored):
+        # Compare-and-swap so a concurrent password change is never undone
+        store.set_hash(username, hash_password(password), expected_hash=stored)
+    return True
 
 def update_password(username, current_password, new_password):
     """
@@ -85,7 +78,20 @@ def update_password(username, current_password, new_password):
     if not verify_user(username, current_password):
         return False, "Current password is incorrect"
     
-    users = load_users()
-    users[username] = hash_password(new_password)
-    save_users(users)
+    get_credential_store().set_hash(username, hash_password(new_password))
     return True, "Password updated successfully!"
+
+def is_admin(username):
+    """
+    Check whether a user may see operator pages such as Diagnostics.
+    
+    Admins are listed in the BREATHSAVE_ADMINS environment variable.
+    
+    Args:
+        username (str): Logged-in username
+        
+    Returns:
+        bool: True if the user is an admin
+    """
+    admins = {name.strip() for name in os.environ.get(ADMINS_ENV, '').split(',') if name.strip()}
+    return username in admins
@@ -0,0 +1,537 @@
+import io
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+STORE_VERSION = 5
+STORE_DIR = '.columnar'
+CONVERT_CHUNK_ROWS = 1_000_000
+# Generations are built under a temporary name and renamed into place
+TMP_PREFIX = '.tmp-'
+SUPERSEDED_FILE = 'superseded'
+# A replaced generation is kept this long for readers that found it but
+# have not mapped its files yet; unfinished builds this old are abandoned
+GENERATION_GRACE_SECONDS = 300
+ABANDONED_BUILD_SECONDS = 6 * 3600
+
+# Column encodings per table. CSV stays the import path: each table is
+# converted once per CSV revision and memory-mapped on every later load.
+#   string   - fixed-width unicode array
+#   category - int32 dictionary codes + categories kept in schema.json
+#   id       - int32 dictionary codes + sorted ids in <column>.lookup.npy
+#              (memory-mapped; for high-cardinality keys such as user_id)
+#   int      - narrowest signed integer type holding every value
+#   float    - float32 if every value survives the round trip, else float64
+#   datetime - int64 nanoseconds since epoch (NaT preserved)
+#   <dtype>  - plain numpy dtype
+# Both id and category columns decode to pd.Categorical. Row keys
+# (reward_id, notification_id) stay strings: one code per row plus a lookup
+# of the same size would save nothing.
+TABLES = {
+    'notifications': {
+        'csv': 'breathsave_notifications_schedule.csv',
+        'columns': {
+            'notification_id': 'string',
+            'user_id': 'id',
+            'type': 'category',
+            'schedule_time': 'datetime',
+            'sent_flag': 'int',
+        },
+    },
+    'milestones': {
+        'csv': 'breathsave_savings_milestones.csv',
+        'columns': {
+            'user_id': 'id',
+            'total_days': 'int',
+            'total_cigs_smoked': 'int',
+            'total_cigs_avoided': 'int',
+            'money_saved': 'float',
+            'milestones_achieved': 'int',
+            'points': 'int',
+        },
+    },
+    'rewards': {
+        'csv': 'breathsave_rewards_wallet.csv',
+        'columns': {
+            'reward_id': 'string',
+            'user_id': 'id',
+            'reward_type': 'category',
+            'points_cost': 'int',
+            'redemption_status': 'category',
+            'date_redeemed': 'datetime',
+        },
+    },
+}
+CODED_ENCODINGS = ('category', 'id')
+INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def source_signature(csv_path):
+    """
+    Identify a CSV revision by its size and modification time.
+
+    Args:
+        csv_path (str): Path to the source CSV
+
+    Returns:
+        str: Signature used to name the stored generation
+    """
+    stat = os.stat(csv_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def source_size(schema):
+    """
+    Bytes of the CSV a store generation was converted from.
+
+    Args:
+        schema (dict): The generation's schema
+
+    Returns:
+        int: Size part of the generation's signature
+    """
+    return int(schema['signature'].split('-', 1)[0])
+
+
+class _Prefix(io.RawIOBase):
+    """Binary reader that stops after the first ``size`` bytes of a file."""
+
+    def __init__(self, raw, size):
+        self.raw = raw
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        view = memoryview(buffer)[:self.remaining]
+        count = self.raw.readinto(view) if len(view) else 0
+        self.remaining -= count
+        return count
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def open_prefix(path, size):
+    """
+    Open the first ``size`` bytes of a file for reading.
+
+    Rows appended while a reader is still parsing are left for the table
+    cache to pick up as an append, instead of being read twice.
+
+    Args:
+        path (str): File to open
+        size (int): Bytes to expose
+
+    Returns:
+        io.BufferedReader: Binary file object
+    """
+    return io.BufferedReader(_Prefix(open(path, 'rb', buffering=0), size), buffer_size=1 << 20)
+
+
+def _text_dtypes(name):
+    """Read string, id and category columns as text so ids like ``00012345`` keep their zeros."""
+    return {column: str for column, encoding in TABLES[name]['columns'].items()
+            if encoding == 'string' or encoding in CODED_ENCODINGS}
+
+
+def _table_dir(data_dir, name):
+    return os.path.join(data_dir, STORE_DIR, name)
+
+
+def narrowest_int(values):
+    """
+    Cast integers to the smallest signed type that holds all of them.
+
+    Args:
+        values (np.array): Integer values
+
+    Returns:
+        np.ndarray: ``values`` as int8, int16, int32 or int64
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) == 0:
+        return values.astype(np.int8)
+    lo, hi = values.min(), values.max()
+    dtype = next(dtype for dtype in INT_DTYPES if np.iinfo(dtype).min <= lo and hi <= np.iinfo(dtype).max)
+    return values.astype(dtype)
+
+
+def narrowest_float(values):
+    """
+    Cast floats to float32 only if every value converts back unchanged.
+
+    Args:
+        values (np.array): Float values
+
+    Returns:
+        np.ndarray: ``values`` as float32 or float64
+    """
+    values = np.asarray(values, dtype=np.float64)
+    narrow = values.astype(np.float32)
+    if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+        return narrow
+    return values
+
+
+def _encode_column(series, encoding):
+    """Return (array, extra schema fields) for one column."""
+    if encoding == 'string':
+        return series.fillna('').astype(str).to_numpy(dtype=str), {}
+    if encoding == 'int':
+        if series.isna().any():
+            # Blank cells have no integer value; keep them as NaN in a float column
+            return narrowest_float(series.to_numpy(dtype=np.float64, na_value=np.nan)), {}
+        return narrowest_int(series.to_numpy(dtype=np.int64)), {}
+    if encoding == 'float':
+        return narrowest_float(series.to_numpy(dtype=np.float64)), {}
+    if encoding in CODED_ENCODINGS:
+        categorical = pd.Categorical(series.astype('string'))
+        codes = np.asarray(categorical.codes, dtype=np.int32)
+        return codes, {'categories': [str(c) for c in categorical.categories]}
+    if encoding == 'datetime':
+        parsed = pd.to_datetime(series, errors='coerce')
+        return parsed.to_numpy(dtype='datetime64[ns]').view(np.int64), {}
+    return series.to_numpy(dtype=encoding), {}
+
+
+def decode_column(array, spec):
+    """
+    Turn a stored array into its column value.
+
+    Args:
+        array (np.array): Raw array as stored (e.g. category codes)
+        spec (dict): The column's schema entry
+
+    Returns:
+        np.ndarray or pd.Categorical: Decoded column
+    """
+    encoding = spec['encoding']
+    if encoding in CODED_ENCODINGS:
+        return pd.Categorical.from_codes(array, categories=spec['categories'])
+    if encoding == 'datetime':
+        return array.view('datetime64[ns]')
+    return array
+
+
+def convert_table(name, data_dir='data'):
+    """
+    Convert one CSV table into the typed columnar store.
+
+    Each column is written as its own ``.npy`` file so it can be
+    memory-mapped independently. The generation is built in a directory of
+    its own and renamed into place when complete, so concurrent converters
+    (threads or processes) never share files; if another one got there
+    first its generation is kept. Older generations are removed once they
+    have been superseded for GENERATION_GRACE_SECONDS.
+
+    Args:
+        name (str): Table key in TABLES
+        data_dir (str): Directory holding the CSV files
+
+    Returns:
+        str: Path to the generation directory
+    """
+    table = TABLES[name]
+    csv_path = os.path.join(data_dir, table['csv'])
+    signature = source_signature(csv_path)
+    table_dir = _table_dir(data_dir, name)
+    target = os.path.join(table_dir, signature)
+    build_dir = os.path.join(table_dir, f"{TMP_PREFIX}{os.getpid()}-{uuid.uuid4().hex}")
+    os.makedirs(build_dir)
+    try:
+        _build_generation(name, csv_path, signature, build_dir)
+        _install_generation(build_dir, target)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    _remove_superseded(table_dir, signature)
+    return target
+
+
+def _build_generation(name, csv_path, signature, target):
+    """Write every column and the schema of one generation into ``target``."""
+    table = TABLES[name]
+
+    # Parse in chunks so conversion memory does not grow with the file.
+    # Encoded chunks are spooled to part files, then copied into each
+    # column's final .npy (category codes are remapped to the union of the
+    # chunk dictionaries on the way).
+    spooled = {}
+    rows = 0
+    # Only the bytes the signature names, even if rows are appended meanwhile
+    source = open_prefix(csv_path, int(signature.split('-', 1)[0]))
+    reader = pd.read_csv(source, dtype=_text_dtypes(name), chunksize=CONVERT_CHUNK_ROWS)
+    with source, reader:
+        for number, chunk in enumerate(reader):
+            for column in chunk.columns:
+                array, extra = _encode_column(chunk[column], _encoding(name, column))
+                part_path = os.path.join(target, f"{column}.part{number}.npy")
+                np.save(part_path, array, allow_pickle=False)
+                spooled.setdefault(column, []).append((part_path, array.dtype, extra))
+            rows += len(chunk)
+    if not spooled:
+        header = pd.read_csv(csv_path, dtype=_text_dtypes(name), nrows=0)
+        spooled = {column: [] for column in header.columns}
+
+    columns = []
+    for column, parts in spooled.items():
+        encoding = _encoding(name, column)
+        columns.append(_write_column(os.path.join(target, f"{column}.npy"), column, encoding, parts, rows))
+
+    schema = {
+        'version': STORE_VERSION,
+        'table': name,
+        'source': table['csv'],
+        'signature': signature,
+        'rows': rows,
+        'columns': columns,
+    }
+    tmp_path = os.path.join(target, 'schema.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(schema, f)
+    os.replace(tmp_path, os.path.join(target, 'schema.json'))
+
+
+def _install_generation(build_dir, target):
+    """Rename a finished build to ``target`` unless a valid generation is already there."""
+    for _ in range(3):
+        try:
+            os.replace(build_dir, target)
+            return
+        except OSError:
+            if _read_schema(target) is not None:
+                return  # Another converter finished the same revision first
+        # Left by an older STORE_VERSION (or an interrupted build): move it aside
+        stale = os.path.join(os.path.dirname(target), f"{TMP_PREFIX}stale-{uuid.uuid4().hex}")
+        try:
+            os.replace(target, stale)
+        except OSError:
+            continue
+        shutil.rmtree(stale, ignore_errors=True)
+    os.replace(build_dir, target)
+
+
+def _remove_superseded(table_dir, signature, now=None):
+    """
+    Remove generations replaced by ``signature`` more than the grace period ago.
+
+    Generations of a newer CSV revision, and builds still in progress, are
+    left alone.
+    """
+    now = time.time() if now is None else now
+    mtime_ns = int(signature.split('-', 1)[1])
+    for entry in os.listdir(table_dir):
+        path = os.path.join(table_dir, entry)
+        if entry == signature or not os.path.isdir(path):
+            continue
+        try:
+            if entry.startswith(TMP_PREFIX):
+                if now - os.path.getmtime(path) >= ABANDONED_BUILD_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            if int(entry.split('-', 1)[1]) > mtime_ns:
+                continue
+            marker = os.path.join(path, SUPERSEDED_FILE)
+            if not os.path.exists(marker):
+                # Starts the grace period
+                open(marker, 'w').close()
+            elif now - os.path.getmtime(marker) >= GENERATION_GRACE_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+        except (OSError, ValueError, IndexError):
+            continue  # Removed by another process meanwhile, or not a generation
+
+
+def _encoding(name, column):
+    # Unknown columns are kept as text so the store never drops data
+    return TABLES[name]['columns'].get(column, 'string')
+
+
+def _write_column(path, column, encoding, parts, rows):
+    """Concatenate spooled parts into ``path`` and return the column's schema entry."""
+    extra = {}
+    mappings = [None] * len(parts)
+    if encoding in CODED_ENCODINGS:
+        categories = pd.Index(sorted(set().union(*(part_extra['categories'] for _, _, part_extra in parts))))
+        mappings = [categories.get_indexer(part_extra['categories']).astype(np.int32)
+                    for _, _, part_extra in parts]
+        if encoding == 'id':
+            lookup = f"{column}.lookup.npy"
+            np.save(os.path.join(os.path.dirname(path), lookup), np.asarray(categories, dtype=str),
+                    allow_pickle=False)
+            extra = {'lookup': lookup, 'size': len(categories)}
+        else:
+            extra = {'categories': list(categories)}
+        dtype = np.dtype(np.int32)
+    elif parts:
+        # Chunks narrowed on their own; the widest of them holds every value
+        dtype = np.result_type(*(part_dtype for _, part_dtype, _ in parts))
+    else:
+        dtype = np.dtype({'string': str, 'datetime': np.int64, 'int': np.int8, 'float': np.float32}.get(encoding, encoding))
+
+    if rows == 0:
+        np.save(path, np.zeros(0, dtype=dtype), allow_pickle=False)
+    else:
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(rows,))
+        offset = 0
+        for (part_path, _, _), mapping in zip(parts, mappings):
+            array = np.load(part_path, mmap_mode='r')
+            if mapping is not None:
+                array = np.where(array >= 0, mapping[np.maximum(array, 0)] if len(mapping) else -1, -1)
+            out[offset:offset + len(array)] = array
+            offset += len(array)
+        out.flush()
+        del out
+    for part_path, _, _ in parts:
+        os.remove(part_path)
+    return {'name': column, 'encoding': encoding, 'dtype': dtype.str, **extra}
+
+
+def _read_schema(generation_dir):
+    schema_path = os.path.join(generation_dir, 'schema.json')
+    if not os.path.exists(schema_path):
+        return None
+    with open(schema_path, 'r') as f:
+        schema = json.load(f)
+    if schema.get('version') != STORE_VERSION:
+        return None
+    return schema
+
+
+def load_table(name, data_dir='data', columns=None, generation=None):
+    """
+    Load a table from the columnar store, converting the CSV if needed.
+
+    Column arrays are opened with ``mmap_mode='r'`` so the OS page cache
+    is shared between processes and nothing is re-parsed.
+
+    Args:
+        name (str): Table key in TABLES
+        data_dir (str): Directory holding the CSV files
+        columns (list): Optional subset of columns to load
+        generation (tuple): Optional (generation_dir, schema) to load
+            instead of the one for the current CSV
+
+    Returns:
+        pd.DataFrame: The table with typed columns
+    """
+    return pd.DataFrame(load_arrays(name, data_dir, columns, generation), copy=False)
+
+
+def load_arrays(name, data_dir='data', columns=None, generation=None):
+    """
+    Load decoded column arrays without building a DataFrame.
+
+    String columns stay memory-mapped fixed-width arrays instead of being
+    turned into one Python object per row.
+
+    Args:
+        name (str): Table key in TABLES
+        data_dir (str): Directory holding the CSV files
+        columns (list): Optional subset of columns to load
+        generation (tuple): Optional (generation_dir, schema) to load
+            instead of the one for the current CSV
+
+    Returns:
+        dict: Column name -> np.ndarray or pd.Categorical
+    """
+    generation_dir, schema = generation or open_generation(name, data_dir)
+    return {
+        column: decode_column(array, spec)
+        for column, (array, spec) in map_columns(generation_dir, schema).items()
+        if columns is None or column in columns
+    }
+
+
+def map_columns(generation_dir, schema):
+    """
+    Memory-map every column file of one store generation without reading it.
+
+    Mapped files stay readable after a newer generation replaces this one.
+    The schema entry of an ``id`` column gets its memory-mapped lookup as
+    ``categories``, so it decodes like a category column.
+
+    Args:
+        generation_dir (str): Generation directory from open_generation
+        schema (dict): The generation's schema
+
+    Returns:
+        dict: Column name -> (raw np.memmap, schema entry)
+    """
+    columns = {}
+    for spec in schema['columns']:
+        if spec['encoding'] == 'id':
+            spec = dict(spec, categories=np.load(os.path.join(generation_dir, spec['lookup']), mmap_mode='r'))
+        columns[spec['name']] = (np.load(os.path.join(generation_dir, f"{spec['name']}.npy"), mmap_mode='r'), spec)
+    return columns
+
+
+def open_generation(name, data_dir='data'):
+    """
+    Locate the store generation for the current CSV, converting it if needed.
+
+    Args:
+        name (str): Table key in TABLES
+        data_dir (str): Directory holding the CSV files
+
+    Returns:
+        tuple: (generation_dir, schema)
+    """
+    csv_path = os.path.join(data_dir, TABLES[name]['csv'])
+    generation_dir = os.path.join(_table_dir(data_dir, name), source_signature(csv_path))
+    schema = _read_schema(generation_dir)
+    if schema is None:
+        generation_dir = convert_table(name, data_dir)
+        schema = _read_schema(generation_dir)
+    return generation_dir, schema
+
+
+def parse_rows(name, data, columns):
+    """
+    Parse headerless CSV rows with the same column types as load_table.
+
+    Used to decode rows appended to a CSV after it was loaded.
+
+    Args:
+        name (str): Table key in TABLES
+        data (bytes): Raw CSV rows without a header line
+        columns (list): Column names in file order
+
+    Returns:
+        pd.DataFrame: Typed rows
+    """
+    raw = pd.read_csv(io.BytesIO(data), header=None, names=list(columns), dtype=_text_dtypes(name))
+    encodings = TABLES[name]['columns']
+    typed = {}
+    for column in columns:
+        encoding = encodings.get(column, 'string')
+        array, extra = _encode_column(raw[column], encoding)
+        typed[column] = decode_column(array, {'encoding': encoding, **extra})
+    return pd.DataFrame(typed)
+
+
+def concat_tables(base, tail):
+    """
+    Append typed rows to a typed table, merging category dictionaries.
+
+    Args:
+        base (pd.DataFrame): Previously loaded table
+        tail (pd.DataFrame): Rows from parse_rows
+
+    Returns:
+        pd.DataFrame: Combined table with a fresh RangeIndex
+    """
+    combined = {}
+    for column in base.columns:
+        if isinstance(base[column].dtype, pd.CategoricalDtype):
+            combined[column] = union_categoricals([base[column], tail[column]], ignore_order=True)
+        else:
+            combined[column] = np.concatenate([np.asarray(base[column]), np.asarray(tail[column])])
+    return pd.DataFrame(combined)
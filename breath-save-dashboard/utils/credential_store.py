@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = 'users.db'
+LEGACY_JSON_PATH = 'users.json'
+
+
+class CredentialStore:
+    """
+    Indexed credential store backed by SQLite in WAL mode.
+
+    Lookups go through the primary-key index instead of parsing a JSON file,
+    and every write is a single atomic statement, so concurrent registrations
+    from several sessions or processes cannot overwrite each other. Each
+    thread gets its own connection; WAL lets readers proceed while a writer
+    commits.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, legacy_json=LEGACY_JSON_PATH):
+        """
+        Open (and if needed create and migrate) the credential database.
+
+        Args:
+            db_path (str): SQLite database file
+            legacy_json (str): users.json to import on first open, if present
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, "
+                "password_hash TEXT NOT NULL, "
+                "updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if legacy_json:
+            self.migrate_from_json(legacy_json)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def migrate_from_json(self, json_path):
+        """
+        Import users from the legacy JSON file exactly once.
+
+        Existing usernames in the database win over the JSON file. The JSON
+        file itself is left untouched.
+
+        Args:
+            json_path (str): Path to users.json
+
+        Returns:
+            int: Number of users imported (0 if already migrated)
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with self._connect() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+            if done is not None:
+                return 0
+            with open(json_path, 'r') as f:
+                users = json.load(f)
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)",
+                users.items(),
+            )
+            imported = conn.total_changes - before
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (json_path,))
+        return imported
+
+    def get_hash(self, username):
+        """
+        Look up the stored password hash for a user.
+
+        Args:
+            username (str): Username
+
+        Returns:
+            str or None: Stored hash, or None if the user does not exist
+        """
+        row = self._connect().conn.execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add_user(self, username, password_hash):
+        """
+        Insert a user if the username is free.
+
+        Args:
+            username (str): New username
+            password_hash (str): Hashed password
+
+        Returns:
+            bool: True if inserted, False if the username already exists
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)",
+                (username, password_hash),
+            )
+            return cursor.rowcount == 1
+
+    def set_hash(self, username, password_hash, expected_hash=None):
+        """
+        Replace a user's password hash.
+
+        Args:
+            username (str): Username
+            password_hash (str): New hashed password
+            expected_hash (str): If given, only update when the stored hash
+                still equals this value (compare-and-swap)
+
+        Returns:
+            bool: True if a row was updated
+        """
+        query = "UPDATE users SET password_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE username = ?"
+        params = [password_hash, username]
+        if expected_hash is not None:
+            query += " AND password_hash = ?"
+            params.append(expected_hash)
+        with self._connect() as conn:
+            return conn.execute(query, params).rowcount == 1
+
+    def count(self):
+        """Number of registered users."""
+        return self._connect().conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+class _Transaction:
+    """Run statements inside BEGIN IMMEDIATE ... COMMIT on one connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_credential_store():
+    """
+    Process-wide CredentialStore, created on first use.
+
+    Returns:
+        CredentialStore: Shared store for users.db
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CredentialStore()
+    return _store
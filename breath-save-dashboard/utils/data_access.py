@@ -0,0 +1,242 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from utils.columnar_store import (concat_tables, decode_column, map_columns, open_generation, parse_rows,
+                                  source_size)
+
+# Tables and columns each page reads. A page gets read-only views of exactly
+# these columns and nothing is loaded for pages that need no rows. Overview
+# and Rewards read aggregates instead (see utils/overview_aggregates.py),
+# Rewards also the RewardsIndex, and User Detail the per-user index.
+PAGE_COLUMNS = {
+    'overview': {},
+    'analytics': {'milestones': ['user_id', 'points', 'total_cigs_avoided', 'money_saved', 'total_cigs_smoked']},
+    'predictions': {'milestones': ['user_id', 'total_days', 'total_cigs_avoided', 'money_saved']},
+    'rewards': {},
+    'user_detail': {},
+    'settings': {},
+}
+
+
+def _shareable(values):
+    """Prepare a column for sharing: read-only, and text converted once."""
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'U':
+        # DataFrame construction would otherwise convert the fixed-width
+        # array to a string array again for every frame
+        return pd.array(values, dtype='str')
+    if isinstance(values, np.ndarray):
+        values.flags.writeable = False
+    return values
+
+
+class SharedTable:
+    """
+    Read-only, column-lazy view of one stored table, shared by all sessions.
+
+    Column files are memory-mapped when the table is opened but a column is
+    only decoded and read the first time a page asks for it; columns no page
+    asks for are never read. Rows appended
+    to the CSV are kept as a typed tail and folded into new combined arrays
+    on the next request. Arrays handed out are never modified in place
+    (memory-maps are opened read-only and combined arrays are flagged
+    read-only), so one copy serves every session and a frame obtained
+    earlier stays a consistent snapshot.
+    """
+
+    def __init__(self, name, data_dir='data', generation=None):
+        """
+        Open the current store generation of a table.
+
+        Args:
+            name (str): Table key in TABLES
+            data_dir (str): Directory holding the CSV files
+            generation (tuple): Optional (generation_dir, schema) to open
+                instead of the one for the current CSV
+        """
+        generation_dir, schema = generation or open_generation(name, data_dir)
+        self.name = name
+        self.data_dir = data_dir
+        self.signature = schema['signature']
+        self.column_names = [spec['name'] for spec in schema['columns']]
+        self.stored_rows = schema['rows']
+        self.tail = None
+        # Mapped now (no data is read) so columns stay readable even after a
+        # newer generation of the store replaces this one on disk
+        self._mapped = map_columns(generation_dir, schema)
+        self._columns = {}
+        self._lock = threading.RLock()
+
+    @property
+    def rows(self):
+        return self.stored_rows + (0 if self.tail is None else len(self.tail))
+
+    @property
+    def version(self):
+        """Changes whenever the table's rows change (reload or append)."""
+        return f"{self.signature}+{self.rows}"
+
+    @property
+    def loaded_columns(self):
+        """Columns read so far."""
+        with self._lock:
+            return sorted(self._columns)
+
+    def columns(self, names):
+        """
+        Shared read-only arrays for ``names``.
+
+        Args:
+            names (list): Column names
+
+        Returns:
+            dict: Column name -> np.ndarray or pd.Categorical
+
+        Raises:
+            KeyError: If a column is not in the table
+        """
+        missing = [name for name in names if name not in self.column_names]
+        if missing:
+            raise KeyError(f"{self.name} has no column(s) {missing}")
+        with self._lock:
+            needed = [name for name in names if name not in self._columns]
+            for name in needed:
+                array, spec = self._mapped[name]
+                self._columns[name] = _shareable(self._combine(decode_column(array, spec), name))
+            return {name: self._columns[name] for name in names}
+
+    def _combine(self, values, name):
+        if self.tail is None:
+            return values
+        if isinstance(values, pd.Categorical):
+            return union_categoricals([values, self.tail[name].array], ignore_order=True)
+        tail = self.tail[name].to_numpy()
+        if values.dtype.kind in 'iuf':
+            # Stored numbers are narrowed to what the stored rows need; widen if the new ones need more
+            return np.concatenate([values, tail])
+        if values.dtype.kind == 'U':
+            # Stored text is as wide as the longest stored value; widen if new values are longer
+            return np.concatenate([values, tail.astype(str)])
+        return np.concatenate([values, tail.astype(values.dtype)])
+
+    def frame(self, columns=None):
+        """
+        A new DataFrame over the shared arrays.
+
+        The frame itself is the caller's: adding columns to it affects no
+        other session, while writes into the shared values raise.
+
+        Args:
+            columns (list): Columns to include (default: all)
+
+        Returns:
+            pd.DataFrame: Frame with ``attrs['table']`` and ``attrs['version']`` set
+        """
+        columns = self.column_names if columns is None else list(columns)
+        with self._lock:
+            version, data = self.version, self.columns(columns)
+        df = pd.DataFrame(data, columns=columns, copy=False)
+        df.attrs.update(table=self.name, version=version)
+        return df
+
+    def append(self, df):
+        """
+        Add rows appended to the CSV after the store was written.
+
+        Args:
+            df (pd.DataFrame): Typed rows from parse_rows
+        """
+        with self._lock:
+            if self.tail is None:
+                self.tail = df.reset_index(drop=True)
+            else:
+                self.tail = concat_tables(self.tail, df)
+            # Recombined lazily; arrays handed out before stay untouched
+            self._columns.clear()
+
+
+class SharedTableLoader:
+    """TableCache loader that keeps a SharedTable instead of a loaded frame."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def load(self, data_dir):
+        generation = open_generation(self.name, data_dir)
+        return SharedTable(self.name, data_dir, generation), source_size(generation[1])
+
+    def append(self, current, data, columns):
+        current.append(parse_rows(self.name, data, columns))
+        return current
+
+
+class SessionOverlay:
+    """
+    Columns derived by one session (e.g. cluster labels), kept beside the
+    shared views instead of being written into them.
+
+    Entries are tied to the table version they were computed from and are
+    dropped once the table changes.
+    """
+
+    def __init__(self):
+        """Initialize an empty overlay."""
+        self._entries = {}
+
+    def _current(self, view):
+        table, version = view.attrs.get('table'), view.attrs.get('version')
+        entry = self._entries.get(table)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def get(self, view, column):
+        """
+        A derived column for ``view``'s table version, or None.
+
+        Args:
+            view (pd.DataFrame): Frame from SharedTable.frame
+            column (str): Derived column name
+
+        Returns:
+            np.array: The column, or None if missing or stale
+        """
+        columns = self._current(view)
+        return None if columns is None else columns.get(column)
+
+    def set(self, view, column, values):
+        """
+        Store a derived column for ``view``'s table version.
+
+        Args:
+            view (pd.DataFrame): Frame from SharedTable.frame
+            column (str): Derived column name
+            values (np.array): One value per row of the table
+        """
+        if len(values) != len(view):
+            raise ValueError(f"{column} has {len(values)} values for {len(view)} rows")
+        table, version = view.attrs.get('table'), view.attrs.get('version')
+        columns = self._current(view)
+        if columns is None:
+            columns = {}
+            self._entries[table] = (version, columns)
+        columns[column] = values
+
+    def apply(self, view):
+        """
+        ``view`` with this session's derived columns added.
+
+        Args:
+            view (pd.DataFrame): Frame from SharedTable.frame
+
+        Returns:
+            pd.DataFrame: New frame; ``view`` and the shared arrays are unchanged
+        """
+        columns = self._current(view)
+        return view.assign(**columns) if columns else view
+
+    @property
+    def nbytes(self):
+        return sum(np.asarray(values).nbytes for _, columns in self._entries.values() for values in columns.values())
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import threading
+
+from utils.columnar_store import TABLES, concat_tables, load_table, open_generation, parse_rows, source_size
+
+# Bytes sampled from the start of a file and from just before the previous
+# end-of-file when fingerprinting. Hashing samples keeps a freshness check
+# O(1) in file size while still catching rewrites of the header or tail.
+FINGERPRINT_BYTES = 64 * 1024
+
+
+class FileState:
+    """Size, mtime and content fingerprint of one data file."""
+
+    def __init__(self, size, mtime_ns, head_digest, tail_digest, header):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.head_digest = head_digest
+        self.tail_digest = tail_digest
+        self.header = header
+        # (size, mtime_ns) last seen with only a partial line past ``size``
+        self.checked = None
+
+    @classmethod
+    def capture(cls, path, size=None):
+        """
+        Fingerprint ``path`` up to ``size`` bytes (default: whole file).
+
+        Args:
+            path (str): File to fingerprint
+            size (int): Treat the file as ending at this offset
+
+        Returns:
+            FileState: Captured state
+        """
+        stat = os.stat(path)
+        size = stat.st_size if size is None else size
+        with open(path, 'rb') as f:
+            head = f.read(min(size, FINGERPRINT_BYTES))
+            tail = _read_range(f, max(0, size - FINGERPRINT_BYTES), size)
+        header = head.split(b'\n', 1)[0].decode().strip()
+        return cls(size, stat.st_mtime_ns, _digest(head), _digest(tail), header)
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _read_range(f, start, stop):
+    f.seek(start)
+    return f.read(stop - start)
+
+
+class StoreTableLoader:
+    """Loads a table through the columnar store and parses appended rows."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def load(self, data_dir):
+        generation = open_generation(self.name, data_dir)
+        return load_table(self.name, data_dir, generation=generation), source_size(generation[1])
+
+    def append(self, current, data, columns):
+        return concat_tables(current, parse_rows(self.name, data, columns))
+
+
+class TableCache:
+    """
+    File-change-aware cache for the dashboard tables.
+
+    Every ``get`` stats the source file. Unchanged files are served from
+    memory; files that only grew (same header and same bytes before the old
+    end-of-file) have just the new tail parsed and appended; anything else
+    triggers a full reload of that table only.
+
+    Loaders provide ``load(data_dir)``, returning the value and the number
+    of CSV bytes it was built from, and ``append(value, data, columns)``
+    for appended rows. The file is fingerprinted up to the bytes actually
+    read, so rows appended while a table loads are parsed once, as an
+    append.
+    """
+
+    def __init__(self, data_dir='data', loaders=None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            data_dir (str): Directory holding the CSV files
+            loaders (dict): Optional table name -> loader overrides
+        """
+        self.data_dir = data_dir
+        self.loaders = {name: StoreTableLoader(name) for name in TABLES}
+        self.loaders.update(loaders or {})
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'partial_reloads': 0}
+        self.table_counters = {name: dict(self.counters) for name in self.loaders}
+
+    def _count(self, name, key):
+        self.counters[key] += 1
+        self.table_counters[name][key] += 1
+
+    def get(self, name):
+        """
+        Return a table, reloading only what changed on disk.
+
+        Args:
+            name (str): Table key (notifications, milestones, rewards)
+
+        Returns:
+            The loader's value for the table (a DataFrame by default)
+        """
+        path = os.path.join(self.data_dir, TABLES[name]['csv'])
+        with self._lock:
+            stat = os.stat(path)
+            entry = self._entries.get(name)
+            if entry is not None:
+                value, state = entry
+                seen = (stat.st_size, stat.st_mtime_ns)
+                if seen == (state.size, state.mtime_ns) or seen == state.checked:
+                    self._count(name, 'hits')
+                    return value
+                appended = self._append(name, path, value, state, stat)
+                if appended is not None:
+                    value, parsed = appended
+                    self._count(name, 'partial_reloads' if parsed else 'hits')
+                    return value
+
+            self._count(name, 'misses')
+            value, size = self.loaders[name].load(self.data_dir)
+            self._entries[name] = (value, FileState.capture(path, size))
+            return value
+
+    def _append(self, name, path, value, state, stat):
+        """
+        Parse only the appended tail.
+
+        Returns:
+            tuple: (value, whether rows were parsed), or None if not an append
+        """
+        new_size = stat.st_size
+        if new_size <= state.size:
+            return None
+        with open(path, 'rb') as f:
+            head = f.read(min(state.size, FINGERPRINT_BYTES))
+            tail = _read_range(f, max(0, state.size - FINGERPRINT_BYTES), state.size)
+            if _digest(head) != state.head_digest or _digest(tail) != state.tail_digest:
+                return None
+            if not tail.endswith(b'\n'):
+                return None
+            data = _read_range(f, state.size, new_size)
+        # Leave a partially written last line for the next check
+        complete = data.rfind(b'\n') + 1
+        if complete == 0:
+            # Not re-read until the file changes again
+            state.checked = (new_size, stat.st_mtime_ns)
+            return value, False
+        columns = state.header.split(',')
+        value = self.loaders[name].append(value, data[:complete], columns)
+        self._entries[name] = (value, FileState.capture(path, state.size + complete))
+        return value, True
+
+    def invalidate(self, name=None):
+        """Drop one table (or all tables) from the cache."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Global counters, hit rate and per-table counters
+        """
+        with self._lock:
+            total = sum(self.counters.values())
+            return {
+                **self.counters,
+                'hit_rate': self.counters['hits'] / total if total else 0.0,
+                'tables': {name: dict(c) for name, c in self.table_counters.items()},
+            }
@@ -1,19 +1,248 @@
+import os
 import streamlit as st
-import pandas as pd
+from ml_models.registry import get_registry
+from utils.columnar_store import TABLES
+from utils.data_access import PAGE_COLUMNS, SessionOverlay
+from utils.data_cache import TableCache
+from utils.instrumentation import METRICS_PORT_ENV, get_instrumentation, start_metrics_server, timed
+from utils.notification_rollups import NotificationRollupLoader
+from utils.overview_aggregates import MilestonesLoader
+from utils.precompute import PrecomputeScheduler
+from utils.rewards_index import RewardsIndexLoader
+from utils.shared_datasets import SHARED_DIR_ENV, SharedDatasets
+from utils.user_index import USER_TABLES, UserIndexLoader, lookup_user
 
-@st.cache_data
-def load_data():
+@st.cache_resource
+def get_table_cache():
     """
-    Load and cache CSV data files for the dashboard.
+    Process-wide table cache shared by every session.
+    
+    Tables are loaded on first use by the page that needs them. Notifications
+    are streamed into per-user rollups (see utils/notification_rollups.py);
+    raw notification rows are never kept. Milestones are a column-lazy
+    SharedTable (see utils/data_access.py) that also maintains the Overview
+    aggregates and the Analytics correlation accumulator (see
+    utils/overview_aggregates.py). The rewards wallet is kept as a
+    RewardsIndex of counters (see utils/rewards_index.py).
+    
+    With BREATHSAVE_SHARED_DIR set, the process attaches read-only to the
+    datasets published there by ``python -m utils.shared_datasets`` instead
+    of loading the CSVs itself (see utils/shared_datasets.py).
+    
+    Returns:
+        TableCache: Cache that tracks size, mtime and fingerprint per file
+        (SharedDatasets in shared mode)
+    """
+    shared_dir = os.environ.get(SHARED_DIR_ENV)
+    if shared_dir:
+        return SharedDatasets(shared_dir, 'data')
+    return TableCache('data', loaders={
+        'notifications': NotificationRollupLoader(),
+        'milestones': MilestonesLoader(),
+        'rewards': RewardsIndexLoader(),
+    })
+
+@st.cache_resource
+def get_user_index_cache():
+    """
+    Process-wide per-user indexes over the columnar store.
+    
+    Kept apart from get_table_cache: each table is held as a UserTableIndex
+    (row offsets per user_id into the memory-mapped columns, see
+    utils/user_index.py), so drill-down lookups never load whole tables.
+    
+    Returns:
+        TableCache: Cache of UserTableIndex values
+    """
+    return TableCache('data', loaders={name: UserIndexLoader(name) for name in USER_TABLES})
+
+@st.cache_resource
+def get_precompute_scheduler():
+    """
+    Process-wide background scheduler for models and aggregates.
+    
+    Watches the milestones table and, for each new version, fits the
+    segmentation and savings models and builds cluster statistics, the
+    correlation accumulator and the Overview aggregates on a thread pool
+    (see utils/precompute.py). Pages read the newest published results.
+    
+    Returns:
+        PrecomputeScheduler: Started scheduler over get_table_cache()
+    """
+    return PrecomputeScheduler(get_table_cache()).start()
+
+@timed('loader.precomputed')
+def load_precomputed(name):
+    """
+    Newest background result of a job, without waiting for it.
+    
+    Args:
+        name (str): Job name in PRECOMPUTE_JOBS
+    
+    Returns:
+        PublishedResult: Result and the milestones version it was built
+        from, or None if it is not ready yet or the data files are missing
+    """
+    scheduler = get_precompute_scheduler()
+    try:
+        # Submits rebuilds right away if the data changed since the last poll
+        scheduler.check()
+    except FileNotFoundError:
+        return None
+    return scheduler.latest(name)
+
+def get_precompute_failures():
+    """
+    Background jobs that failed for the current data version.
+    
+    Returns:
+        dict: See PrecomputeScheduler.failures
+    """
+    return get_precompute_scheduler().failures()
+
+def get_precompute_status():
+    """
+    Background job states and durations.
     
     Returns:
-        tuple: (notifications_df, milestones_df, rewards_df)
+        dict: See PrecomputeScheduler.status
     """
+    return get_precompute_scheduler().status()
+
+def data_files_present():
+    """
+    Check that every data file exists, without loading any of them.
+    
+    Returns:
+        bool: True if all CSV files are in the data directory
+    """
+    return all(os.path.exists(os.path.join('data', table['csv'])) for table in TABLES.values())
+
+@timed('loader.page_data')
+def load_page_data(page):
+    """
+    Read-only views of the tables and columns a page declares.
+    
+    Only the columns listed for ``page`` in PAGE_COLUMNS are read, and only
+    on first use in the process (see utils/data_access.py). The views share
+    their arrays with every session: add derived columns through the
+    session overlay (get_session_overlay), never to the shared arrays.
+    
+    Args:
+        page (str): Page key in PAGE_COLUMNS
+    
+    Returns:
+        dict: Table name -> pd.DataFrame, or None if the data files are missing
+    """
+    cache = get_table_cache()
     try:
-        notifications = pd.read_csv('data/breathsave_notifications_schedule.csv')
-        milestones = pd.read_csv('data/breathsave_savings_milestones.csv')
-        rewards = pd.read_csv('data/breathsave_rewards_wallet.csv')
-        return notifications, milestones, rewards
+        return {table: cache.get(table).frame(columns) for table, columns in PAGE_COLUMNS[page].items()}
     except FileNotFoundError:
         st.error("Data files not found in /data directory")
-        return None, None, None
+        return None
+
+@timed('loader.rewards_index')
+def load_rewards_index():
+    """
+    Wallet counters for the Rewards page, refreshed if the CSV changed.
+    
+    Returns:
+        RewardsIndex: Index over the wallet, or None if the data files are missing
+    """
+    try:
+        return get_table_cache().get('rewards')
+    except FileNotFoundError:
+        return None
+
+def get_session_overlay():
+    """
+    This session's derived columns (e.g. cluster labels).
+    
+    Returns:
+        SessionOverlay: Overlay stored in st.session_state
+    """
+    if 'data_overlay' not in st.session_state:
+        st.session_state.data_overlay = SessionOverlay()
+    return st.session_state.data_overlay
+
+@timed('loader.overview')
+def load_overview():
+    """
+    Overview metrics, histograms and leaderboard for the milestones.
+    
+    Built by the precompute scheduler for each data version (updated from
+    the previous version when rows were only appended); never computed in
+    the request.
+    
+    Returns:
+        OverviewAggregates: Newest published aggregates, or None if none
+        are ready yet or the data files are missing
+    """
+    result = load_precomputed('overview')
+    return None if result is None else result.value
+
+@timed('loader.correlation')
+def load_correlation():
+    """
+    Streaming correlation accumulator for the milestones.
+    
+    Built by the precompute scheduler like load_overview; call
+    .correlation() for the matrix.
+    
+    Returns:
+        CorrelationAccumulator: Newest published accumulator, or None if
+        none is ready yet or the data files are missing
+    """
+    result = load_precomputed('correlation')
+    return None if result is None else result.value
+
+@timed('loader.user_detail')
+def load_user_detail(user_id):
+    """
+    One user's milestones, redemptions and notification history.
+    
+    Args:
+        user_id (str): User to look up
+    
+    Returns:
+        dict: Table name -> that user's rows, or None if the data files are missing
+    """
+    try:
+        return lookup_user(get_user_index_cache(), user_id)
+    except FileNotFoundError:
+        return None
+
+def get_cache_stats():
+    """
+    Hit, miss and partial-reload counters for the shared table cache.
+    
+    Returns:
+        dict: See TableCache.stats
+    """
+    return get_table_cache().stats()
+
+@st.cache_resource
+def get_metrics_exporter():
+    """
+    Register the cache statistics with the instrumentation and, if
+    BREATHSAVE_METRICS_PORT is set, serve /metrics on that local port.
+    
+    Returns:
+        ThreadingHTTPServer: The metrics server, or None if no port is set
+    """
+    instrumentation = get_instrumentation()
+    instrumentation.register_source('table_cache', get_cache_stats, label='table')
+    instrumentation.register_source('model_registry', lambda: get_registry().stats())
+    port = os.environ.get(METRICS_PORT_ENV)
+    return start_metrics_server(int(port)) if port else None
+
+def get_diagnostics():
+    """
+    Stage timings, counters and cache statistics for the diagnostics page.
+    
+    Returns:
+        dict: See Instrumentation.snapshot; ``sources`` holds the table
+        cache and model registry statistics
+    """
+    get_metrics_exporter()
+    return get_instrumentation().snapshot()
@@ -0,0 +1,488 @@
+import collections
+import contextlib
+import cProfile
+import functools
+import importlib
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set to a port number to serve /metrics in Prometheus text format
+METRICS_PORT_ENV = 'BREATHSAVE_METRICS_PORT'
+METRIC_PREFIX = 'breathsave'
+# Upper bounds (seconds) of the latency histogram buckets; one more bucket
+# counts everything slower
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_MODES = ('cprofile', 'sampling')
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class StageStats:
+    """Latency histogram, self time and memory deltas of one stage."""
+
+    def __init__(self, n_buckets):
+        self.calls = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.self_s = 0.0
+        self.max_s = 0.0
+        self.rss_delta_bytes = 0
+        self.buckets = [0] * (n_buckets + 1)
+
+    def observe(self, seconds, self_seconds, rss_delta, failed, bucket):
+        self.calls += 1
+        self.errors += failed
+        self.total_s += seconds
+        self.self_s += self_seconds
+        self.max_s = max(self.max_s, seconds)
+        self.rss_delta_bytes += rss_delta or 0
+        self.buckets[bucket] += 1
+
+
+class Instrumentation:
+    """
+    Process-wide timers, counters and latency histograms for named stages.
+
+    ``stage`` times a block and records it in a fixed-bucket histogram,
+    together with its self time (excluding nested stages on the same
+    thread, e.g. a page's own pandas and Streamlit work apart from the
+    loader and model stages it calls) and the change in process RSS.
+    RSS is shared by every thread, so memory deltas of concurrent renders
+    include each other's allocations. Sources registered with
+    ``register_source`` (cache statistics) are read when a snapshot or an
+    export is taken.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Args:
+            buckets (tuple): Upper bounds of the latency buckets in seconds
+        """
+        self.buckets = tuple(buckets)
+        self.enabled = True
+        self.started = time.time()
+        # Seconds from this module's first import (the worker's first script
+        # run) to the end of the first page render; see first_render
+        self.first_render_s = None
+        self._stages = {}
+        self._counters = collections.Counter()
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Time a block as stage ``name``.
+
+        Args:
+            name (str): Stage name, e.g. 'page.analytics' or 'model.segmentation.fit_predict'
+        """
+        if not self.enabled:
+            yield
+            return
+        stack = self._local.__dict__.setdefault('stack', [])
+        children = [0.0]
+        stack.append(children)
+        rss_before = _rss_bytes()
+        failed = False
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            rss_after = _rss_bytes()
+            rss_delta = None if rss_before is None or rss_after is None else rss_after - rss_before
+            bucket = next((i for i, bound in enumerate(self.buckets) if elapsed <= bound), len(self.buckets))
+            with self._lock:
+                stats = self._stages.get(name)
+                if stats is None:
+                    stats = self._stages[name] = StageStats(len(self.buckets))
+                stats.observe(elapsed, elapsed - children[0], rss_delta, failed, bucket)
+
+    def timed(self, name):
+        """
+        Decorator that runs a function as stage ``name``.
+
+        Args:
+            name (str): Stage name
+
+        Returns:
+            callable: Decorator
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        """Add ``value`` to counter ``name``."""
+        with self._lock:
+            self._counters[name] += value
+
+    def first_render(self):
+        """Record the time to the first rendered page; later calls are ignored."""
+        with self._lock:
+            if self.first_render_s is None:
+                self.first_render_s = time.time() - _module_loaded
+
+    def register_source(self, name, callback, label='name'):
+        """
+        Read extra metrics from ``callback`` at snapshot and export time.
+
+        Args:
+            name (str): Source name, e.g. 'table_cache'
+            callback (callable): Returns a dict of numbers; nested dicts of
+                numbers become one series per key, labelled with ``label``
+            label (str): Label name for keys of nested dicts
+        """
+        with self._lock:
+            self._sources[name] = (callback, label)
+
+    def reset(self):
+        """Drop all stage statistics and counters (sources are kept)."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def _quantile(self, stats, q):
+        """Upper bound of the bucket holding quantile ``q`` (max if beyond the last bound)."""
+        target, seen = q * stats.calls, 0
+        for i, count in enumerate(stats.buckets):
+            seen += count
+            if seen >= target and count:
+                return min(self.buckets[i], stats.max_s) if i < len(self.buckets) else stats.max_s
+        return stats.max_s
+
+    def _read_sources(self):
+        values = {}
+        for name, (callback, label) in list(self._sources.items()):
+            try:
+                values[name] = (callback(), label)
+            except Exception:
+                continue  # e.g. data files missing; skip this scrape
+        return values
+
+    def snapshot(self):
+        """
+        Current statistics.
+
+        Returns:
+            dict: ``stages`` (stage -> calls, errors, total/self/mean/max
+            seconds, p50/p95/p99 estimated from the histogram, mean RSS
+            delta in MB), ``counters``, ``sources``, ``uptime_s`` and
+            ``first_render_s`` (None until a page has rendered)
+        """
+        with self._lock:
+            stages = {}
+            for name, stats in sorted(self._stages.items()):
+                stages[name] = {
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'total_s': stats.total_s,
+                    'self_s': stats.self_s,
+                    'mean_s': stats.total_s / stats.calls,
+                    'p50_s': self._quantile(stats, 0.5),
+                    'p95_s': self._quantile(stats, 0.95),
+                    'p99_s': self._quantile(stats, 0.99),
+                    'max_s': stats.max_s,
+                    'mean_rss_delta_mb': stats.rss_delta_bytes / stats.calls / 1024 ** 2,
+                }
+            counters = dict(self._counters)
+        return {'stages': stages, 'counters': counters,
+                'sources': {name: value for name, (value, _) in self._read_sources().items()},
+                'uptime_s': time.time() - self.started, 'first_render_s': self.first_render_s}
+
+    def to_prometheus(self):
+        """
+        All metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        with self._lock:
+            stages = {name: (stats.calls, stats.errors, stats.total_s, stats.self_s, stats.rss_delta_bytes,
+                             list(stats.buckets)) for name, stats in sorted(self._stages.items())}
+            counters = sorted(self._counters.items())
+            first_render = self.first_render_s
+        metric = f"{METRIC_PREFIX}_stage_seconds"
+        lines += [f"# HELP {metric} Stage latency.", f"# TYPE {metric} histogram"]
+        for name, (calls, _, total, _, _, buckets) in stages.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {total}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {calls}')
+        for suffix, index, help_text in (('self_seconds_total', 3, 'Stage time excluding nested stages.'),
+                                         ('errors_total', 1, 'Stage calls that raised.'),
+                                         ('rss_delta_bytes_total', 4, 'Sum of RSS changes across stage calls.')):
+            metric = f"{METRIC_PREFIX}_stage_{suffix}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{stage="{name}"}} {values[index]}' for name, values in stages.items()]
+        if first_render is not None:
+            metric = f"{METRIC_PREFIX}_first_render_seconds"
+            lines += [f"# HELP {metric} Time from the first script run to the first rendered page.",
+                      f"# TYPE {metric} gauge", f"{metric} {first_render}"]
+        for name, value in counters:
+            metric = f"{METRIC_PREFIX}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for source, (values, label) in sorted(self._read_sources().items()):
+            for key, value in sorted(values.items()):
+                if isinstance(value, dict):
+                    for item, inner in sorted(value.items()):
+                        for inner_key, number in sorted(inner.items()):
+                            if _is_number(number):
+                                lines.append(f'{METRIC_PREFIX}_{source}_{_metric_name(inner_key)}'
+                                             f'{{{label}="{item}"}} {float(number)}')
+                elif _is_number(value):
+                    lines.append(f"{METRIC_PREFIX}_{source}_{_metric_name(key)} {float(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _metric_name(name):
+    return ''.join(c if c.isalnum() else '_' for c in name)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+_module_loaded = time.time()
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation():
+    """
+    Process-wide Instrumentation.
+
+    Returns:
+        Instrumentation: Shared instance
+    """
+    return _instrumentation
+
+
+def stage(name):
+    """Time a block as stage ``name`` on the process-wide instrumentation."""
+    return _instrumentation.stage(name)
+
+
+def timed(name):
+    """Decorator that runs a function as stage ``name`` on the process-wide instrumentation."""
+    return _instrumentation.timed(name)
+
+
+def import_module(name):
+    """
+    Import a module on first use, timed as stage 'import.<name>'.
+
+    Used for page modules, so plotly and the model code are only imported
+    by workers that render a page needing them. Once imported, the module
+    is returned without recording a stage.
+
+    Args:
+        name (str): Dotted module name, e.g. 'pages.analytics'
+
+    Returns:
+        module: The imported module
+    """
+    if name in sys.modules:
+        return importlib.import_module(name)
+    with stage(f'import.{name}'):
+        return importlib.import_module(name)
+
+
+def plotly_chart(fig, **kwargs):
+    """
+    st.plotly_chart timed as the 'plotly.chart' stage.
+
+    The stage covers serializing the figure to JSON and queueing it for
+    the browser.
+
+    Args:
+        fig (plotly.graph_objects.Figure): Figure to show
+        **kwargs: Passed to st.plotly_chart
+    """
+    import streamlit as st
+
+    with stage('plotly.chart'):
+        return st.plotly_chart(fig, **kwargs)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread.
+
+    A background thread records the target thread's Python stack every
+    ``interval`` seconds. Results are in the folded-stack format read by
+    flamegraph.pl and speedscope (one ``frame;frame;frame count`` line per
+    distinct stack).
+    """
+
+    def __init__(self, thread_id=None, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            thread_id (int): Thread to sample (default: the calling thread)
+            interval (float): Seconds between samples
+        """
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self):
+        """Folded stacks, most frequent first."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit=25):
+        """Functions by share of samples: running (self) and on the stack (inclusive)."""
+        leaf, inclusive = collections.Counter(), collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            leaf[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        total = max(self.samples, 1)
+        lines = [f"{self.samples} samples every {self.interval * 1000:.0f} ms", '', 'self:']
+        lines += [f"{100 * count / total:6.1f}%  {frame}" for frame, count in leaf.most_common(limit)]
+        lines += ['', 'inclusive:']
+        lines += [f"{100 * count / total:6.1f}%  {frame}" for frame, count in inclusive.most_common(limit)]
+        return '\n'.join(lines)
+
+
+class RequestProfile:
+    """Profile of a single page render, ready to download."""
+
+    def __init__(self, label, mode, seconds, data, summary, filename):
+        self.label = label
+        self.mode = mode
+        self.seconds = seconds
+        self.data = data
+        self.summary = summary
+        self.filename = filename
+        self.created = time.time()
+
+
+@contextlib.contextmanager
+def profile_request(label, mode):
+    """
+    Profile the block with cProfile or the sampling profiler.
+
+    Yields a dict that holds the RequestProfile under 'profile' once the
+    block has finished. With ``mode`` None nothing is profiled.
+
+    Args:
+        label (str): What is being profiled (e.g. the page name)
+        mode (str): 'cprofile', 'sampling' or None
+    """
+    result = {}
+    if mode is None:
+        yield result
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+    profiler = cProfile.Profile() if mode == 'cprofile' else SamplingProfiler()
+    start = time.perf_counter()
+    if mode == 'cprofile':
+        profiler.enable()
+    else:
+        profiler.start()
+    try:
+        yield result
+    finally:
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+        seconds = time.perf_counter() - start
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        slug = _metric_name(label).strip('_').lower() or 'request'
+        if mode == 'cprofile':
+            text = io.StringIO()
+            stats = pstats.Stats(profiler, stream=text)
+            stats.sort_stats('cumulative').print_stats(40)
+            # Same bytes as Stats.dump_stats; open with pstats or snakeviz
+            result['profile'] = RequestProfile(label, mode, seconds, marshal.dumps(stats.stats), text.getvalue(),
+                                               f"{slug}-{stamp}.prof")
+        else:
+            result['profile'] = RequestProfile(label, mode, seconds, profiler.folded().encode(), profiler.summary(),
+                                               f"{slug}-{stamp}.folded")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = _instrumentation.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the Streamlit log
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """
+    Serve /metrics from a background thread.
+
+    Args:
+        port (int): TCP port (0 picks a free one)
+        host (str): Interface to bind; local only by default
+
+    Returns:
+        ThreadingHTTPServer: Running server (``server_address`` has the port)
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,692 @@
+import argparse
+import asyncio
+import heapq
+import io
+import itertools
+import json
+import mmap
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import LATENCY_BUCKETS, get_instrumentation, timed
+
+NOTIFICATIONS_CSV = 'breathsave_notifications_schedule.csv'
+JOURNAL_SUFFIX = '.sent'
+DEFAULT_OUTBOX = 'notifications_delivered.jsonl'
+PAYLOAD_COLUMNS = ['notification_id', 'user_id', 'type']
+# Among notifications due at the same time, lower values are sent first
+TYPE_PRIORITY = {'craving_alert': 0, 'affirmation': 1}
+DEFAULT_PRIORITY = 2
+# Bytes of CSV parsed per block while loading; rows never straddle blocks
+LOAD_BLOCK_BYTES = 64 * 1024 ** 2
+OFFSET_DTYPE = np.dtype('<i8')
+
+NEWLINE, CARRIAGE_RETURN, UNSENT, SENT = (ord(c) for c in '\n\r01')
+
+
+class PendingNotifications:
+    """
+    Unsent notifications as columns, addressed by row position.
+
+    Text columns are fixed-width byte arrays, so taking a batch of rows is
+    a NumPy gather whatever the size of the queue.
+    """
+
+    def __init__(self, payload, due_ns, priority, offsets):
+        """
+        Args:
+            payload (dict): notification_id, user_id and type byte arrays
+            due_ns (np.ndarray): Due times as int64 nanoseconds (UTC)
+            priority (np.ndarray): Type priority (see TYPE_PRIORITY)
+            offsets (np.ndarray): Byte offset of each row's sent_flag digit
+        """
+        self.payload = payload
+        self.due_ns = due_ns
+        self.priority = priority
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def frame(self, rows):
+        """
+        Rows as handed to a sink.
+
+        Args:
+            rows (np.ndarray): Row positions
+
+        Returns:
+            pd.DataFrame: notification_id, user_id, type, schedule_time
+        """
+        frame = pd.DataFrame({column: _decode(values[rows]) for column, values in self.payload.items()}, dtype=object)
+        frame['schedule_time'] = self.due_ns[rows].view('datetime64[ns]')
+        return frame
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [part for part in parts if part is not None]
+        if not parts:
+            return cls({column: np.empty(0, dtype='S1') for column in PAYLOAD_COLUMNS},
+                       np.empty(0, np.int64), np.empty(0, np.int8), np.empty(0, np.int64))
+        return cls({column: np.concatenate([part.payload[column] for part in parts]) for column in PAYLOAD_COLUMNS},
+                   np.concatenate([part.due_ns for part in parts]),
+                   np.concatenate([part.priority for part in parts]),
+                   np.concatenate([part.offsets for part in parts]))
+
+
+def _decode(values):
+    try:
+        text = values.astype(str)  # ASCII, the usual case
+    except UnicodeDecodeError:
+        text = np.char.decode(values, 'utf-8')
+    return text.astype(object)
+
+
+def _encode(values):
+    values = values.to_numpy(dtype=object)
+    try:
+        return values.astype(bytes)  # ASCII, the usual case
+    except UnicodeEncodeError:
+        return np.array([value.encode('utf-8') for value in values], dtype=bytes)
+
+
+def _pending_block(block, base, columns, journalled, due_before):
+    """Unsent rows of one block of complete CSV lines starting at byte ``base``."""
+    raw = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero(raw == NEWLINE)
+    flags = ends - 1
+    flags -= raw[flags] == CARRIAGE_RETURN
+    offsets = base + flags
+    unsent = raw[flags] == UNSENT
+
+    # Journal entries must point at flag digits of this file, or it was replaced
+    lo, hi = np.searchsorted(journalled, [base, base + len(block)])
+    if hi > lo:
+        if not np.isin(journalled[lo:hi], offsets).all():
+            raise ValueError("Sent-flag journal does not match the notification schedule")
+        unsent &= ~np.isin(offsets, journalled[lo:hi])
+    if not unsent.any():
+        return None
+
+    # Parse only the unsent lines
+    if not unsent.all():
+        block = raw[np.repeat(unsent, np.diff(ends, prepend=-1))].tobytes()
+        offsets = offsets[unsent]
+    frame = pd.read_csv(io.BytesIO(block), header=None, names=columns, skip_blank_lines=False,
+                        usecols=PAYLOAD_COLUMNS + ['schedule_time', 'sent_flag'],
+                        dtype={column: object for column in PAYLOAD_COLUMNS + ['schedule_time']})
+    if len(frame) != len(offsets):
+        raise ValueError("Notification schedule has quoted line breaks; sent flags cannot be located")
+    if not (frame['sent_flag'] == 0).all():
+        raise ValueError("sent_flag must be a single 0 or 1 digit at the end of every row")
+
+    due = pd.to_datetime(frame['schedule_time'], format='ISO8601', errors='coerce')
+    due_ns = due.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    keep = ~due.isna().to_numpy()
+    if due_before is not None:
+        keep &= due_ns <= due_before
+    if not keep.any():
+        return None
+    frame = frame.loc[keep, PAYLOAD_COLUMNS].fillna('')
+    priority = frame['type'].map(TYPE_PRIORITY).fillna(DEFAULT_PRIORITY).to_numpy(dtype=np.int8)
+    payload = {column: _encode(frame[column]) for column in PAYLOAD_COLUMNS}
+    return PendingNotifications(payload, due_ns[keep], priority, offsets[keep])
+
+
+@timed('dispatch.load_pending')
+def load_pending(csv_path, journalled=None, due_before=None, block_bytes=LOAD_BLOCK_BYTES):
+    """
+    Read the unsent notifications of a schedule CSV.
+
+    Each row is identified by the byte offset of its ``sent_flag`` digit
+    (the last column), which is what SentFlagJournal records and flips.
+    Rows with an unparsable ``schedule_time`` are skipped. Times without a
+    timezone are read as UTC.
+
+    Args:
+        csv_path (str): Notification schedule CSV
+        journalled (np.ndarray): Offsets already sent but not yet compacted
+        due_before (int): Only rows due at or before this time (ns), if given
+        block_bytes (int): Bytes parsed per block
+
+    Returns:
+        PendingNotifications: Unsent rows in file order
+    """
+    journalled = np.sort(np.asarray(journalled if journalled is not None else [], dtype=np.int64))
+    parts = []
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        columns = header.decode().strip().split(',')
+        if columns[-1] != 'sent_flag':
+            raise ValueError(f"sent_flag must be the last column of {csv_path}")
+        base, carry = len(header), b''
+        while True:
+            data = f.read(block_bytes)
+            block = carry + data
+            if not block:
+                break
+            if data:
+                end = block.rfind(b'\n') + 1
+                block, carry = block[:end], block[end:]
+                if not block:
+                    continue
+            else:
+                block, carry = block + b'\n', b''  # last row without a line break
+            parts.append(_pending_block(block, base, columns, journalled, due_before))
+            base += len(block)
+    if len(journalled) and (journalled[0] < len(header) or journalled[-1] >= base):
+        raise ValueError("Sent-flag journal does not match the notification schedule")
+    return PendingNotifications.concat(parts)
+
+
+class ScheduleQueue:
+    """
+    Time-ordered queue of pending notifications, popped in batches once due.
+
+    The loaded schedule is sorted once (due time, then type priority, then
+    file order) and consumed through a cursor, so millions of entries cost
+    two arrays rather than a heap entry each. Batches added later (retries,
+    newly scheduled rows) go on a heapq of ``(due_ns, seq, rows, attempt)``
+    and pops merge both in due order.
+    """
+
+    def __init__(self, pending):
+        """
+        Args:
+            pending (PendingNotifications): Rows to schedule
+        """
+        self.pending = pending
+        self.order = np.lexsort((pending.priority, pending.due_ns))
+        self.sorted_due = pending.due_ns[self.order]
+        self._cursor = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self.pushed_rows = 0
+
+    def __len__(self):
+        return len(self.order) - self._cursor + self.pushed_rows
+
+    def next_due(self):
+        """Due time (ns) of the earliest queued row, or None when empty."""
+        candidates = [self._heap[0][0]] if self._heap else []
+        if self._cursor < len(self.order):
+            candidates.append(int(self.sorted_due[self._cursor]))
+        return min(candidates) if candidates else None
+
+    def push(self, rows, due_ns, attempt=0):
+        """
+        Queue rows as one batch due at ``due_ns``.
+
+        Args:
+            rows (np.ndarray): Row positions in ``pending``
+            due_ns (int): Due time in nanoseconds
+            attempt (int): Delivery attempts already made
+        """
+        heapq.heappush(self._heap, (due_ns, next(self._seq), rows, attempt))
+        self.pushed_rows += len(rows)
+
+    def pop_due(self, now_ns, batch_size, max_batches):
+        """
+        Remove batches that are due.
+
+        Args:
+            now_ns (int): Current time in nanoseconds
+            batch_size (int): Maximum rows per batch from the schedule
+            max_batches (int): Maximum batches to return
+
+        Returns:
+            list: ``(rows, attempt)`` tuples in due order
+        """
+        batches = []
+        while len(batches) < max_batches:
+            heap_due = self._heap[0][0] if self._heap else None
+            cursor = self._cursor
+            base_due = self.sorted_due[cursor] if cursor < len(self.order) else None
+            if heap_due is not None and heap_due <= now_ns and (base_due is None or heap_due < base_due):
+                _, _, rows, attempt = heapq.heappop(self._heap)
+                self.pushed_rows -= len(rows)
+                batches.append((rows, attempt))
+            elif base_due is not None and base_due <= now_ns:
+                limit = now_ns if heap_due is None else min(now_ns, heap_due)
+                stop = cursor + int(np.searchsorted(self.sorted_due[cursor:cursor + batch_size], limit, 'right'))
+                self._cursor = stop
+                batches.append((self.order[cursor:stop], 0))
+            else:
+                break
+        return batches
+
+
+class SentFlagJournal:
+    """
+    Batched, crash-safe persistence of sent flags.
+
+    ``record`` appends the flag offsets of a batch of sent rows to a journal
+    next to the CSV with one write and fsync. ``compact`` flips those digits
+    from 0 to 1 in the CSV in place, which keeps the file size and every row
+    offset unchanged (appends and incremental reloads keep working), and
+    then empties the journal. Until compaction, load_pending skips journalled
+    rows, so a restart does not send them again. Compacting twice is harmless.
+    """
+
+    def __init__(self, csv_path, path=None):
+        """
+        Args:
+            csv_path (str): Notification schedule CSV
+            path (str): Journal file (default: the CSV path plus '.sent')
+        """
+        self.csv_path = csv_path
+        self.path = path or csv_path + JOURNAL_SUFFIX
+        self._lock = threading.Lock()
+
+    def record(self, offsets):
+        """Durably append sent-flag offsets."""
+        data = np.asarray(offsets, dtype=OFFSET_DTYPE).tobytes()
+        with self._lock, open(self.path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def offsets(self):
+        """
+        Offsets recorded since the last compaction.
+
+        Returns:
+            np.ndarray: int64 offsets (a torn last record is ignored)
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return np.empty(0, np.int64)
+        usable = len(data) - len(data) % OFFSET_DTYPE.itemsize
+        return np.frombuffer(data[:usable], dtype=OFFSET_DTYPE).astype(np.int64)
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.path) // OFFSET_DTYPE.itemsize
+        except FileNotFoundError:
+            return 0
+
+    @timed('dispatch.compact')
+    def compact(self):
+        """
+        Write journalled flags into the CSV and clear the journal.
+
+        Every offset is checked to hold a flag digit at the end of a line
+        before anything is written.
+
+        Returns:
+            int: Rows marked sent
+
+        Raises:
+            ValueError: If the journal does not match the CSV
+        """
+        with self._lock:
+            offsets = np.unique(self.offsets())
+            if len(offsets):
+                with open(self.csv_path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+                    data = np.ndarray((len(mm),), dtype=np.uint8, buffer=mm)
+                    if offsets[-1] >= len(data):
+                        raise ValueError("Sent-flag journal does not match the notification schedule")
+                    after = data[np.minimum(offsets + 1, len(data) - 1)]
+                    digits = data[offsets]
+                    line_end = (after == NEWLINE) | (after == CARRIAGE_RETURN) | (offsets + 1 == len(data))
+                    if not (((digits == UNSENT) | (digits == SENT)) & line_end).all():
+                        raise ValueError("Sent-flag journal does not match the notification schedule")
+                    data[offsets] = SENT
+                    del data
+                    mm.flush()
+                    os.fsync(f.fileno())
+                # mmap writes may not update mtime; the table cache keys on it
+                os.utime(self.csv_path)
+            with open(self.path, 'wb') as f:
+                os.fsync(f.fileno())
+        return len(offsets)
+
+
+class MemorySink:
+    """In-process sink for tests and benchmarks, with optional latency and failures."""
+
+    def __init__(self, latency_s=0.0, failure_rate=0.0, seed=0):
+        """
+        Args:
+            latency_s (float): Simulated delivery time per batch
+            failure_rate (float): Probability that a notification fails
+            seed (int): Random seed for failures
+        """
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self._rng = np.random.default_rng(seed)
+        self.delivered = []
+        self.batches = 0
+
+    async def deliver(self, batch):
+        self.batches += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        ids = batch['notification_id'].to_numpy()
+        if not self.failure_rate:
+            self.delivered.append(ids)
+            return None
+        ok = self._rng.random(len(batch)) >= self.failure_rate
+        self.delivered.append(ids[ok])
+        return ok
+
+    def delivered_ids(self):
+        """All delivered notification ids, in delivery order."""
+        return np.concatenate(self.delivered) if self.delivered else np.empty(0, dtype=object)
+
+
+class JsonlFileSink:
+    """Appends delivered notifications to a JSON Lines file, a local stand-in for a push service."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Output file (appended to)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    async def deliver(self, batch):
+        await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch):
+        text = batch.to_json(orient='records', lines=True, date_format='iso')
+        with self._lock, open(self.path, 'a') as f:
+            f.write(text if text.endswith('\n') else text + '\n')
+
+
+class LagHistogram:
+    """Scheduling lag in the instrumentation's latency buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = np.asarray(buckets)
+        self.counts = np.zeros(len(buckets) + 1, dtype=np.int64)
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, lags):
+        if not len(lags):
+            return
+        self.counts += np.bincount(np.searchsorted(self.bounds, lags), minlength=len(self.counts))
+        self.count += len(lags)
+        self.total_s += float(lags.sum())
+        self.max_s = max(self.max_s, float(lags.max()))
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile ``q`` (max if beyond the last bound)."""
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        if not self.count or index >= len(self.bounds):
+            return self.max_s
+        return min(float(self.bounds[index]), self.max_s)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_s': self.total_s / self.count if self.count else 0.0,
+            'p50_s': self.quantile(0.5),
+            'p95_s': self.quantile(0.95),
+            'p99_s': self.quantile(0.99),
+            'max_s': self.max_s,
+        }
+
+
+class NotificationDispatcher:
+    """
+    Delivers queued notifications at their due time through a sink.
+
+    One scheduler coroutine sleeps until the next due time and hands due
+    batches to ``concurrency`` worker coroutines through a bounded queue,
+    so a slow sink holds the scheduler back instead of piling up batches.
+    A sink is any object with an ``async deliver(batch)`` method, where
+    ``batch`` is a DataFrame (notification_id, user_id, type,
+    schedule_time); it returns None when every row was delivered or a
+    boolean array marking the delivered rows, and raising fails the batch.
+    Failed rows go back on the queue after an exponential backoff with
+    jitter and are dead-lettered after ``max_attempts``. Sent rows are
+    recorded in the journal in batches of ``flush_rows`` or every
+    ``flush_interval_s``. Delivery is at-least-once: rows delivered but not
+    yet flushed when the process dies are sent again on restart.
+
+    Scheduling lag is measured when a batch is handed to the sink, from its
+    due time or from the start of the run for rows that were already due.
+    """
+
+    def __init__(self, queue, sink, journal=None, concurrency=8, batch_size=1000, max_attempts=5,
+                 backoff_s=0.5, max_backoff_s=30.0, flush_rows=10_000, flush_interval_s=1.0,
+                 clock=time.time_ns, seed=None):
+        """
+        Args:
+            queue (ScheduleQueue): Notifications to deliver
+            sink: Delivery target with ``async deliver(batch)``
+            journal (SentFlagJournal): Where sent rows are recorded (None: not persisted)
+            concurrency (int): Batches delivered at once
+            batch_size (int): Maximum notifications per delivery
+            max_attempts (int): Attempts per notification before dead-lettering
+            backoff_s (float): Delay before the first retry, doubled per attempt
+            max_backoff_s (float): Upper limit of the retry delay
+            flush_rows (int): Sent rows that trigger a journal write
+            flush_interval_s (float): Maximum seconds between journal writes
+            clock (callable): Current time in nanoseconds
+            seed (int): Random seed for the backoff jitter
+        """
+        self.queue = queue
+        self.sink = sink
+        self.journal = journal
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.clock = clock
+        self._random = random.Random(seed)
+        self.lag = LagHistogram()
+        self.dead_letters = []
+        self.last_error = None
+        self.stats = {'delivered': 0, 'batches': 0, 'retries': 0, 'dead_lettered': 0,
+                      'sink_errors': 0, 'flushes': 0, 'flushed_rows': 0}
+        self._stopping = False
+
+    def stop(self):
+        """Stop scheduling; batches already handed to workers are still delivered."""
+        self._stopping = True
+        if getattr(self, '_wake', None) is not None:
+            self._wake.set()
+
+    def backoff(self, attempt):
+        """Seconds before retry ``attempt + 1`` (half to full exponential delay)."""
+        delay = min(self.max_backoff_s, self.backoff_s * 2 ** attempt)
+        return delay * self._random.uniform(0.5, 1.0)
+
+    async def run(self):
+        """
+        Deliver until the queue is empty (or ``stop`` is called).
+
+        Returns:
+            dict: See summary
+        """
+        self._work = asyncio.Queue(maxsize=2 * self.concurrency)
+        self._wake = asyncio.Event()
+        self._flush_needed = asyncio.Event()
+        self._closing = False
+        self._in_flight = 0
+        self._sent, self._unflushed = [], 0
+        self.started_ns = self.clock()
+        started = time.perf_counter()
+
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        flusher = asyncio.create_task(self._flusher())
+        try:
+            await self._schedule()
+            for _ in workers:
+                await self._work.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            self._closing = True
+            self._flush_needed.set()
+            await flusher
+        self.elapsed_s = time.perf_counter() - started
+        return self.summary()
+
+    async def _schedule(self):
+        while not self._stopping:
+            now = self.clock()
+            batches = self.queue.pop_due(now, self.batch_size, self.concurrency)
+            for rows, attempt in batches:
+                self._in_flight += 1
+                await self._work.put((rows, attempt))
+            if batches:
+                continue
+            next_due = self.queue.next_due()
+            if next_due is None and self._in_flight == 0:
+                return
+            self._wake.clear()
+            timeout = None if next_due is None else max(0.0, (next_due - now) / 1e9)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            item = await self._work.get()
+            if item is None:
+                return
+            try:
+                await self._deliver(*item)
+            finally:
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self._wake.set()
+
+    async def _deliver(self, rows, attempt):
+        pending = self.queue.pending
+        if attempt == 0:
+            due = pending.due_ns[rows]
+            self.lag.add((self.clock() - np.maximum(due, self.started_ns)) / 1e9)
+        try:
+            delivered = await self.sink.deliver(pending.frame(rows))
+        except Exception as e:
+            self.stats['sink_errors'] += 1
+            self.last_error = repr(e)
+            delivered = np.zeros(len(rows), dtype=bool)
+        self.stats['batches'] += 1
+
+        if delivered is None:
+            sent, failed = rows, rows[:0]
+        else:
+            delivered = np.asarray(delivered, dtype=bool)
+            sent, failed = rows[delivered], rows[~delivered]
+        if len(sent):
+            self._sent.append(pending.offsets[sent])
+            self._unflushed += len(sent)
+            self.stats['delivered'] += len(sent)
+            if self._unflushed >= self.flush_rows:
+                self._flush_needed.set()
+        if len(failed):
+            if attempt + 1 >= self.max_attempts:
+                self.stats['dead_lettered'] += len(failed)
+                self.dead_letters.append(failed)
+                get_instrumentation().count('dispatch.dead_lettered', len(failed))
+            else:
+                self.stats['retries'] += len(failed)
+                self.queue.push(failed, self.clock() + int(self.backoff(attempt) * 1e9), attempt + 1)
+                self._wake.set()
+                get_instrumentation().count('dispatch.retries', len(failed))
+
+    async def _flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            closing = self._closing
+            await self._flush()
+            if closing:
+                return
+
+    async def _flush(self):
+        if not self._sent:
+            return
+        offsets = np.concatenate(self._sent)
+        self._sent, self._unflushed = [], 0
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.record, offsets)
+        self.stats['flushes'] += 1
+        self.stats['flushed_rows'] += len(offsets)
+        get_instrumentation().count('dispatch.delivered', len(offsets))
+
+    def summary(self):
+        """
+        Counters of the last run.
+
+        Returns:
+            dict: stats counters, ``queued`` (left in the queue), elapsed
+            seconds, ``dispatches_per_s`` and the ``lag`` summary
+        """
+        elapsed = getattr(self, 'elapsed_s', 0.0)
+        return {
+            **self.stats,
+            'queued': len(self.queue),
+            'elapsed_s': elapsed,
+            'dispatches_per_s': self.stats['delivered'] / elapsed if elapsed else 0.0,
+            'lag': self.lag.summary(),
+            'last_error': self.last_error,
+        }
+
+
+def dispatch_pending(data_dir='data', sink=None, due_before=None, compact=True, **options):
+    """
+    Deliver the unsent notifications of the schedule and mark them sent.
+
+    Args:
+        data_dir (str): Directory holding the notification schedule
+        sink: Delivery target (default: JSON Lines file in ``data_dir``)
+        due_before (int): Only deliver rows due by this time (ns); others wait
+            for a later run. None delivers everything, each at its due time
+        compact (bool): Write the sent flags into the CSV when done
+        **options: NotificationDispatcher options
+
+    Returns:
+        dict: Dispatcher summary plus ``loaded`` and ``compacted`` row counts
+    """
+    csv_path = os.path.join(data_dir, NOTIFICATIONS_CSV)
+    journal = SentFlagJournal(csv_path)
+    queue = ScheduleQueue(load_pending(csv_path, journal.offsets(), due_before))
+    sink = sink or JsonlFileSink(os.path.join(data_dir, DEFAULT_OUTBOX))
+    summary = asyncio.run(NotificationDispatcher(queue, sink, journal, **options).run())
+    summary['loaded'] = len(queue.pending)
+    summary['compacted'] = journal.compact() if compact else 0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Deliver unsent notifications from the schedule at their due times and mark them sent.")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--out', default=None, help=f"JSON Lines output (default: <data-dir>/{DEFAULT_OUTBOX})")
+    parser.add_argument('--once', action='store_true', help="Deliver what is due now and exit")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    sink = JsonlFileSink(args.out or os.path.join(args.data_dir, DEFAULT_OUTBOX))
+    summary = dispatch_pending(args.data_dir, sink, time.time_ns() if args.once else None,
+                               concurrency=args.concurrency, batch_size=args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.columnar_store import open_prefix
+
+NOTIFICATIONS_CSV = 'breathsave_notifications_schedule.csv'
+ROLLUP_COLUMNS = ['user_id', 'type', 'schedule_time', 'sent_flag']
+
+# Memory ceiling for the ingestion working set (parser buffers, the chunk
+# being folded and its temporaries). Rollup state is separate: it grows with
+# the number of users, never with the number of rows (see nbytes).
+DEFAULT_MEMORY_LIMIT_MB = 256
+BYTES_PER_ROW = 400
+
+
+def chunk_rows_for_limit(memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+    """
+    Number of CSV rows to parse per chunk under a memory ceiling.
+
+    Args:
+        memory_limit_mb (float): Memory ceiling for ingestion
+
+    Returns:
+        int: Rows per chunk
+    """
+    return max(1_000, int(memory_limit_mb * 1024 ** 2 / 2 / BYTES_PER_ROW))
+
+
+def _typed_chunk(chunk):
+    chunk['schedule_time'] = pd.to_datetime(chunk['schedule_time'], format='ISO8601', errors='coerce')
+    chunk['sent_flag'] = chunk['sent_flag'].fillna(0).astype(np.int8)
+    return chunk
+
+
+def iter_notification_chunks(source, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, chunk_rows=None, names=None):
+    """
+    Stream a notification schedule as typed DataFrame chunks.
+
+    Only the columns needed for rollups are parsed; ``notification_id`` is
+    skipped entirely.
+
+    Args:
+        source (str or file): CSV path or binary file object
+        memory_limit_mb (float): Memory ceiling used to size chunks
+        chunk_rows (int): Explicit chunk size (overrides memory_limit_mb)
+        names (list): Column names when ``source`` has no header line
+
+    Yields:
+        pd.DataFrame: Chunk with user_id, type, schedule_time, sent_flag
+    """
+    chunk_rows = chunk_rows or chunk_rows_for_limit(memory_limit_mb)
+    reader = pd.read_csv(
+        source,
+        usecols=ROLLUP_COLUMNS,
+        dtype={'user_id': object, 'type': object, 'schedule_time': object},
+        header=None if names else 'infer',
+        names=names,
+        chunksize=chunk_rows,
+    )
+    with reader:
+        for chunk in reader:
+            yield _typed_chunk(chunk)
+
+
+NO_TIME = np.iinfo(np.int64).max
+
+
+class NotificationRollup:
+    """
+    Per-user notification rollups computed in bounded memory.
+
+    Users and notification types are mapped to dense integer codes and all
+    state lives in fixed-width NumPy arrays, so memory is proportional to the
+    number of users no matter how many notifications are streamed through.
+    Rollups from separate files or shards can be combined with ``merge``.
+    """
+
+    def __init__(self):
+        """Initialize empty rollups."""
+        self.user_index = pd.Index([], dtype=object)
+        self.type_index = pd.Index([], dtype=object)
+        self.counts = np.zeros((0, 0, 2), dtype=np.int32)   # user, type, (unsent, sent)
+        self.hourly = np.zeros((0, 24), dtype=np.int32)
+        self.first_ns = np.zeros(0, dtype=np.int64)
+        self.last_ns = np.zeros(0, dtype=np.int64)
+        self.rows = 0
+        self._summary = None
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Rebuild rollups from to_arrays output (e.g. memory-mapped files).
+
+        Arrays are used as given; with read-only arrays the rollups can be
+        read but not updated.
+
+        Args:
+            arrays (dict): Name -> np.array, as returned by to_arrays
+
+        Returns:
+            NotificationRollup: The exported rollups
+        """
+        rollup = cls()
+        rollup.user_index = pd.Index(arrays['user_index'])
+        rollup.type_index = pd.Index(arrays['type_index'])
+        for name in ('counts', 'hourly', 'first_ns', 'last_ns'):
+            setattr(rollup, name, arrays[name])
+        rollup.rows = int(arrays['rows'])
+        return rollup
+
+    def to_arrays(self):
+        """
+        Export the rollup state as plain arrays.
+
+        Returns:
+            dict: Name -> np.array, trimmed to the known users
+        """
+        n = self.n_users
+        return {
+            'user_index': np.asarray(self.user_index, dtype=str),
+            'type_index': np.asarray(self.type_index, dtype=str),
+            'counts': self.counts[:n],
+            'hourly': self.hourly[:n],
+            'first_ns': self.first_ns[:n],
+            'last_ns': self.last_ns[:n],
+            'rows': np.array(self.rows, dtype=np.int64),
+        }
+
+    @property
+    def n_users(self):
+        return len(self.user_index)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the rollup state."""
+        arrays = (self.counts, self.hourly, self.first_ns, self.last_ns)
+        # The label index also keeps a hash table (roughly 32 bytes per user)
+        index_bytes = self.user_index.memory_usage(deep=True) + 32 * self.n_users
+        return sum(a.nbytes for a in arrays) + index_bytes
+
+    def _encode(self, values, attr):
+        """Map values to dense codes, registering unseen labels on ``attr``."""
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Index(np.asarray(uniques, dtype=object))
+        index = getattr(self, attr)
+        mapping = index.get_indexer(uniques)
+        missing = mapping < 0
+        if missing.any():
+            mapping[missing] = np.arange(len(index), len(index) + missing.sum())
+            setattr(self, attr, index.append(uniques[missing]))
+        return mapping[codes]
+
+    def _reserve(self):
+        """Grow state arrays (geometrically) to fit every known user and type."""
+        n_types = len(self.type_index)
+        capacity = len(self.first_ns)
+        if n_types > self.counts.shape[1]:
+            grown = np.zeros((capacity, n_types, 2), dtype=np.int32)
+            grown[:, :self.counts.shape[1]] = self.counts
+            self.counts = grown
+        if self.n_users > capacity:
+            capacity = max(self.n_users, 2 * capacity, 1024)
+            extra = capacity - len(self.first_ns)
+            self.counts = np.concatenate([self.counts, np.zeros((extra, n_types, 2), dtype=np.int32)])
+            self.hourly = np.concatenate([self.hourly, np.zeros((extra, 24), dtype=np.int32)])
+            self.first_ns = np.concatenate([self.first_ns, np.full(extra, NO_TIME, dtype=np.int64)])
+            self.last_ns = np.concatenate([self.last_ns, np.full(extra, -NO_TIME, dtype=np.int64)])
+
+    def update(self, chunk):
+        """
+        Fold one chunk of notifications into the rollups.
+
+        Args:
+            chunk (pd.DataFrame): Chunk from iter_notification_chunks
+        """
+        chunk = chunk[chunk['user_id'].notna() & chunk['type'].notna()]
+        if chunk.empty:
+            return
+        user = self._encode(chunk['user_id'], 'user_index')
+        kind = self._encode(chunk['type'], 'type_index')
+        self._reserve()
+
+        sent = (chunk['sent_flag'].to_numpy() > 0).astype(np.int64)
+        _add_counts(self.counts, (user * self.counts.shape[1] + kind) * 2 + sent)
+
+        stamps = chunk['schedule_time'].to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(stamps)
+        user, stamps = user[valid], stamps[valid]
+        hour = (stamps - stamps.astype('datetime64[D]')).astype('timedelta64[h]').astype(np.int64)
+        _add_counts(self.hourly, user * 24 + hour)
+
+        times = pd.Series(stamps.view(np.int64)).groupby(user)
+        first, last = times.min(), times.max()
+        idx = first.index.to_numpy()
+        self.first_ns[idx] = np.minimum(self.first_ns[idx], first.to_numpy())
+        self.last_ns[idx] = np.maximum(self.last_ns[idx], last.to_numpy())
+        self.rows += len(chunk)
+        self._summary = None
+
+    def merge(self, other):
+        """
+        Combine rollups computed on another shard into this one.
+
+        Args:
+            other (NotificationRollup): Rollups to merge in
+        """
+        user = self._encode(other.user_index, 'user_index')
+        kind = self._encode(other.type_index, 'type_index')
+        self._reserve()
+        n = other.n_users
+        self.counts[user[:, None], kind[None, :]] += other.counts[:n, :len(kind)]
+        self.hourly[user] += other.hourly[:n]
+        self.first_ns[user] = np.minimum(self.first_ns[user], other.first_ns[:n])
+        self.last_ns[user] = np.maximum(self.last_ns[user], other.last_ns[:n])
+        self.rows += other.rows
+        self._summary = None
+
+    def summary(self):
+        """
+        Per-user rollup table.
+
+        Returns:
+            pd.DataFrame: One row per user with ``<status>_<type>`` counts,
+                total, first_schedule and last_schedule
+        """
+        if self._summary is None:
+            n = self.n_users
+            data = {'user_id': np.asarray(self.user_index)}
+            for code, kind in sorted(enumerate(self.type_index), key=lambda item: item[1]):
+                data[f"sent_{kind}"] = self.counts[:n, code, 1]
+                data[f"unsent_{kind}"] = self.counts[:n, code, 0]
+            data['total'] = self.counts[:n].sum(axis=(1, 2), dtype=np.int64)
+            data['first_schedule'] = _to_datetime(self.first_ns[:n], NO_TIME)
+            data['last_schedule'] = _to_datetime(self.last_ns[:n], -NO_TIME)
+            self._summary = pd.DataFrame(data)
+        return self._summary
+
+    def hourly_histogram(self):
+        """
+        Notifications per user per hour of day.
+
+        Returns:
+            pd.DataFrame: Index user_id, columns 0-23
+        """
+        return pd.DataFrame(
+            self.hourly[:self.n_users],
+            index=self.user_index.rename('user_id'),
+            columns=range(24),
+        )
+
+
+def _add_counts(target, flat_index):
+    """Increment ``target`` (viewed flat) once per entry of ``flat_index``."""
+    keys, counts = np.unique(flat_index, return_counts=True)
+    flat = target.reshape(-1)
+    flat[keys] += counts.astype(target.dtype)
+
+
+def _to_datetime(ns, sentinel):
+    values = ns.copy()
+    values[ns == sentinel] = np.iinfo(np.int64).min  # NaT
+    return values.view('datetime64[ns]')
+
+
+def rollup_notifications(source, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, chunk_rows=None, names=None):
+    """
+    Stream a notification CSV into a NotificationRollup.
+
+    Args:
+        source (str or file): CSV path or binary file object
+        memory_limit_mb (float): Memory ceiling used to size chunks
+        chunk_rows (int): Explicit chunk size (overrides memory_limit_mb)
+        names (list): Column names when ``source`` has no header line
+
+    Returns:
+        NotificationRollup: Rollups over every row in the file
+    """
+    rollup = NotificationRollup()
+    for chunk in iter_notification_chunks(source, memory_limit_mb, chunk_rows, names):
+        rollup.update(chunk)
+    return rollup
+
+
+class NotificationRollupLoader:
+    """TableCache loader that keeps rollups instead of raw notification rows."""
+
+    def __init__(self, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB):
+        self.memory_limit_mb = memory_limit_mb
+
+    def load(self, data_dir):
+        path = os.path.join(data_dir, NOTIFICATIONS_CSV)
+        # Rows appended while streaming are left for the cache's append path
+        size = os.stat(path).st_size
+        with open_prefix(path, size) as source:
+            return rollup_notifications(source, self.memory_limit_mb), size
+
+    def append(self, current, data, columns):
+        tail = rollup_notifications(io.BytesIO(data), self.memory_limit_mb, names=columns)
+        current.merge(tail)
+        return current
@@ -0,0 +1,311 @@
+import copy
+import heapq
+import threading
+
+import numpy as np
+
+from utils.columnar_store import parse_rows
+from utils.data_access import SharedTableLoader
+from utils.streaming_correlation import CORRELATION_COLUMNS, CorrelationAccumulator
+
+HISTOGRAM_COLUMNS = ['money_saved', 'total_cigs_avoided']
+SUMMARY_COLUMNS = ['money_saved', 'total_cigs_avoided', 'total_days', 'points']
+# Everything OverviewAggregates reads (leaderboards need user_id)
+OVERVIEW_COLUMNS = ['user_id'] + SUMMARY_COLUMNS
+DEFAULT_BINS = 40
+TOP_N = 15
+TOP_EARNERS = 10
+
+
+class FixedBinHistogram:
+    """
+    Histogram with fixed-width bins that can absorb new values.
+
+    Bins are anchored at the minimum seen when the histogram was built.
+    Values outside the current range add bins of the same width, and when
+    there are more than twice the target number of bins, neighbouring bins
+    are merged (doubling the width), so counts stay exact and the chart
+    keeps roughly ``nbins`` bars.
+    """
+
+    def __init__(self, values, nbins=DEFAULT_BINS):
+        """
+        Args:
+            values (np.array): Initial values
+            nbins (int): Target number of bins
+        """
+        values = np.asarray(values, dtype=float)
+        self.nbins = nbins
+        lo = float(values.min()) if len(values) else 0.0
+        hi = float(values.max()) if len(values) else 0.0
+        # Widened slightly so the maximum lands in the last bin, not past it
+        self.width = (hi - lo) / nbins * (1 + 1e-9) if hi > lo else 1.0
+        self.start = lo
+        self.counts = np.zeros(nbins, dtype=np.int64)
+        self.update(values)
+
+    def update(self, values):
+        """
+        Add values, extending the bin range when needed.
+
+        Args:
+            values (np.array): New values
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        index = np.floor((values - self.start) / self.width).astype(np.int64)
+        low, high = int(index.min()), int(index.max())
+        if low < 0:
+            self.counts = np.concatenate([np.zeros(-low, dtype=np.int64), self.counts])
+            self.start += low * self.width
+            index -= low
+            high -= low
+        if high >= len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(high + 1 - len(self.counts), dtype=np.int64)])
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        while len(self.counts) > 2 * self.nbins:
+            self._coarsen()
+
+    def _coarsen(self):
+        if len(self.counts) % 2:
+            self.counts = np.append(self.counts, 0)
+        self.counts = self.counts.reshape(-1, 2).sum(axis=1)
+        self.width *= 2
+
+    def centers(self):
+        """Bin centres, for plotting."""
+        return self.start + (np.arange(len(self.counts)) + 0.5) * self.width
+
+
+def _present(values):
+    """``values`` without NaN (blank cells); the array itself if there are none."""
+    missing = np.isnan(values)
+    return values[~missing] if missing.any() else values
+
+
+def _int_or_none(value):
+    return None if np.isnan(value) else int(value)
+
+
+class TopN:
+    """Bounded min-heap keeping the ``n`` rows with the largest key."""
+
+    def __init__(self, n=TOP_N):
+        self.n = n
+        self._heap = []
+        self._rows = 0
+
+    def update(self, keys, payload):
+        """
+        Offer a batch of rows.
+
+        Ties go to the earlier row, as with DataFrame.nlargest.
+
+        Args:
+            keys (np.array): Sort keys
+            payload (callable): Row position -> display tuple; only called
+                for rows that can enter the leaderboard
+        """
+        keys = np.asarray(keys, dtype=float)
+        offset = self._rows
+        self._rows += len(keys)
+        if len(self._heap) == self.n:
+            candidates = np.flatnonzero(keys >= self._heap[0][0])
+        elif len(keys) > self.n:
+            # Everything tied with the n-th largest key stays a candidate.
+            # Missing keys never compare as candidates, so they never enter the leaderboard
+            present = _present(keys)
+            if len(present) > self.n:
+                kth = np.partition(present, len(present) - self.n)[len(present) - self.n]
+            else:
+                kth = present.min(initial=np.inf)
+            candidates = np.flatnonzero(keys >= kth)
+        else:
+            candidates = np.flatnonzero(~np.isnan(keys))
+        for i in candidates:
+            rank = (float(keys[i]), -(offset + int(i)))
+            if len(self._heap) < self.n:
+                heapq.heappush(self._heap, (*rank, payload(i)))
+            elif rank > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, (*rank, payload(i)))
+
+    def items(self):
+        """
+        Current leaders, largest first.
+
+        Returns:
+            list: (key, payload) tuples
+        """
+        return [(key, payload) for key, _, payload in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+
+class OverviewAggregates:
+    """Summary metrics, histograms and leaderboards for the Overview and Rewards pages."""
+
+    def __init__(self, nbins=DEFAULT_BINS, top_n=TOP_N):
+        self.nbins = nbins
+        self.rows = 0
+        self.sums = {column: 0.0 for column in SUMMARY_COLUMNS}
+        # Non-missing values per summary column; blank cells are skipped like DataFrame.mean
+        self.counts = {column: 0 for column in SUMMARY_COLUMNS}
+        self.histograms = {}
+        self.top_savers = TopN(top_n)
+        self.top_earners = TopN(TOP_EARNERS)
+
+    @classmethod
+    def from_frame(cls, df, nbins=DEFAULT_BINS, top_n=TOP_N):
+        """
+        Build aggregates with one pass over a milestones table.
+
+        Args:
+            df (pd.DataFrame): Milestones table
+            nbins (int): Target bins per histogram
+            top_n (int): Leaderboard size
+
+        Returns:
+            OverviewAggregates: Aggregates for ``df``
+        """
+        aggregates = cls(nbins, top_n)
+        aggregates.update(df)
+        return aggregates
+
+    def update(self, df):
+        """
+        Fold in new milestone rows without touching the rows seen before.
+
+        Args:
+            df (pd.DataFrame): Appended rows
+        """
+        for column in SUMMARY_COLUMNS:
+            values = _present(df[column].to_numpy(dtype=float))
+            self.sums[column] += float(values.sum())
+            self.counts[column] += len(values)
+        for column in HISTOGRAM_COLUMNS:
+            values = _present(df[column].to_numpy(dtype=float))
+            if column in self.histograms:
+                self.histograms[column].update(values)
+            elif len(values):
+                self.histograms[column] = FixedBinHistogram(values, self.nbins)
+        self.rows += len(df)
+
+        user_ids, avoided, saved = df['user_id'], df['total_cigs_avoided'], df['money_saved']
+        if self.top_savers.n:
+            self.top_savers.update(saved.to_numpy(dtype=float),
+                                   lambda i: (str(user_ids.iat[i]), _int_or_none(avoided.iat[i])))
+        if self.top_earners.n:
+            self.top_earners.update(df['points'].to_numpy(dtype=float),
+                                    lambda i: (str(user_ids.iat[i]), float(saved.iat[i])))
+
+    def mean(self, column):
+        """Mean of a summary column's non-missing values (0 if there are none)."""
+        return self.sums[column] / self.counts[column] if self.counts[column] else 0.0
+
+    def total(self, column):
+        """Sum of a summary column."""
+        return self.sums[column]
+
+    def histogram(self, column):
+        """
+        Histogram arrays for plotting.
+
+        Args:
+            column (str): One of HISTOGRAM_COLUMNS
+
+        Returns:
+            tuple: (bin centres, counts, bin width)
+        """
+        histogram = self.histograms.get(column)
+        if histogram is None:
+            return np.array([]), np.array([], dtype=np.int64), 0.0
+        return histogram.centers(), histogram.counts, histogram.width
+
+    def leaderboard(self):
+        """
+        Top savers, largest first.
+
+        Returns:
+            list: dicts with user_id, money_saved, total_cigs_avoided
+        """
+        return [{'user_id': user_id, 'money_saved': saved, 'total_cigs_avoided': cigs}
+                for saved, (user_id, cigs) in self.top_savers.items()]
+
+    def earners_leaderboard(self):
+        """
+        Top reward point earners, largest first.
+
+        Returns:
+            list: dicts with user_id, points, money_saved
+        """
+        return [{'user_id': user_id, 'points': int(points), 'money_saved': saved}
+                for points, (user_id, saved) in self.top_earners.items()]
+
+
+class MilestonesLoader(SharedTableLoader):
+    """
+    TableCache loader for milestones that maintains OverviewAggregates and
+    the Analytics correlation accumulator.
+
+    The table is held as a column-lazy SharedTable. Each aggregate is built
+    on first use from only the columns it needs (OVERVIEW_COLUMNS,
+    CORRELATION_COLUMNS) and updated from the parsed tail when rows are
+    appended. Each version is published as a new object, so a page holding
+    ``overview`` or ``correlation`` never sees a half-applied update.
+    """
+
+    def __init__(self, nbins=DEFAULT_BINS, top_n=TOP_N):
+        super().__init__('milestones')
+        self.nbins = nbins
+        self.top_n = top_n
+        self.table = None
+        self._overview = None
+        self._correlation = None
+        self._lock = threading.Lock()
+
+    @property
+    def overview(self):
+        with self._lock:
+            if self._overview is None and self.table is not None:
+                df = self.table.frame(OVERVIEW_COLUMNS)
+                self._overview = OverviewAggregates.from_frame(df, self.nbins, self.top_n)
+            return self._overview
+
+    @property
+    def correlation(self):
+        with self._lock:
+            if self._correlation is None and self.table is not None:
+                self._correlation = CorrelationAccumulator.from_frame(self.table.frame(CORRELATION_COLUMNS))
+            return self._correlation
+
+    def load(self, data_dir):
+        table, size = super().load(data_dir)
+        return self.attach(table), size
+
+    def attach(self, table):
+        """
+        Serve aggregates for ``table``, dropping those of the previous one.
+
+        Args:
+            table (SharedTable): Milestones table
+
+        Returns:
+            SharedTable: ``table``
+        """
+        with self._lock:
+            self.table, self._overview, self._correlation = table, None, None
+        return table
+
+    def append(self, current, data, columns):
+        tail = parse_rows(self.name, data, columns)
+        with self._lock:
+            # Aggregates not built yet will include the tail when they are
+            if self._overview is not None:
+                overview = copy.deepcopy(self._overview)
+                overview.update(tail)
+                self._overview = overview
+            if self._correlation is not None:
+                correlation = copy.deepcopy(self._correlation)
+                correlation.update(tail)
+                self._correlation = correlation
+            current.append(tail)
+        return current
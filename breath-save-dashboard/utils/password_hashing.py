@@ -0,0 +1,170 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Cost presets. ``n`` is the scrypt CPU/memory cost (memory = 128 * n * r
+# bytes), ``iterations`` the PBKDF2 round count. Pick one for your hardware
+# with benchmarks/bench_password_hashing.py.
+COST_PRESETS = {
+    'low': {'algorithm': 'scrypt', 'n': 2 ** 12, 'r': 8, 'p': 1},
+    'default': {'algorithm': 'scrypt', 'n': 2 ** 14, 'r': 8, 'p': 1},
+    'high': {'algorithm': 'scrypt', 'n': 2 ** 15, 'r': 8, 'p': 1},
+    'pbkdf2': {'algorithm': 'pbkdf2_sha256', 'iterations': 600_000},
+}
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Verification runs on a bounded pool: at most MAX_WORKERS hashes execute at
+# once and at most MAX_PENDING logins wait, so a burst of logins cannot take
+# every core away from page rendering. hashlib's KDFs release the GIL.
+MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+MAX_PENDING = 64
+
+_params = dict(COST_PRESETS['default'])
+
+
+def configure(preset=None, **overrides):
+    """
+    Set the cost parameters used for new hashes.
+
+    Args:
+        preset (str): Name in COST_PRESETS
+        **overrides: Individual parameters (n, r, p, iterations, algorithm)
+
+    Returns:
+        dict: The active parameters
+    """
+    global _params
+    params = dict(COST_PRESETS[preset]) if preset else dict(_params)
+    params.update(overrides)
+    _params = params
+    return dict(_params)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def hash_password(password, params=None):
+    """
+    Hash a password with a per-user random salt.
+
+    Args:
+        password (str): Plain text password
+        params (dict): Cost parameters (default: the configured ones)
+
+    Returns:
+        str: Encoded hash, e.g. ``scrypt$16384$8$1$<salt>$<hash>``
+    """
+    params = params or _params
+    salt = os.urandom(SALT_BYTES)
+    if params['algorithm'] == 'scrypt':
+        digest = _scrypt(password, salt, params['n'], params['r'], params['p'])
+        return f"scrypt${params['n']}${params['r']}${params['p']}${_b64(salt)}${_b64(digest)}"
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, params['iterations'], HASH_BYTES)
+    return f"pbkdf2_sha256${params['iterations']}${_b64(salt)}${_b64(digest)}"
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def is_legacy_hash(stored):
+    """True for the original unsalted SHA-256 hex digests."""
+    return '$' not in stored and len(stored) == 64
+
+
+def verify_password(password, stored):
+    """
+    Check a password against any supported stored hash.
+
+    Args:
+        password (str): Plain text password
+        stored (str): Encoded hash (KDF format or legacy SHA-256 hex)
+
+    Returns:
+        bool: True if the password matches
+    """
+    if is_legacy_hash(stored):
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(candidate, stored)
+    parts = stored.split('$')
+    if parts[0] == 'scrypt' and len(parts) == 6:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        candidate = _scrypt(password, base64.b64decode(parts[4]), n, r, p)
+        return hmac.compare_digest(candidate, base64.b64decode(parts[5]))
+    if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+        candidate = hashlib.pbkdf2_hmac('sha256', password.encode(), base64.b64decode(parts[2]),
+                                        int(parts[1]), HASH_BYTES)
+        return hmac.compare_digest(candidate, base64.b64decode(parts[3]))
+    return False
+
+
+def needs_rehash(stored, params=None):
+    """
+    True if ``stored`` is legacy or was made with other cost parameters.
+
+    Args:
+        stored (str): Encoded hash
+        params (dict): Target parameters (default: the configured ones)
+
+    Returns:
+        bool: Whether to re-hash on the next successful login
+    """
+    params = params or _params
+    if is_legacy_hash(stored):
+        return True
+    parts = stored.split('$')
+    if params['algorithm'] == 'scrypt':
+        return parts[0] != 'scrypt' or parts[1:4] != [str(params['n']), str(params['r']), str(params['p'])]
+    return parts[0] != 'pbkdf2_sha256' or parts[1] != str(params['iterations'])
+
+
+class HashingPool:
+    """Bounded worker pool for password hashing and verification."""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING):
+        """
+        Args:
+            max_workers (int): Hashes computed concurrently
+            max_pending (int): Requests allowed to queue before callers block
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def _submit(self, fn, *args):
+        self._slots.acquire()
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def verify(self, password, stored, timeout=None):
+        """Verify on the pool and wait for the result."""
+        return self._submit(verify_password, password, stored).result(timeout)
+
+    def hash(self, password, timeout=None):
+        """Hash on the pool and wait for the result."""
+        return self._submit(hash_password, password).result(timeout)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """
+    Process-wide HashingPool, created on first use.
+
+    Returns:
+        HashingPool: Shared pool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool()
+    return _pool
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+# Auto mode: plot every row up to FULL_MAX_ROWS, sample up to SAMPLE_MAX_ROWS,
+# bin anything larger. MAX_POINTS bounds what a sampled chart sends.
+FULL_MAX_ROWS = 20_000
+SAMPLE_MAX_ROWS = 2_000_000
+MAX_POINTS = 20_000
+GRID_BINS = 32
+
+MODES = ('full', 'density', 'stratified', 'binned')
+
+
+def _grid_codes(values, bins):
+    """
+    Map each row to a cell of a regular grid spanning the data.
+
+    Args:
+        values (np.array): (rows, dims) numeric values
+        bins (int): Cells per dimension
+
+    Returns:
+        tuple: (codes, (lo, hi, width)) with one code per row and the grid
+            origin, upper bound and cell width per dimension
+    """
+    lo = values.min(axis=0)
+    hi = values.max(axis=0)
+    width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+    cells = np.minimum(((values - lo) / width).astype(np.int64), bins - 1)
+    codes = np.zeros(len(values), dtype=np.int64)
+    for dim in range(values.shape[1]):
+        codes = codes * bins + cells[:, dim]
+    return codes, (lo, hi, width)
+
+
+def _group_codes(values):
+    """Dense codes for a group column (hash-based, no sort of the rows)."""
+    codes, groups = pd.factorize(values, sort=True)
+    return np.asarray(groups), codes
+
+
+def _sample_groups(codes, quotas, counts, rng):
+    """Keep each row with probability quota / count of its group."""
+    keep_prob = np.divide(quotas, counts, out=np.zeros(len(counts)), where=counts > 0)
+    return rng.random(len(codes)) < keep_prob[codes]
+
+
+def density_sample(df, columns, max_points=MAX_POINTS, bins=GRID_BINS, random_state=0):
+    """
+    Sample rows so the point density of the chart matches the data.
+
+    Rows are bucketed on a grid over ``columns``; every occupied cell keeps
+    its share of ``max_points`` and at least one row, so dense regions keep
+    their shape and sparse regions (outliers) stay visible.
+
+    Args:
+        df (pd.DataFrame): Rows to plot
+        columns (list): Numeric columns on the chart axes
+        max_points (int): Target number of points
+        bins (int): Grid cells per axis
+        random_state (int): Seed, so reruns show the same sample
+
+    Returns:
+        pd.DataFrame: Sampled rows
+    """
+    if len(df) <= max_points:
+        return df
+    values = df[columns].to_numpy(dtype=float)
+    codes, _ = _grid_codes(values, bins)
+    counts = np.bincount(codes, minlength=bins ** len(columns))
+    quotas = np.maximum(1.0, counts * (max_points / len(df)))
+    # The first row of each occupied cell is always kept; the rest of the
+    # cell fills the remaining quota at random
+    mask = _sample_groups(codes, quotas - 1, counts - 1, np.random.default_rng(random_state))
+    mask[np.unique(codes, return_index=True)[1]] = True
+    return df[mask]
+
+
+def stratified_sample(df, by, max_points=MAX_POINTS, random_state=0):
+    """
+    Sample rows per group (e.g. per cluster) so small groups stay visible.
+
+    Each group keeps its proportional share of ``max_points`` but never
+    fewer than ``max_points / (2 * groups)`` rows (or all of its rows).
+
+    Args:
+        df (pd.DataFrame): Rows to plot
+        by (str): Group column
+        max_points (int): Target number of points
+        random_state (int): Seed, so reruns show the same sample
+
+    Returns:
+        pd.DataFrame: Sampled rows
+    """
+    if len(df) <= max_points:
+        return df
+    groups, codes = _group_codes(df[by].to_numpy())
+    counts = np.bincount(codes, minlength=len(groups))
+    floor = np.minimum(counts, max_points / (2 * len(groups)))
+    quotas = np.maximum(floor, counts * (max_points / len(df)))
+    mask = _sample_groups(codes, quotas, counts, np.random.default_rng(random_state))
+    return df[mask]
+
+
+def bin_aggregate(df, columns, by=None, bins=GRID_BINS):
+    """
+    Aggregate rows into grid cells (2D bins or 3D voxels).
+
+    Args:
+        df (pd.DataFrame): Rows to plot
+        columns (list): Numeric columns on the chart axes
+        by (str): Optional group column; each cell reports its most common group
+        bins (int): Cells per axis
+
+    Returns:
+        pd.DataFrame: One row per occupied cell with the cell centre in
+            ``columns``, ``count`` and (with ``by``) the dominant group
+    """
+    values = df[columns].to_numpy(dtype=float)
+    codes, (lo, _, width) = _grid_codes(values, bins)
+    counts = np.bincount(codes, minlength=bins ** len(columns))
+    occupied = np.flatnonzero(counts)
+
+    result = {}
+    remaining = occupied.copy()
+    for dim in reversed(range(len(columns))):
+        cell = remaining % bins
+        remaining //= bins
+        result[columns[dim]] = lo[dim] + (cell + 0.5) * width[dim]
+    result = pd.DataFrame({column: result[column] for column in columns})
+    result['count'] = counts[occupied]
+
+    if by is not None:
+        groups, group_codes = _group_codes(df[by].to_numpy())
+        by_cell = np.bincount(codes * len(groups) + group_codes,
+                              minlength=bins ** len(columns) * len(groups))
+        by_cell = by_cell.reshape(-1, len(groups))[occupied]
+        result[by] = groups[by_cell.argmax(axis=1)]
+    return result
+
+
+def choose_mode(rows, by=None):
+    """
+    Pick a reduction mode from the row count.
+
+    Args:
+        rows (int): Rows in the frame
+        by (str): Group column, if the chart is coloured by group
+
+    Returns:
+        str: One of MODES
+    """
+    if rows <= FULL_MAX_ROWS:
+        return 'full'
+    if rows <= SAMPLE_MAX_ROWS:
+        return 'stratified' if by is not None else 'density'
+    return 'binned'
+
+
+def reduce_plot_data(df, columns, by=None, mode='auto', max_points=MAX_POINTS, bins=GRID_BINS):
+    """
+    Reduce a frame to what a scatter chart needs to send to the browser.
+
+    Args:
+        df (pd.DataFrame): Rows to plot
+        columns (list): Numeric columns on the chart axes
+        by (str): Optional group column (e.g. cluster)
+        mode (str): 'auto' or one of MODES
+        max_points (int): Target number of points for the sampling modes
+        bins (int): Grid cells per axis for the sampling and binned modes
+
+    Returns:
+        tuple: (plot_df, info) where info has mode, rows, points and a
+            human-readable label for the chart
+    """
+    if mode == 'auto':
+        mode = choose_mode(len(df), by)
+    if mode == 'full':
+        plot_df = df
+    elif mode == 'density':
+        plot_df = density_sample(df, columns, max_points, bins)
+    elif mode == 'stratified':
+        if by is None:
+            raise ValueError("stratified sampling needs a group column")
+        plot_df = stratified_sample(df, by, max_points)
+    elif mode == 'binned':
+        plot_df = bin_aggregate(df, columns, by, bins)
+    else:
+        raise ValueError(f"Unknown plot reduction mode: {mode}")
+
+    rows, points = len(df), len(plot_df)
+    if mode == 'full' or points == rows and mode != 'binned':
+        label = f"all {rows:,} users"
+    elif mode == 'binned':
+        label = f"{rows:,} users binned into {points:,} cells (marker size = users)"
+    else:
+        detail = 'stratified by cluster' if mode == 'stratified' else 'density-preserving'
+        label = f"sampled: {points:,} of {rows:,} users ({detail})"
+    return plot_df, {'mode': mode, 'rows': rows, 'points': points, 'label': label}
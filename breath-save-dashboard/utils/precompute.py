@@ -0,0 +1,436 @@
+import collections
+import copy
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ml_models.registry import get_registry
+from utils.data_access import PAGE_COLUMNS
+from utils.overview_aggregates import OVERVIEW_COLUMNS, OverviewAggregates
+from utils.streaming_correlation import CORRELATION_COLUMNS, CorrelationAccumulator
+
+# Seconds between checks of the data files by the watcher thread
+DEFAULT_INTERVAL = 5.0
+DEFAULT_WORKERS = 2
+# Finished jobs kept for status reports
+HISTORY = 50
+# Seconds before a failed job is resubmitted, doubling per failure up to the cap
+RETRY_BACKOFF = 5.0
+RETRY_BACKOFF_MAX = 300.0
+# Jobs rebuilt at most once per this many seconds; pages keep the newest
+# result meanwhile. The sweep fits K-Means 35 times, too often for every append
+MIN_INTERVALS = {'segmentation_sweep': 30 * 60.0}
+
+
+def _appended_rows(previous, frame):
+    """
+    Rows of ``frame`` the previous result already covers, if only rows were appended since.
+
+    Table versions are ``<store signature>+<rows>`` (SharedTable.version), so
+    the same signature with more rows means the old rows are unchanged.
+
+    Returns:
+        int: Rows covered by ``previous``, or None if it must be rebuilt
+    """
+    if previous is None:
+        return None
+    signature, rows = previous.version.rsplit('+', 1)
+    current, _ = frame.attrs['version'].rsplit('+', 1)
+    return int(rows) if signature == current and int(rows) <= len(frame) else None
+
+
+def _overview(frame, loader, registry, inputs):
+    covered = _appended_rows(inputs['previous'], frame)
+    if covered is None:
+        return OverviewAggregates.from_frame(frame, loader.nbins, loader.top_n)
+    # Published values are never modified; update a copy with the new rows only
+    overview = copy.deepcopy(inputs['previous'].value)
+    overview.update(frame.iloc[covered:])
+    return overview
+
+
+def _correlation(frame, loader, registry, inputs):
+    covered = _appended_rows(inputs['previous'], frame)
+    if covered is None:
+        return CorrelationAccumulator.from_frame(frame)
+    correlation = copy.deepcopy(inputs['previous'].value)
+    correlation.update(frame.iloc[covered:])
+    return correlation
+
+
+def _segmentation(frame, loader, registry, inputs):
+    # Model modules import sklearn; load them on the worker thread, not at startup
+    from ml_models.clustering import UserSegmentationModel
+
+    model = UserSegmentationModel(n_clusters=3)
+    clusters = model.fit_predict_cached(frame, registry)
+    return {'model': model, 'clusters': clusters}
+
+
+def _segmentation_sweep(frame, loader, registry, inputs):
+    from ml_models.clustering import SegmentationSweep
+
+    # Leave a CPU for serving pages; with one CPU the sweep runs on this thread
+    workers = max(1, (os.cpu_count() or 1) - 1)
+    return SegmentationSweep(max_workers=workers).fit_cached(frame, registry)
+
+
+def _cluster_stats(frame, loader, registry, inputs):
+    segmentation = inputs['segmentation']
+    return segmentation['model'].get_cluster_stats(frame, segmentation['clusters'])
+
+
+def _prediction(frame, loader, registry, inputs):
+    from ml_models.regression import get_prediction_table
+
+    return get_prediction_table(frame, registry)
+
+
+def _forecast(frame, loader, registry, inputs):
+    from ml_models.forecasting import GoalForecaster
+
+    return GoalForecaster.from_prediction(inputs['prediction']).forecast(frame)
+
+
+# name -> (function, milestones columns it reads or None, jobs it needs first).
+# Functions get a snapshot frame of the columns, the MilestonesLoader, the
+# model registry and the published values of the jobs they need, plus
+# ``previous``: the job's own newest PublishedResult (or None).
+PRECOMPUTE_JOBS = {
+    'overview': (_overview, OVERVIEW_COLUMNS, ()),
+    'correlation': (_correlation, CORRELATION_COLUMNS, ()),
+    'segmentation': (_segmentation, PAGE_COLUMNS['analytics']['milestones'], ()),
+    'cluster_stats': (_cluster_stats, PAGE_COLUMNS['analytics']['milestones'], ('segmentation',)),
+    'segmentation_sweep': (_segmentation_sweep, PAGE_COLUMNS['analytics']['milestones'], ()),
+    'prediction': (_prediction, PAGE_COLUMNS['predictions']['milestones'], ()),
+    'forecast': (_forecast, PAGE_COLUMNS['predictions']['milestones'], ('prediction',)),
+}
+
+
+def failure_message(what, failure):
+    """
+    Text for a job that failed for the current version (see PrecomputeScheduler.failures).
+
+    Args:
+        what (str): What the job does, e.g. "Fitting the savings model"
+        failure (dict): The job's entry in PrecomputeScheduler.failures
+
+    Returns:
+        str: Message naming the error and when the job is retried
+    """
+    return (f"{what} failed ({failure['attempts']} attempt(s)): {failure['error']}. "
+            f"Retrying in {failure['retry_in_s']:.0f}s.")
+
+
+class JobStatus:
+    """One run of a precompute job for one milestones version."""
+
+    def __init__(self, name, version, sequence):
+        self.name = name
+        self.version = version
+        self.sequence = sequence
+        self.state = 'queued'
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+
+    @property
+    def duration(self):
+        """Seconds spent running (so far, if still running)."""
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        return {
+            'job': self.name,
+            'version': self.version,
+            'state': self.state,
+            'queued_s': (self.started or time.time()) - self.submitted,
+            'duration_s': self.duration,
+            'error': self.error,
+        }
+
+
+class PublishedResult:
+    """A job's value together with the milestones version it was built from."""
+
+    def __init__(self, name, version, sequence, value, duration):
+        self.name = name
+        self.version = version
+        self.sequence = sequence
+        self.value = value
+        self.duration = duration
+        self.published_at = time.time()
+
+
+class PrecomputeScheduler:
+    """
+    Rebuilds models and aggregates in the background when the data changes.
+
+    A watcher thread checks the milestones table through the table cache
+    every ``interval`` seconds (pages can also call ``check``). For each new
+    table version it takes a snapshot of the columns every job reads and
+    runs the jobs in PRECOMPUTE_JOBS on a thread pool; a job that needs
+    another one's result (cluster_stats after segmentation, forecast after
+    prediction) is submitted when that result is published for the same
+    version. The Overview aggregates and the correlation accumulator are
+    updated from a copy of their previous result when rows were only
+    appended. A job that raises is resubmitted for the same version on a
+    later check, after a delay that doubles with each failure. Jobs in
+    MIN_INTERVALS are submitted for a new version only if they were last
+    submitted at least that long ago, otherwise on the first check after.
+
+    Results are published by replacing one dictionary entry, so a page
+    reading ``latest`` gets a complete result for some version, never a
+    partial one, and never waits for a fit. A result is only replaced by
+    one built from newer data. Submitting a job that is already queued or
+    running for the same version returns the existing job instead, and
+    fits themselves go through the model registry, so workers sharing it
+    reuse each other's models.
+    """
+
+    def __init__(self, cache, registry=None, max_workers=DEFAULT_WORKERS, interval=DEFAULT_INTERVAL):
+        """
+        Args:
+            cache (TableCache): Table cache with a MilestonesLoader (or SharedDatasets)
+            registry (ModelRegistry): Registry for fitted models (default: process-wide)
+            max_workers (int): Jobs run concurrently
+            interval (float): Seconds between checks of the data files
+        """
+        self.cache = cache
+        self.registry = registry or get_registry()
+        self.interval = interval
+        self.version = None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='precompute')
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._snapshots = {}
+        self._published = {}
+        self._active = {}
+        self._failures = {}
+        self._last_submitted = {}
+        self._history = collections.deque(maxlen=HISTORY)
+        self.counters = {'submitted': 0, 'deduplicated': 0, 'succeeded': 0, 'failed': 0, 'retried': 0}
+        self._durations = {name: [] for name in PRECOMPUTE_JOBS}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the watcher thread.
+
+        Returns:
+            PrecomputeScheduler: self
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='precompute-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        """Stop watching and shut the pool down."""
+        self._stop.set()
+        if self._thread is not None and wait:
+            self._thread.join()
+        self._pool.shutdown(wait=wait)
+
+    def _watch(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except FileNotFoundError:
+                pass  # No data yet; check again later
+            self._stop.wait(self.interval)
+
+    def check(self):
+        """
+        Submit rebuilds if the milestones table changed since the last check,
+        resubmit failed jobs whose retry delay has passed and submit
+        rate-limited jobs whose interval has passed.
+
+        Returns:
+            str: Current milestones version
+        """
+        table = self.cache.get('milestones')
+        with self._lock:
+            if table.version == self.version:
+                now = time.time()
+                due = [name for name, failure in self._failures.items() if failure['retry_at'] <= now]
+                due += [name for name in MIN_INTERVALS
+                          if name not in self._failures and not self._is_published(name, self.version)
+                          and not self._throttled(name, now)]
+                version = self.version
+            else:
+                due = None
+        if due is not None:
+            for name in due:
+                self.submit(name, version)
+            return version
+        with self._lock:
+            # One snapshot per version; rows appended later don't leak into jobs
+            frames = {}
+            for name, (_, columns, _) in PRECOMPUTE_JOBS.items():
+                if columns is not None and tuple(columns) not in frames:
+                    frames[tuple(columns)] = table.frame(columns)
+            version = next(iter(frames.values())).attrs['version'] if frames else table.version
+            self.version = version
+            self._snapshots = {version: (next(self._sequence), frames)}
+            self._failures = {}
+            now = time.time()
+            names = [name for name, (_, _, requires) in PRECOMPUTE_JOBS.items()
+                     if not requires and not self._throttled(name, now)]
+        for name in names:
+            self.submit(name, version)
+        return version
+
+    def _throttled(self, name, now):
+        """True if ``name`` is rate-limited and was last submitted within its interval."""
+        last = self._last_submitted.get(name)
+        return name in MIN_INTERVALS and last is not None and now - last < MIN_INTERVALS[name]
+
+    def submit(self, name, version):
+        """
+        Queue ``name`` for ``version`` unless it is queued, running or done.
+
+        Args:
+            name (str): Job name in PRECOMPUTE_JOBS
+            version (str): Milestones version (must be the latest checked)
+
+        Returns:
+            JobStatus: The queued or already active job, or None if the
+            version is superseded, its result is already published or a job
+            it needs has not published a result for it yet
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(version)
+            published = self._published.get(name)
+            active = self._active.get((name, version))
+            if active is not None or (published is not None and published.version == version):
+                self.counters['deduplicated'] += 1
+                return active
+            requires = PRECOMPUTE_JOBS[name][2]
+            if snapshot is None or not all(self._is_published(need, version) for need in requires):
+                return None
+            inputs = {need: self._published[need].value for need in requires}
+            inputs['previous'] = published
+            job = JobStatus(name, version, snapshot[0])
+            self._active[(name, version)] = job
+            self._history.append(job)
+            self.counters['submitted'] += 1
+            self._last_submitted[name] = job.submitted
+            if name in self._failures:
+                self.counters['retried'] += 1
+        self._pool.submit(self._run, job, snapshot[1], inputs)
+        return job
+
+    def _run(self, job, frames, inputs):
+        function, columns, _ = PRECOMPUTE_JOBS[job.name]
+        job.state, job.started = 'running', time.time()
+        try:
+            frame = None if columns is None else frames[tuple(columns)]
+            value = function(frame, self.cache.loaders['milestones'], self.registry, inputs)
+        except Exception as e:
+            job.state, job.finished, job.error = 'failed', time.time(), repr(e)
+            with self._lock:
+                self.counters['failed'] += 1
+                del self._active[(job.name, job.version)]
+                if job.version == self.version:
+                    attempts = self._failures.get(job.name, {}).get('attempts', 0) + 1
+                    delay = min(RETRY_BACKOFF * 2 ** (attempts - 1), RETRY_BACKOFF_MAX)
+                    self._failures[job.name] = {'version': job.version, 'attempts': attempts, 'error': job.error,
+                                                'retry_at': job.finished + delay}
+            return
+        job.state, job.finished = 'done', time.time()
+        with self._lock:
+            current = self._published.get(job.name)
+            if current is None or current.sequence < job.sequence:
+                self._published[job.name] = PublishedResult(job.name, job.version, job.sequence, value, job.duration)
+            self.counters['succeeded'] += 1
+            self._durations[job.name] = (self._durations[job.name] + [job.duration])[-HISTORY:]
+            del self._active[(job.name, job.version)]
+            if job.version == self.version:
+                self._failures.pop(job.name, None)
+        for name, (_, _, needs) in PRECOMPUTE_JOBS.items():
+            if job.name in needs:
+                self.submit(name, job.version)
+
+    def _is_published(self, name, version):
+        published = self._published.get(name)
+        return published is not None and published.version == version
+
+    def latest(self, name):
+        """
+        Newest published result of a job, whatever version it was built from.
+
+        Args:
+            name (str): Job name in PRECOMPUTE_JOBS
+
+        Returns:
+            PublishedResult: Result (see ``.version`` and ``.value``), or None
+            if the job has not finished yet
+        """
+        return self._published.get(name)
+
+    def failures(self):
+        """
+        Jobs whose last run for the current version failed.
+
+        Returns:
+            dict: Job name -> ``attempts``, ``error`` (repr of the exception)
+            and ``retry_in_s`` (seconds until the next check may resubmit it)
+        """
+        with self._lock:
+            now = time.time()
+            return {name: {'attempts': failure['attempts'], 'error': failure['error'],
+                           'retry_in_s': max(0.0, failure['retry_at'] - now)}
+                    for name, failure in self._failures.items()}
+
+    def wait(self, timeout=None):
+        """
+        Block until no job is queued or running (for scripts and benchmarks).
+
+        Args:
+            timeout (float): Give up after this many seconds
+
+        Returns:
+            bool: True if idle
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._active:
+                    return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def status(self):
+        """
+        Job states and duration metrics.
+
+        Returns:
+            dict: ``version`` being served, ``counters``, ``jobs`` (recent
+            runs, newest first), ``durations`` (per job: runs, last, mean and
+            max seconds), ``published`` (per job: version and age) and
+            ``failures`` (see ``failures``)
+        """
+        failures = self.failures()
+        with self._lock:
+            now = time.time()
+            return {
+                'version': self.version,
+                'counters': dict(self.counters),
+                'jobs': [job.to_dict() for job in reversed(self._history)],
+                'durations': {
+                    name: {'runs': len(samples), 'last_s': samples[-1], 'mean_s': sum(samples) / len(samples),
+                           'max_s': max(samples)}
+                    for name, samples in self._durations.items() if samples
+                },
+                'published': {name: {'version': result.version, 'age_s': now - result.published_at}
+                              for name, result in self._published.items()},
+                'failures': failures,
+            }
@@ -0,0 +1,383 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.columnar_store import load_arrays, open_generation, parse_rows, source_size
+
+INDEX_COLUMNS = ['reward_id', 'user_id', 'reward_type', 'points_cost', 'redemption_status']
+
+
+class RewardsIndex:
+    """
+    Counters and per-user totals over the rewards wallet.
+
+    Users, reward types and statuses are mapped to dense integer codes.
+    Each wallet row keeps only its codes and point cost; counters by status,
+    by type and status, and per-user point and redemption totals by status
+    are maintained alongside, so the Rewards page reads small arrays and a
+    status change touches a fixed number of counters.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.user_index = pd.Index([], dtype=object)
+        self.type_index = pd.Index([], dtype=object)
+        self.status_index = pd.Index([], dtype=object)
+        self.rows = 0
+        # Per wallet row (capacity grows geometrically; first ``rows`` are used)
+        self.row_user = np.zeros(0, dtype=np.int32)
+        self.row_type = np.zeros(0, dtype=np.int16)
+        self.row_status = np.zeros(0, dtype=np.int8)
+        self.row_cost = np.zeros(0, dtype=np.int32)
+        # Counters
+        self.type_status = np.zeros((0, 0), dtype=np.int64)     # type, status
+        self.user_points = np.zeros((0, 0), dtype=np.int64)     # user, status
+        self.user_rewards = np.zeros((0, 0), dtype=np.int32)    # user, status
+        self._reward_ids = []
+        self._id_lookup = None
+        self._leaderboards = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, data_dir='data', generation=None):
+        """
+        Build the index from the columnar wallet store.
+
+        Args:
+            data_dir (str): Directory holding the CSV files
+            generation (tuple): Optional (generation_dir, schema) to read
+                instead of the one for the current CSV
+
+        Returns:
+            RewardsIndex: Index over every row
+        """
+        arrays = load_arrays('rewards', data_dir, INDEX_COLUMNS, generation)
+        reward_ids = arrays.pop('reward_id')
+        index = cls()
+        index.update(pd.DataFrame(arrays, copy=False), reward_ids)
+        return index
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Rebuild an index from to_arrays output (e.g. memory-mapped files).
+
+        Arrays are used as given; with read-only arrays the index can be
+        read but not changed.
+
+        Args:
+            arrays (dict): Name -> np.array, as returned by to_arrays
+
+        Returns:
+            RewardsIndex: Index over the exported rows
+        """
+        index = cls()
+        index.user_index = pd.Index(arrays['user_index'])
+        index.type_index = pd.Index(arrays['type_index'])
+        index.status_index = pd.Index(arrays['status_index'])
+        index.rows = len(arrays['row_user'])
+        for name in ('row_user', 'row_type', 'row_status', 'row_cost',
+                     'type_status', 'user_points', 'user_rewards'):
+            setattr(index, name, arrays[name])
+        index._reward_ids = [arrays['reward_ids']]
+        index._id_lookup = (arrays['id_hashes'], arrays['id_order'])
+        return index
+
+    def to_arrays(self):
+        """
+        Export the index as plain arrays, including the reward id lookup.
+
+        Returns:
+            dict: Name -> np.array, trimmed to the used rows and users
+        """
+        with self._lock:
+            hashes, order = self._lookup_table()
+            n = self.n_users
+            return {
+                'user_index': np.asarray(self.user_index, dtype=str),
+                'type_index': np.asarray(self.type_index, dtype=str),
+                'status_index': np.asarray(self.status_index, dtype=str),
+                'row_user': self.row_user[:self.rows],
+                'row_type': self.row_type[:self.rows],
+                'row_status': self.row_status[:self.rows],
+                'row_cost': self.row_cost[:self.rows],
+                'type_status': self.type_status,
+                'user_points': self.user_points[:n],
+                'user_rewards': self.user_rewards[:n],
+                'reward_ids': np.concatenate([np.asarray(ids, dtype=str) for ids in self._reward_ids])
+                if self._reward_ids else np.zeros(0, dtype=str),
+                'id_hashes': hashes,
+                'id_order': order,
+            }
+
+    @property
+    def n_users(self):
+        return len(self.user_index)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index (excluding the reward id lookup)."""
+        arrays = (self.row_user, self.row_type, self.row_status, self.row_cost,
+                  self.type_status, self.user_points, self.user_rewards)
+        return sum(a.nbytes for a in arrays) + self.user_index.memory_usage(deep=True) + 32 * self.n_users
+
+    def _encode(self, values, attr):
+        """Map values to dense codes, registering unseen labels on ``attr``."""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Store columns arrive as categoricals: map the categories only, in
+            # order of first appearance so label order matches the factorized path
+            codes = np.asarray(values.cat.codes)
+            seen = pd.unique(codes[codes >= 0])
+            remap = np.full(len(values.cat.categories) + 1, -1, dtype=np.int64)
+            remap[seen] = np.arange(len(seen))
+            codes = remap[codes]
+            uniques = pd.Index(np.asarray(values.cat.categories, dtype=object)[seen])
+        else:
+            codes, uniques = pd.factorize(values)
+            uniques = pd.Index(np.asarray(uniques, dtype=object))
+        index = getattr(self, attr)
+        mapping = index.get_indexer(uniques)
+        missing = mapping < 0
+        if missing.any():
+            mapping[missing] = np.arange(len(index), len(index) + missing.sum())
+            setattr(self, attr, index.append(uniques[missing]))
+        return mapping[codes]
+
+    def _reserve(self, rows):
+        """Grow row and counter arrays to fit ``rows`` rows and every known label."""
+        if rows > len(self.row_user):
+            capacity = max(rows, 2 * len(self.row_user), 1024)
+            for attr in ('row_user', 'row_type', 'row_status', 'row_cost'):
+                current = getattr(self, attr)
+                grown = np.zeros(capacity, dtype=current.dtype)
+                grown[:self.rows] = current[:self.rows]
+                setattr(self, attr, grown)
+        n_status = len(self.status_index)
+        self.type_status = _grow(self.type_status, len(self.type_index), n_status, exact=True)
+        self.user_points = _grow(self.user_points, self.n_users, n_status)
+        self.user_rewards = _grow(self.user_rewards, self.n_users, n_status)
+
+    def update(self, df, reward_ids=None):
+        """
+        Add wallet rows.
+
+        Args:
+            df (pd.DataFrame): Rows with INDEX_COLUMNS (typed, from the store or parse_rows)
+            reward_ids (np.array): Reward ids, when passed separately from ``df``
+        """
+        reward_ids = df['reward_id'].to_numpy() if reward_ids is None else reward_ids
+        valid = (df['user_id'].notna() & df['reward_type'].notna() & df['redemption_status'].notna()).to_numpy()
+        if not valid.all():
+            df, reward_ids = df[valid], reward_ids[valid]
+        if df.empty:
+            return
+        with self._lock:
+            user = self._encode(df['user_id'], 'user_index')
+            kind = self._encode(df['reward_type'], 'type_index')
+            status = self._encode(df['redemption_status'], 'status_index')
+            cost = df['points_cost'].fillna(0).to_numpy(dtype=np.int64)
+            start, stop = self.rows, self.rows + len(df)
+            self._reserve(stop)
+            self.row_user[start:stop] = user
+            self.row_type[start:stop] = kind
+            self.row_status[start:stop] = status
+            self.row_cost[start:stop] = cost
+
+            n_status = self.type_status.shape[1]
+            self.type_status += np.bincount(kind * n_status + status, minlength=self.type_status.size) \
+                .reshape(self.type_status.shape)
+            flat = user * n_status + status
+            self.user_points.reshape(-1)[:self.n_users * n_status] += np.bincount(
+                flat, weights=cost, minlength=self.n_users * n_status).astype(np.int64)
+            self.user_rewards.reshape(-1)[:self.n_users * n_status] += np.bincount(
+                flat, minlength=self.n_users * n_status).astype(np.int32)
+
+            self._reward_ids.append(reward_ids)
+            self._id_lookup = None
+            self._leaderboards.clear()
+            self.rows = stop
+
+    def _lookup_table(self):
+        if self._id_lookup is None:
+            # Built on the first status change only; pages never need it.
+            # Sorted 64-bit hashes of the ids plus row numbers: 16 bytes per
+            # row, no Python string per row.
+            hashes = np.concatenate([_hash_ids(ids) for ids in self._reward_ids]) \
+                if self._reward_ids else np.zeros(0, dtype=np.uint64)
+            order = np.argsort(hashes, kind='stable')
+            self._id_lookup = (hashes[order], order)
+        return self._id_lookup
+
+    def _row(self, reward_id):
+        hashes, order = self._lookup_table()
+        target = _hash_ids(np.array([reward_id]))[0]
+        lo, hi = np.searchsorted(hashes, target, 'left'), np.searchsorted(hashes, target, 'right')
+        # Latest row first: a re-issued id refers to its latest wallet row
+        for row in order[lo:hi][::-1]:
+            if self._reward_id_at(row) == reward_id:
+                return row
+        raise KeyError(reward_id)
+
+    def _reward_id_at(self, row):
+        for ids in self._reward_ids:
+            if row < len(ids):
+                return str(ids[row])
+            row -= len(ids)
+        raise IndexError(row)
+
+    def set_status(self, reward_id, status):
+        """
+        Move one redemption to another status.
+
+        The row is found by binary search over hashed reward ids; the change
+        itself touches a fixed number of counters.
+
+        Args:
+            reward_id (str): Wallet row to change
+            status (str): New redemption status (e.g. 'redeemed')
+
+        Raises:
+            KeyError: If the reward id is not in the wallet
+        """
+        with self._lock:
+            row = self._row(reward_id)
+            if status in self.status_index:
+                new = self.status_index.get_loc(status)
+            else:
+                new = self._encode(pd.Series([status]), 'status_index')[0]
+                self._reserve(self.rows)
+            old = self.row_status[row]
+            if old == new:
+                return
+            user, kind, cost = self.row_user[row], self.row_type[row], self.row_cost[row]
+            self.type_status[kind, old] -= 1
+            self.type_status[kind, new] += 1
+            self.user_points[user, old] -= cost
+            self.user_points[user, new] += cost
+            self.user_rewards[user, old] -= 1
+            self.user_rewards[user, new] += 1
+            self.row_status[row] = new
+            self._leaderboards.clear()
+
+    def status_counts(self):
+        """
+        Wallet rows per redemption status.
+
+        Returns:
+            pd.Series: Counts indexed by status
+        """
+        with self._lock:
+            return pd.Series(self.type_status.sum(axis=0), index=self.status_index.copy(),
+                             name='count', dtype=np.int64)
+
+    def status_count(self, status):
+        """Wallet rows with ``status`` (0 if the status never occurs)."""
+        counts = self.status_counts()
+        return int(counts.get(status, 0))
+
+    def type_counts(self):
+        """
+        Wallet rows per reward type, most common first.
+
+        Returns:
+            pd.Series: Counts indexed by reward type
+        """
+        with self._lock:
+            counts = pd.Series(self.type_status.sum(axis=1), index=self.type_index.copy(),
+                               name='count', dtype=np.int64)
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def user_totals(self):
+        """
+        Per-user points and reward counts by status.
+
+        Returns:
+            pd.DataFrame: One row per user with ``points_<status>`` and
+                ``rewards_<status>`` columns
+        """
+        with self._lock:
+            n = self.n_users
+            data = {'user_id': np.asarray(self.user_index)}
+            for code, status in enumerate(self.status_index):
+                data[f"points_{status}"] = self.user_points[:n, code]
+                data[f"rewards_{status}"] = self.user_rewards[:n, code]
+            return pd.DataFrame(data)
+
+    def leaderboard(self, n=10, status='redeemed'):
+        """
+        Users with the most points in ``status``, largest first.
+
+        Sorted once per index version; repeated renders reuse the result.
+
+        Args:
+            n (int): Number of users
+            status (str): Redemption status to rank by
+
+        Returns:
+            pd.DataFrame: user_id, points and rewards for the top ``n`` users
+        """
+        with self._lock:
+            key = (n, status)
+            if key not in self._leaderboards:
+                self._leaderboards[key] = self._rank(n, status)
+            return self._leaderboards[key]
+
+    def _rank(self, n, status):
+        columns = ['user_id', 'points', 'rewards']
+        code = self.status_index.get_indexer([status])[0]
+        if code < 0 or self.n_users == 0:
+            return pd.DataFrame(columns=columns)
+        points = self.user_points[:self.n_users, code]
+        top = np.arange(len(points))
+        if len(points) > n:
+            # Keep everything tied with the n-th largest so ties resolve by order below
+            kth = np.partition(points, len(points) - n)[len(points) - n]
+            top = np.flatnonzero(points >= kth)
+        # Points descending, ties by first appearance in the wallet
+        top = top[np.lexsort((top, -points[top]))][:n]
+        return pd.DataFrame({
+            'user_id': np.asarray(self.user_index)[top],
+            'points': points[top],
+            'rewards': self.user_rewards[top, code],
+        }, columns=columns)
+
+
+def _hash_ids(ids):
+    """64-bit FNV-1a hash of each id, computed column-wise over code points."""
+    ids = np.asarray(ids)
+    if ids.dtype.kind != 'U':
+        ids = ids.astype(str)
+    hashes = np.full(len(ids), 0xcbf29ce484222325, dtype=np.uint64)
+    if len(ids) == 0 or ids.dtype.itemsize == 0:
+        return hashes
+    points = ids.view(np.uint32).reshape(len(ids), -1)
+    prime = np.uint64(0x100000001b3)
+    for column in range(points.shape[1]):
+        chars = points[:, column].astype(np.uint64)
+        # Padding (code point 0) is skipped so ids hash alike at any width
+        hashes = np.where(chars != 0, (hashes ^ chars) * prime, hashes)
+    return hashes
+
+
+def _grow(array, rows, cols, exact=False):
+    """Pad a 2-D counter array to at least ``rows`` x ``cols``."""
+    if rows <= array.shape[0] and cols <= array.shape[1]:
+        return array
+    capacity = rows if exact else max(rows, 2 * array.shape[0], 1024)
+    capacity = max(capacity, array.shape[0])
+    grown = np.zeros((capacity, max(cols, array.shape[1])), dtype=array.dtype)
+    grown[:array.shape[0], :array.shape[1]] = array
+    return grown
+
+
+class RewardsIndexLoader:
+    """TableCache loader that keeps a RewardsIndex instead of the wallet rows."""
+
+    def load(self, data_dir):
+        generation = open_generation('rewards', data_dir)
+        return RewardsIndex.from_store(data_dir, generation), source_size(generation[1])
+
+    def append(self, current, data, columns):
+        current.update(parse_rows('rewards', data, columns))
+        return current
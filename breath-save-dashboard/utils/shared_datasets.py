@@ -0,0 +1,349 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from utils.columnar_store import open_generation
+from utils.data_access import SharedTable
+from utils.data_cache import TableCache
+from utils.notification_rollups import NotificationRollup, NotificationRollupLoader
+from utils.overview_aggregates import MilestonesLoader
+from utils.rewards_index import RewardsIndex, RewardsIndexLoader
+
+# Set in a dashboard worker's environment to attach to published datasets
+# instead of loading the CSVs in every process
+SHARED_DIR_ENV = 'BREATHSAVE_SHARED_DIR'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+SUPERSEDED_FILE = 'superseded'
+TMP_PREFIX = '.tmp-'
+# Tables published as arrays; milestones are served from the store generation's
+# column files, linked into each version
+ARRAY_TABLES = {'notifications': NotificationRollup, 'rewards': RewardsIndex}
+# Superseded versions are kept this long for workers still switching over
+DEFAULT_GRACE_SECONDS = 60
+ATTACH_ATTEMPTS = 3
+
+
+def default_root(data_dir='data'):
+    return os.path.join(data_dir, '.shared')
+
+
+def _link_generation(generation_dir, schema, target):
+    """
+    Hard-link a store generation's column files into ``target``.
+
+    The store removes superseded generations on its own schedule; linking
+    keeps the files alive as long as the version directory, whose grace
+    period the publisher controls. Falls back to copying where links are
+    not possible (e.g. another filesystem).
+    """
+    os.makedirs(target)
+    files = [f"{spec['name']}.npy" for spec in schema['columns']]
+    files += [spec['lookup'] for spec in schema['columns'] if 'lookup' in spec]
+    for entry in files:
+        source = os.path.join(generation_dir, entry)
+        try:
+            os.link(source, os.path.join(target, entry))
+        except OSError:
+            shutil.copyfile(source, os.path.join(target, entry))
+
+
+def read_current(root):
+    """
+    The version the publisher last switched to.
+
+    Args:
+        root (str): Directory datasets are published in
+
+    Returns:
+        str: Version directory name, or None if nothing was published
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class DatasetPublisher:
+    """
+    Loads the tables once and publishes them for dashboard worker processes.
+
+    Each refresh checks the CSVs through a TableCache. When any table
+    changed, a new version directory is written under ``root``: the wallet
+    index and notification rollups as ``.npy`` arrays, hard links to the
+    column files of the milestones store generation, and a manifest. The
+    directory is completed under a
+    temporary name, renamed into place and only then made current by
+    atomically replacing the CURRENT pointer, so a worker never sees a
+    partial version. Superseded versions are removed after a grace period.
+    """
+
+    def __init__(self, data_dir='data', root=None, grace_seconds=DEFAULT_GRACE_SECONDS):
+        """
+        Args:
+            data_dir (str): Directory holding the CSV files
+            root (str): Directory to publish into (default: data_dir/.shared)
+            grace_seconds (float): How long superseded versions are kept
+        """
+        self.data_dir = data_dir
+        self.root = root or default_root(data_dir)
+        self.grace_seconds = grace_seconds
+        self.cache = TableCache(data_dir, loaders={
+            'notifications': NotificationRollupLoader(),
+            'rewards': RewardsIndexLoader(),
+        })
+        self._tokens = None
+
+    def refresh(self):
+        """
+        Publish a new version if any table changed since the last one.
+
+        Returns:
+            str: The new version, or None if nothing changed
+        """
+        values = {name: self.cache.get(name) for name in ARRAY_TABLES}
+        generation = open_generation('milestones', self.data_dir)
+        # A reload shows up as a miss, an append as a change in row count
+        tokens = {name: (self.cache.table_counters[name]['misses'], value.rows) for name, value in values.items()}
+        tokens['milestones'] = generation[1]['signature']
+        if tokens == self._tokens and read_current(self.root) is not None:
+            self.cleanup()
+            return None
+        version = self.publish(values, generation)
+        self._tokens = tokens
+        return version
+
+    def publish(self, values, generation):
+        """
+        Write a version directory and make it current.
+
+        Args:
+            values (dict): Table name -> RewardsIndex or NotificationRollup
+            generation (tuple): (generation_dir, schema) of the milestones store
+
+        Returns:
+            str: The published version
+        """
+        os.makedirs(self.root, exist_ok=True)
+        version = f"{time.time_ns():x}-{os.getpid()}"
+        tmp_dir = os.path.join(self.root, TMP_PREFIX + version)
+        generation_dir, schema = generation
+        _link_generation(generation_dir, schema, os.path.join(tmp_dir, 'milestones'))
+        manifest = {'version': version, 'created': time.time(), 'tables': {
+            'milestones': {'schema': schema, 'rows': schema['rows']},
+        }}
+        for name, value in values.items():
+            arrays = value.to_arrays()
+            os.makedirs(os.path.join(tmp_dir, name))
+            for key, array in arrays.items():
+                np.save(os.path.join(tmp_dir, name, f"{key}.npy"), array)
+            manifest['tables'][name] = {'arrays': sorted(arrays), 'rows': int(value.rows)}
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f)
+        os.rename(tmp_dir, os.path.join(self.root, version))
+
+        previous = read_current(self.root)
+        pointer_tmp = os.path.join(self.root, f"{TMP_PREFIX}{CURRENT_FILE}-{os.getpid()}")
+        with open(pointer_tmp, 'w') as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(self.root, CURRENT_FILE))
+        if previous is not None and os.path.isdir(os.path.join(self.root, previous)):
+            # Starts the grace period of the version workers are leaving
+            open(os.path.join(self.root, previous, SUPERSEDED_FILE), 'w').close()
+        self.cleanup()
+        return version
+
+    def cleanup(self, now=None):
+        """
+        Remove superseded versions and abandoned temporary directories.
+
+        Workers map the files of the version they attached to, so removing
+        a directory does not affect them (on Linux the data stays readable
+        until unmapped); the grace period only covers workers that read the
+        pointer but have not mapped the files yet.
+
+        Args:
+            now (float): Current time (default: time.time())
+
+        Returns:
+            list: Removed directory names
+        """
+        now = time.time() if now is None else now
+        current = read_current(self.root)
+        removed = []
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if entry == current or not os.path.isdir(path):
+                continue
+            marker = os.path.join(path, SUPERSEDED_FILE)
+            # Versions without a marker were never made current (crashed publisher)
+            since = os.path.getmtime(marker) if os.path.exists(marker) else os.path.getmtime(path)
+            if now - since >= self.grace_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(entry)
+        return removed
+
+    def serve(self, interval=5.0):
+        """
+        Refresh every ``interval`` seconds until interrupted.
+
+        Args:
+            interval (float): Seconds between checks of the CSV files
+        """
+        while True:
+            try:
+                version = self.refresh()
+                if version is not None:
+                    print(f"published {version}", flush=True)
+            except FileNotFoundError as e:
+                print(f"waiting for data files: {e}", flush=True)
+            time.sleep(interval)
+
+
+class SharedDatasets:
+    """
+    Read-only attachment to the datasets of a DatasetPublisher.
+
+    Stands in for the dashboard's TableCache in worker processes: ``get``
+    returns the same kinds of values (RewardsIndex, NotificationRollup and
+    a milestones SharedTable with its MilestonesLoader aggregates), but
+    built over memory-mapped published files, so the bulk of every table is
+    held once in the page cache for all workers. Every ``get`` stats the
+    CURRENT pointer and switches to a newer version when one appears;
+    values handed out before keep serving the version they came from.
+
+    The arrays are read-only: changes such as RewardsIndex.set_status must
+    be made to the CSVs and arrive with the next published version.
+    """
+
+    def __init__(self, root, data_dir='data'):
+        """
+        Args:
+            root (str): Directory the publisher writes to
+            data_dir (str): Directory holding the CSV files
+        """
+        self.root = root
+        self.data_dir = data_dir
+        self.loaders = {'milestones': MilestonesLoader()}
+        self.version = None
+        self._values = {}
+        self._served = set()
+        self._pointer_state = None
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'partial_reloads': 0}
+        self.table_counters = {name: dict(self.counters) for name in ('notifications', 'milestones', 'rewards')}
+
+    def get(self, name):
+        """
+        Return a table from the current published version.
+
+        Args:
+            name (str): Table key (notifications, milestones, rewards)
+
+        Returns:
+            RewardsIndex, NotificationRollup or SharedTable
+
+        Raises:
+            FileNotFoundError: If nothing has been published yet
+        """
+        with self._lock:
+            self._attach_current()
+            key = 'hits' if name in self._served else 'misses'
+            self._served.add(name)
+            self.counters[key] += 1
+            self.table_counters[name][key] += 1
+            return self._values[name]
+
+    def _attach_current(self):
+        pointer = os.path.join(self.root, CURRENT_FILE)
+        for _ in range(ATTACH_ATTEMPTS):
+            try:
+                stat = os.stat(pointer)
+            except FileNotFoundError:
+                break
+            # The pointer is replaced, never rewritten, so a new inode means a new version
+            state = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if state == self._pointer_state:
+                return
+            version = read_current(self.root)
+            if version is not None and version == self.version:
+                self._pointer_state = state
+                return
+            try:
+                values = self._attach(version)
+            except FileNotFoundError:
+                # Removed before we mapped it; the pointer has moved on
+                continue
+            self.loaders['milestones'].attach(values['milestones'])
+            self._values, self.version, self._pointer_state = values, version, state
+            self._served = set()
+            return
+        if self.version is None:
+            raise FileNotFoundError(f"No datasets published in {self.root}")
+
+    def _attach(self, version):
+        if version is None:
+            raise FileNotFoundError(f"No datasets published in {self.root}")
+        path = os.path.join(self.root, version)
+        with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+            tables = json.load(f)['tables']
+        values = {}
+        for name, cls in ARRAY_TABLES.items():
+            arrays = {key: np.load(os.path.join(path, name, f"{key}.npy"), mmap_mode='r')
+                      for key in tables[name]['arrays']}
+            values[name] = cls.from_arrays(arrays)
+        generation = (os.path.join(path, 'milestones'), tables['milestones']['schema'])
+        values['milestones'] = SharedTable('milestones', self.data_dir, generation=generation)
+        return values
+
+    def invalidate(self, name=None):
+        """Re-attach to the current version on the next ``get``."""
+        with self._lock:
+            self.version, self._pointer_state = None, None
+
+    def stats(self):
+        """
+        Report cache effectiveness, as TableCache.stats.
+
+        A miss is the first request for a table after attaching to a version.
+
+        Returns:
+            dict: Global counters, hit rate, per-table counters and the attached version
+        """
+        with self._lock:
+            total = sum(self.counters.values())
+            return {
+                **self.counters,
+                'hit_rate': self.counters['hits'] / total if total else 0.0,
+                'tables': {name: dict(c) for name, c in self.table_counters.items()},
+                'version': self.version,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Publish the dashboard datasets for worker processes started with "
+                    f"{SHARED_DIR_ENV} set to the publish directory.")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--root', default=None, help="Publish directory (default: <data-dir>/.shared)")
+    parser.add_argument('--interval', type=float, default=5.0, help="Seconds between checks of the CSV files")
+    parser.add_argument('--grace', type=float, default=DEFAULT_GRACE_SECONDS,
+                        help="Seconds superseded versions are kept")
+    parser.add_argument('--once', action='store_true', help="Publish the current data and exit")
+    args = parser.parse_args()
+
+    publisher = DatasetPublisher(args.data_dir, args.root, args.grace)
+    if args.once:
+        print(publisher.refresh() or read_current(publisher.root))
+    else:
+        publisher.serve(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+CORRELATION_COLUMNS = ['total_cigs_avoided', 'money_saved', 'total_cigs_smoked', 'points']
+
+
+class CorrelationAccumulator:
+    """
+    Streaming Pearson correlation over a fixed set of columns.
+
+    Keeps the row count, the column means and the matrix of centered
+    co-moments (sum of (x - mean_x)(y - mean_y)). Batches and partitions are
+    combined with the pairwise update of Chan et al., which is the batched
+    form of Welford's algorithm and does not lose precision the way raw
+    sums of squares do. Memory is O(columns²) regardless of row count.
+
+    Rows with a missing value in any of the columns are skipped, so results
+    equal DataFrame.corr whenever the columns have no missing values.
+    """
+
+    def __init__(self, columns=CORRELATION_COLUMNS):
+        """
+        Args:
+            columns (list): Columns to correlate
+        """
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+
+    @classmethod
+    def from_frame(cls, df, columns=CORRELATION_COLUMNS):
+        """Accumulator over all rows of ``df``."""
+        accumulator = cls(columns)
+        accumulator.update(df)
+        return accumulator
+
+    def update(self, df):
+        """
+        Add a batch of rows.
+
+        Args:
+            df (pd.DataFrame or np.array): Rows with the accumulator's columns
+                (an array must have them in the same order)
+        """
+        values = df[self.columns].to_numpy(dtype=float) if isinstance(df, pd.DataFrame) \
+            else np.asarray(df, dtype=float)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values) == 0:
+            return
+        batch = CorrelationAccumulator(self.columns)
+        batch.n = len(values)
+        batch.mean = values.mean(axis=0)
+        centered = values - batch.mean
+        batch.comoment = centered.T @ centered
+        self.merge(batch)
+
+    def merge(self, other):
+        """
+        Combine with an accumulator built on another batch or partition.
+
+        Args:
+            other (CorrelationAccumulator): Accumulator over the same columns
+        """
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge accumulators over different columns")
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean = self.mean + delta * (other.n / n)
+        self.n = n
+
+    def covariance(self):
+        """
+        Sample covariance matrix (ddof=1, as DataFrame.cov).
+
+        Returns:
+            pd.DataFrame: Covariance matrix
+        """
+        cov = self.comoment / (self.n - 1) if self.n > 1 else np.full_like(self.comoment, np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        """
+        Pearson correlation matrix.
+
+        Returns:
+            pd.DataFrame: Matrix in the layout of DataFrame.corr; NaN where a
+                column is constant
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.sqrt(np.diag(self.comoment))
+            corr = self.comoment / np.outer(scale, scale)
+        corr = np.clip(corr, -1.0, 1.0)
+        # A non-constant column correlates perfectly with itself
+        np.fill_diagonal(corr, np.where(scale > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
@@ -0,0 +1,239 @@
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from utils.columnar_store import CODED_ENCODINGS, map_columns, open_generation, parse_rows, source_size
+
+USER_TABLES = ['milestones', 'rewards', 'notifications']
+
+# Files written next to the column arrays of a store generation. They are
+# rebuilt whenever the CSV is converted again and removed with the generation.
+#   user_keys    - sorted unique user ids
+#   user_offsets - int64, keys + 1; rows of key i are rows[offsets[i]:offsets[i + 1]]
+#   user_rows    - int64 row numbers grouped by user, ascending within a user
+INDEX_FILES = ('user_keys', 'user_offsets', 'user_rows')
+
+
+def _group_rows(codes, n_keys):
+    """Row numbers grouped by code (codes < 0 are left out) and group offsets."""
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind='stable')
+    order = order[np.count_nonzero(codes < 0):]
+    counts = np.bincount(codes[codes >= 0], minlength=n_keys)
+    offsets = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, order.astype(np.int64, copy=False)
+
+
+def build_user_index(generation_dir, schema):
+    """
+    Write the user_id index for one store generation.
+
+    Args:
+        generation_dir (str): Generation directory from open_generation
+        schema (dict): The generation's schema
+    """
+    spec = next(spec for spec in schema['columns'] if spec['name'] == 'user_id')
+    values = np.load(os.path.join(generation_dir, 'user_id.npy'), mmap_mode='r')
+    if spec['encoding'] in CODED_ENCODINGS:
+        if spec['encoding'] == 'id':
+            keys = np.array(np.load(os.path.join(generation_dir, spec['lookup']), mmap_mode='r'))
+        else:
+            keys = np.array(spec['categories'], dtype=str)
+        codes = np.asarray(values)
+        ranks = np.argsort(keys, kind='stable')
+        if (ranks != np.arange(len(keys))).any():
+            # Store dictionaries are sorted already; remap if they ever are not
+            remap = np.empty(len(keys), dtype=np.int32)
+            remap[ranks] = np.arange(len(keys), dtype=np.int32)
+            keys, codes = keys[ranks], np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+    else:
+        keys, codes = np.unique(np.asarray(values), return_inverse=True)
+    offsets, rows = _group_rows(codes, len(keys))
+
+    arrays = {'user_keys': keys, 'user_offsets': offsets, 'user_rows': rows}
+    # user_rows is replaced last and marks the index as complete. Temporary
+    # names are unique: other threads or processes may build the same index
+    for name in INDEX_FILES:
+        tmp_path = os.path.join(generation_dir, f"{name}.tmp-{os.getpid()}-{uuid.uuid4().hex}.npy")
+        np.save(tmp_path, arrays[name], allow_pickle=False)
+        os.replace(tmp_path, os.path.join(generation_dir, f"{name}.npy"))
+
+
+class UserTableIndex:
+    """
+    Row offsets per user_id into one table of the columnar store.
+
+    Column arrays, sorted keys and grouped row numbers are memory-mapped, so
+    a lookup is a binary search plus a gather of that user's rows; nothing
+    else in the table is read. Rows appended to the CSV since the store was
+    written are kept in a small typed tail with its own user -> rows map.
+    """
+
+    def __init__(self, name, columns, keys, offsets, rows):
+        """
+        Initialize the index.
+
+        Args:
+            name (str): Table key in TABLES
+            columns (dict): Column name -> (array, schema entry)
+            keys (np.array): Sorted unique user ids
+            offsets (np.array): Group offsets into ``rows``
+            rows (np.array): Row numbers grouped by user
+        """
+        self.name = name
+        self.columns = columns
+        self.keys = keys
+        self.offsets = offsets
+        self.rows = rows
+        self.tail = None
+        self._tail_groups = {}
+        self._lock = threading.Lock()
+        # Category labels as plain arrays, so decoding a few codes stays cheap
+        self._labels = {
+            column: np.array(spec['categories'], dtype=object)
+            for column, (_, spec) in columns.items() if spec['encoding'] in CODED_ENCODINGS
+        }
+
+    @classmethod
+    def open(cls, name, data_dir='data', generation=None):
+        """
+        Open (and on first use build) the user index of a stored table.
+
+        Args:
+            name (str): Table key in TABLES
+            data_dir (str): Directory holding the CSV files
+            generation (tuple): Optional (generation_dir, schema) to open
+                instead of the one for the current CSV
+
+        Returns:
+            UserTableIndex: Index over the current store generation
+        """
+        generation_dir, schema = generation or open_generation(name, data_dir)
+        marker = os.path.join(generation_dir, 'user_rows.npy')
+        schema_path = os.path.join(generation_dir, 'schema.json')
+        # A generation rewritten in place (e.g. after a store version bump) gets a fresh index
+        if not os.path.exists(marker) or os.stat(marker).st_mtime_ns < os.stat(schema_path).st_mtime_ns:
+            build_user_index(generation_dir, schema)
+        columns = map_columns(generation_dir, schema)
+        index = {
+            name: np.load(os.path.join(generation_dir, f"{name}.npy"), mmap_mode='r')
+            for name in INDEX_FILES
+        }
+        return cls(name, columns, index['user_keys'], index['user_offsets'], index['user_rows'])
+
+    @property
+    def n_users(self):
+        """Users with rows in the store (appended rows not included)."""
+        return len(self.keys)
+
+    def stored_rows(self, user_id):
+        """
+        Store row numbers for ``user_id`` (empty if the user has none).
+
+        Args:
+            user_id (str): User to look up
+
+        Returns:
+            np.array: Row numbers, ascending
+        """
+        position = np.searchsorted(self.keys, user_id)
+        if position == len(self.keys) or self.keys[position] != user_id:
+            return self.rows[:0]
+        return self.rows[self.offsets[position]:self.offsets[position + 1]]
+
+    def lookup_arrays(self, user_id):
+        """
+        All rows for one user as decoded column arrays, in file order.
+
+        Skips DataFrame construction, which costs more than the lookup itself.
+
+        Args:
+            user_id (str): User to look up
+
+        Returns:
+            dict: Column name -> np.ndarray (categories as labels, times as datetime64)
+        """
+        rows = np.asarray(self.stored_rows(user_id))
+        with self._lock:
+            tail, tail_rows = self.tail, self._tail_groups.get(user_id)
+        data = {}
+        for column, (array, spec) in self.columns.items():
+            values = array[rows]
+            if spec['encoding'] in CODED_ENCODINGS:
+                values = self._labels[column][values]
+            elif spec['encoding'] == 'datetime':
+                values = values.view('datetime64[ns]')
+            if tail_rows is not None:
+                values = np.concatenate([values, tail[column][tail_rows]])
+            data[column] = values
+        return data
+
+    def lookup(self, user_id):
+        """
+        All rows for one user, in file order.
+
+        Args:
+            user_id (str): User to look up
+
+        Returns:
+            pd.DataFrame: The user's rows (empty with the table's columns if none)
+        """
+        return pd.DataFrame(self.lookup_arrays(user_id), columns=list(self.columns), copy=False)
+
+    def append(self, df):
+        """
+        Add rows appended to the CSV after the store was written.
+
+        Args:
+            df (pd.DataFrame): Typed rows from parse_rows
+        """
+        # Decoded like lookup() output: categories as labels, times as datetime64
+        arrays = {
+            column: np.asarray(df[column], dtype=object if spec['encoding'] in CODED_ENCODINGS + ('string',) else None)
+            for column, (_, spec) in self.columns.items()
+        }
+        with self._lock:
+            if self.tail is not None:
+                arrays = {column: np.concatenate([self.tail[column], arrays[column]]) for column in arrays}
+            codes, uniques = pd.factorize(arrays['user_id'])
+            offsets, order = _group_rows(codes, len(uniques))
+            self._tail_groups = {
+                user: order[offsets[code]:offsets[code + 1]] for code, user in enumerate(uniques)
+            }
+            self.tail = arrays
+
+
+class UserIndexLoader:
+    """TableCache loader that keeps a UserTableIndex instead of the table rows."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def load(self, data_dir):
+        generation = open_generation(self.name, data_dir)
+        return UserTableIndex.open(self.name, data_dir, generation), source_size(generation[1])
+
+    def append(self, current, data, columns):
+        current.append(parse_rows(self.name, data, columns))
+        return current
+
+
+def lookup_user(cache, user_id, frames=True):
+    """
+    One user's rows from every table.
+
+    Args:
+        cache (TableCache): Cache whose loaders are UserIndexLoaders
+        user_id (str): User to look up
+        frames (bool): Return DataFrames (else dicts of column arrays)
+
+    Returns:
+        dict: Table name -> that user's rows
+    """
+    if frames:
+        return {name: cache.get(name).lookup(user_id) for name in USER_TABLES}
+    return {name: cache.get(name).lookup_arrays(user_id) for name in USER_TABLES}